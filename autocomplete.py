@@ -1,35 +1,109 @@
+from array import array
 from PySide6.QtWidgets import QCompleter
-from PySide6.QtCore import Qt
-from PySide6.QtGui import QStandardItemModel, QStandardItem
+from PySide6.QtCore import Qt, QAbstractListModel, QModelIndex
+
+# Tipo de sugerencia -> código compacto y etiqueta del tooltip
+KIND_CODES = {'keyword': 0, 'function': 1, 'class': 2}
+KIND_LABELS = [" [kw] ", " [ƒ] ", " [c] ", " [v] "]
+
+
+class CompletionModel(QAbstractListModel):
+    """Modelo virtual de sugerencias: nombres, tipos y puntuaciones en arrays,
+    sin un QStandardItem por candidato. Filtra y ordena por prefijo él mismo; si
+    el prefijo nuevo alarga al anterior, sólo se recorre lo que ya estaba visible."""
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.names = []
+        self.lowered = []
+        self.kinds = array('B')
+        self.scores = array('f')
+        self.order = array('i') # Todos los índices, de mejor a peor puntuación
+        self.visible = array('i') # Índices de names que pasan el filtro, ya ordenados
+        self.prefix = ""
+
+    def set_candidates(self, names, kinds=None, scores=None):
+        self.beginResetModel()
+        self.names = list(names)
+        self.lowered = [n.lower() for n in self.names]
+        self.kinds = array('B', kinds if kinds is not None else bytes(len(self.names)))
+        self.scores = array('f', scores if scores is not None else [0.0] * len(self.names))
+        order = range(len(self.names))
+        if scores is not None: order = sorted(order, key=self.scores.__getitem__, reverse=True)
+        self.order = array('i', order)
+        self.visible = array('i', self.order)
+        self.prefix = ""
+        self.endResetModel()
+
+    def set_prefix(self, prefix):
+        """Aplica el filtro 'empieza por' (sin distinguir mayúsculas). Devuelve las filas visibles."""
+        key = prefix.lower()
+        if key == self.prefix: return len(self.visible)
+        source = self.visible if key.startswith(self.prefix) else self.order
+        lowered = self.lowered
+        matches = [i for i in source if lowered[i].startswith(key)]
+        if key:
+            # Coincidencia exacta primero; después, las que respetan mayúsculas y las mejor puntuadas
+            names, scores = self.names, self.scores
+            matches.sort(key=lambda i: (lowered[i] != key, not names[i].startswith(prefix), -scores[i]))
+        self.beginResetModel()
+        self.visible = array('i', matches)
+        self.prefix = key
+        self.endResetModel()
+        return len(matches)
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.visible)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or index.row() >= len(self.visible): return None
+        i = self.visible[index.row()]
+        if role in (Qt.DisplayRole, Qt.EditRole): return self.names[i]
+        if role == Qt.ToolTipRole: return KIND_LABELS[self.kinds[i]]
+        return None
+
 
 class AutoCompleter(QCompleter):
     def __init__(self, parent=None):
         super().__init__(parent)
         self.setCompletionMode(QCompleter.PopupCompletion)
         self.setCaseSensitivity(Qt.CaseInsensitive)
-        self.setFilterMode(Qt.MatchStartsWith) # Importante: Qt filtra por nosotros
-        
+
         # Modelo visual
-        self.model = QStandardItemModel(self)
+        self.model = CompletionModel(self)
         self.setModel(self.model)
+        self.popup().setUniformItemSizes(True) # Miles de filas sin medir cada una
+        self.scorer = None # función (nombres, tipos) -> puntuaciones; la pone el editor
+
+    def setCompletionPrefix(self, prefix):
+        # El modelo filtra por su cuenta; con prefijo vacío Qt no recorre las filas
+        self.model.set_prefix(prefix)
+        super().setCompletionPrefix("")
+
+    def popup_width(self, sample=200):
+        """Ancho para el popup midiendo sólo las primeras filas
+        (sizeHintForColumn pide todas al modelo: segundos con miles)."""
+        fm = self.popup().fontMetrics()
+        names, visible = self.model.names, self.model.visible
+        widest = max((fm.horizontalAdvance(names[i]) for i in visible[:sample]), default=0)
+        return widest + 2 * fm.horizontalAdvance(' ')
+
+    def refine(self, prefix):
+        """Estrecha la lista abierta al escribir otra letra. Devuelve False si no
+        es una continuación del prefijo actual y hay que pedir sugerencias nuevas."""
+        if not self.model.prefix or not prefix.lower().startswith(self.model.prefix): return False
+        if self.model.set_prefix(prefix) == 0: self.popup().hide()
+        return True
 
-    def load_keywords(self, keywords_list):
+    def load_keywords(self, keywords_list, kinds=None):
         """Carga una lista estática de palabras (para JS, HTML, etc)"""
-        self.model.clear()
-        keywords_list.sort()
-        for word in keywords_list:
-            item = QStandardItem(word)
-            item.setData(" [kw] ", Qt.ToolTipRole)
-            self.model.appendRow(item)
+        scores = self.scorer(keywords_list, kinds) if self.scorer else None
+        codes = [KIND_CODES.get(k, 3) for k in kinds] if kinds is not None else None
+        self.model.set_candidates(keywords_list, codes, scores)
 
     def update_jedi_completions(self, completions):
         """Carga sugerencias dinámicas de Python (Jedi)"""
-        self.model.clear()
-        completions.sort(key=lambda x: x['name'])
-        for data in completions:
-            item = QStandardItem(data['name'])
-            # Icono según tipo
-            kind = data.get('type', '')
-            icon_text = " [ƒ] " if kind == 'function' else " [c] " if kind == 'class' else " [v] "
-            item.setData(icon_text, Qt.ToolTipRole)
-            self.model.appendRow(item)
\ No newline at end of file
+        ordered = sorted(completions, key=lambda x: x['name'])
+        names = [d['name'] for d in ordered]
+        types = [d.get('type', '') for d in ordered]
+        scores = self.scorer(names, types) if self.scorer else None
+        self.model.set_candidates(names, [KIND_CODES.get(t, 3) for t in types], scores)
@@ -0,0 +1,99 @@
+# ==============================================================================
+#  ACCESO AL DOCUMENTO SIN COPIAS COMPLETAS
+# ==============================================================================
+# toPlainText() copia el documento entero (5 MB por llamada en un archivo de
+# 5 MB). Aquí se agrupan las lecturas que necesitan las funciones del editor:
+# lecturas de un bloque, una copia completa cacheada por revisión y regiones
+# sucias por consumidor, para actualizar sólo lo que cambió.
+
+NEWLINE_CHARS = '\u2029\u2028\n' # Separador de párrafo, de línea y salto normal
+
+
+def is_word_char(ch):
+    return ch.isalnum() or ch == '_'
+
+
+def ends_with_newline(document):
+    """Equivale a toPlainText().endswith('\\n') sin copiar el documento."""
+    n = document.characterCount() - 1 # Sin el separador final implícito
+    return n > 0 and document.characterAt(n - 1) in NEWLINE_CHARS
+
+
+class DocumentAccess:
+    """Lecturas baratas de un QTextDocument.
+
+    - revision: contador propio que sube con cada contentsChange (la revisión
+      de Qt también sube cuando el resaltador repinta un bloque).
+    - snapshot(): texto completo, copiado como mucho una vez por revisión.
+    - word_before(pos): lectura dentro del bloque del cursor.
+    - track()/take_dirty(): cada consumidor recibe el rango de bloques que
+      cambió desde su última lectura."""
+    def __init__(self, document):
+        self.document = document
+        self.revision = 0
+        self._snapshot = None
+        self._snapshot_revision = -1
+        self._block_count = document.blockCount()
+        self._dirty = {} # token -> (primero, último, delta) o None
+        self._next_token = 0
+        document.contentsChange.connect(self._on_change)
+
+    def _on_change(self, pos, removed, added):
+        self.revision += 1
+        self._snapshot = None # Se suelta ya: no retener 5 MB que nadie va a usar
+        doc = self.document
+        count = doc.blockCount()
+        delta, self._block_count = count - self._block_count, count
+        first = doc.findBlock(pos).blockNumber()
+        last = doc.findBlock(pos + added).blockNumber()
+        if last < 0: last = count - 1 # Qt puede contar el separador final del documento
+        for token, region in self._dirty.items():
+            self._dirty[token] = (first, last, delta) if region is None else merge_regions(region, (first, last, delta))
+
+    def snapshot(self):
+        """Texto completo. Las llamadas con la misma revisión comparten la copia."""
+        if self._snapshot_revision != self.revision or self._snapshot is None:
+            self._snapshot = self.document.toPlainText()
+            self._snapshot_revision = self.revision
+        return self._snapshot
+
+    def word_before(self, pos):
+        """(inicio, palabra) del identificador que acaba en `pos`, leyendo sólo su bloque."""
+        block = self.document.findBlock(pos)
+        text = block.text()
+        end = pos - block.position()
+        start = end
+        while start > 0 and is_word_char(text[start - 1]): start -= 1
+        return block.position() + start, text[start:end]
+
+    def write_to(self, f):
+        """Escribe el documento en un archivo abierto reutilizando el snapshot."""
+        f.write(self.snapshot())
+
+    def track(self):
+        """Registra un consumidor de regiones sucias. Devuelve su token."""
+        token = self._next_token; self._next_token += 1
+        self._dirty[token] = None
+        return token
+
+    def untrack(self, token):
+        self._dirty.pop(token, None)
+
+    def take_dirty(self, token):
+        """(primero, último, delta) acumulado desde la última llamada, o None.
+        Los bloques primero..último del documento actual sustituyen a
+        primero..último-delta de la versión que vio el consumidor."""
+        region = self._dirty.get(token)
+        self._dirty[token] = None
+        return region
+
+
+def merge_regions(old, new):
+    """Une dos regiones sucias consecutivas (la segunda en coordenadas posteriores)."""
+    f1, l1, d1 = old
+    f2, l2, d2 = new
+    # Dónde queda el final de la primera región tras el segundo cambio
+    if l1 < f2: end = l1
+    elif l1 > l2 - d2: end = l1 + d2
+    else: end = l2
+    return min(f1, f2), max(end, l2), d1 + d2
@@ -10,22 +10,21 @@ import os
 import json
 import re
 import traceback 
+import multiprocessing
 
-from PySide6.QtCore import (Qt, QTimer, QSize, QRect, QThread, Signal, QEvent)
-from PySide6.QtGui import (QColor, QTextCharFormat, QFont, QFontMetricsF,
-                           QSyntaxHighlighter, QTextCursor, QPainter, QKeyEvent, 
-                           QIcon, QPixmap, QTextFormat) 
+from PySide6.QtCore import (Qt, QTimer, QSize, QRect, QEvent)
+from PySide6.QtGui import (QColor, QFont, QFontMetricsF,
+                           QTextCursor, QPainter, QKeyEvent, 
+                           QIcon, QPixmap, QTextFormat, QTextOption, QTextCharFormat) 
 from PySide6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
                                QPlainTextEdit, QSplitter, QFileDialog, QMessageBox, 
                                QTabWidget, QMenu, QInputDialog, QLabel, QDialog, 
                                QTableWidget, QTableWidgetItem, QHeaderView, QPushButton,
-                               QTextEdit, QCompleter) 
+                               QTextEdit, QCompleter, QToolButton) 
 
 # --- IMPORTACIONES EXTERNAS ---
 try:
-    import jedi
     from pygments import lexers
-    from pygments.token import Token
 except ImportError as e:
     print(f"❌ Error faltan librerías externas: {e}")
 
@@ -50,6 +49,14 @@ try:
 except Exception as e:
     print(f"❌ Error keywords: {e}")
 
+# Funciones que se apagan en modo archivo grande (se pueden reactivar una a una)
+LARGE_FILE_FEATURES = [
+    ("minimap", "🗺️ Minimapa"),
+    ("highlight", "🎨 Resaltado completo"),
+    ("words", "🔤 Palabras del documento"),
+    ("jedi", "🐍 Autocompletado Jedi"),
+]
+
 # ==============================================================================
 #  CARGA DE MÓDULOS LOCALES
 # ==============================================================================
@@ -57,8 +64,18 @@ try:
     from utils import THEMES
     from terminal import EditorTerminal
     from autocomplete import AutoCompleter
+    from highlighter import PySideHighlighter, stop_highlight_workers
+    from jedi_service import JediService
+    from lsp_client import LspManager, utf16_len
+    from word_index import WordIndex, SharedWordIndex, sorted_keywords, prefix_matches
+    from ranking import CompletionRanker, LOCAL_RADIUS
+    from document_access import DocumentAccess
     from minimap import CodeMinimap
     from search_module import SearchWidget, GlobalSearchDialog
+    from search_engine import SEARCH_POOL
+    from trigram_index import ProjectIndexer
+    from quick_open import QuickOpenIndexer, QuickOpenDialog
+    from file_watcher import FileWatcher, disk_signature
     from menu_module import MenuBuilder
     from sidebar_module import ProjectSidebarWrapper
     from shortcuts import SHORTCUTS_DATA
@@ -236,87 +253,6 @@ class LineNumberArea(QWidget):
     def paintEvent(self, event): self.editor.lineNumberAreaPaintEvent(event)
 
 
-# ==============================================================================
-#  CLASE: HIGHLIGHTER
-# ==============================================================================
-
-class PySideHighlighter(QSyntaxHighlighter):
-    def __init__(self, parent, language="text", theme_name="Dark"):
-        super().__init__(parent)
-        self.language = language
-        self.theme_name = theme_name
-        self.formats = {}
-        self.setup_formats()
-
-    def setup_formats(self):
-        theme_tags = THEMES.get(self.theme_name, THEMES['Dark']).get('tags', {})
-        self.formats = {}
-        for tag, hex_color in theme_tags.items():
-            fmt = QTextCharFormat()
-            fmt.setForeground(QColor(hex_color))
-            if tag in ['keyword', 'class']: fmt.setFontWeight(QFont.Bold)
-            if tag == 'comment': fmt.setFontItalic(True)
-            self.formats[tag] = fmt
-
-    def set_language(self, l):
-        self.language = l.lower()
-        self.rehighlight()
-
-    def set_theme(self, t):
-        self.theme_name = t
-        self.setup_formats()
-        self.rehighlight()
-
-    def highlightBlock(self, text):
-        if not text: return
-        try:
-            from pygments.lexers import get_lexer_by_name
-            if self.language in ['php', 'html', 'htm', 'blade']:
-                lexer = get_lexer_by_name("php", startinline=True)
-            else:
-                lexer = get_lexer_by_name(self.language)
-        except: return
-
-        for index, token_type, value in lexer.get_tokens_unprocessed(text):
-            length = len(value)
-            tag = self._get_tag_for_token(token_type)
-            if tag and tag in self.formats:
-                self.setFormat(index, length, self.formats[tag])
-
-    def _get_tag_for_token(self, token_type):
-        if token_type in Token.Keyword: return "keyword"
-        if token_type in Token.Name.Tag: return "tag"
-        if token_type in Token.Name.Attribute: return "attribute"
-        if token_type in Token.Literal.String: return "string"
-        if token_type in Token.Name.Builtin: return "builtin"
-        if token_type in Token.Name.Variable: return "variable"
-        if token_type in Token.Comment: return "comment"
-        if token_type in Token.Operator: return "operator"
-        if token_type in Token.Literal.Number: return "number"
-        if token_type in Token.Name.Function: return "function"
-        if token_type in Token.Name.Class: return "class"
-        if token_type in Token.Name: return "attribute" 
-        return None
-
-
-# ==============================================================================
-#  CLASE: JEDI WORKER
-# ==============================================================================
-
-class JediWorker(QThread):
-    finished = Signal(list)
-    def __init__(self, code, line, col, path):
-        super().__init__()
-        self.code, self.line, self.col, self.path = code, line, col, path
-    def run(self):
-        try:
-            script = jedi.Script(code=self.code, path=self.path)
-            completions = script.complete(self.line, self.col)
-            results = [{'name': c.name, 'type': c.type} for c in completions]
-            self.finished.emit(results)
-        except: self.finished.emit([])
-
-
 # ==============================================================================
 #  CLASE PRINCIPAL: CODE EDITOR
 # ==============================================================================
@@ -325,22 +261,39 @@ class CodeEditor(QPlainTextEdit):
     def __init__(self, parent, theme, size, tabs):
         super().__init__(parent)
         self.theme_name = theme
+        self.applied_theme = None
         self.line_number_area = LineNumberArea(self)
+        # Primero: su contentsChange corre antes que el de los demás consumidores
+        self.doc_access = DocumentAccess(self.document())
         self.highlighter = PySideHighlighter(self.document(), "text", theme)
+        self.highlighter.visible_range = self.visible_block_range
         
         self.completer = AutoCompleter(self) 
         self.completer.setWidget(self)
         self.completer.setCompletionMode(QCompleter.PopupCompletion)
         
         self.completer.activated.connect(self.insert_completion) 
+        self.completer.scorer = self.score_candidates
+        self.ranker = None # CompletionRanker del proyecto (lo asigna la ventana)
         self.installEventFilter(self)
         
         self.tab_width = tabs
         self.file_path = None
         self.current_lang = "text"
         self.base_keywords = [] 
+        self.keyword_pairs = [] # base_keywords ordenadas para buscar por prefijo
+        self.dynamic_words_enabled = True
+        self.word_index = WordIndex() # Palabras del documento, al día bloque a bloque
+        self.word_token = self.doc_access.track()
+        self.shared_words = None # SharedWordIndex de la ventana (palabras de todas las pestañas)
+        self.document().contentsChange.connect(self._update_word_index)
+        self.jedi_enabled = True
         
-        self.worker = None 
+        self.completion_service = None # JediService de la ventana
+        self.lsp_session = None # LspManager si el lenguaje tiene servidor LSP
+        self.diagnostics = [] # Último publishDiagnostics del servidor
+        self.diagnostic_selections = []
+        self.search_selections = [] # Coincidencias visibles del panel de búsqueda
         self.timer_jedi = QTimer()
         self.timer_jedi.setSingleShot(True)
         self.timer_jedi.timeout.connect(self.run_jedi_analysis)
@@ -350,6 +303,7 @@ class CodeEditor(QPlainTextEdit):
         self.blockCountChanged.connect(self.update_line_number_area_width)
         self.updateRequest.connect(self.update_line_number_area)
         self.cursorPositionChanged.connect(self.highlight_current_line)
+        self.verticalScrollBar().valueChanged.connect(self.refresh_visible_highlight)
         self.update_line_number_area_width(0)
         self.apply_theme(theme)
 
@@ -363,6 +317,7 @@ class CodeEditor(QPlainTextEdit):
 
         self.current_lang = lang
         self.highlighter.set_language(self.current_lang)
+        if self.shared_words: self.word_index.set_bucket(self.shared_words.bucket(lang))
         
         self.base_keywords = []
         if self.current_lang != 'python':
@@ -372,6 +327,7 @@ class CodeEditor(QPlainTextEdit):
                 self.base_keywords = KEYWORDS_DB.get('html', []) + KEYWORDS_DB.get('css', []) + KEYWORDS_DB.get('javascript', [])
             else:
                 self.base_keywords = KEYWORDS_DB.get(self.current_lang, [])
+        self.keyword_pairs = sorted_keywords(self.base_keywords)
 
     def eventFilter(self, obj, event):
         if event.type() == QEvent.KeyPress and self.completer.popup().isVisible():
@@ -417,56 +373,83 @@ class CodeEditor(QPlainTextEdit):
             return
         
         tc = self.textCursor()
-        doc = self.document()
         pos = tc.position()
-        text = doc.toPlainText()
-        
-        start_pos = pos
-        while start_pos > 0:
-            char = text[start_pos - 1]
-            if char.isalnum() or char == '_':
-                start_pos -= 1
-            else:
-                break
+        start_pos, _ = self.doc_access.word_before(pos)
         
         tc.setPosition(start_pos)
         tc.setPosition(pos, QTextCursor.KeepAnchor)
         tc.insertText(completion)
         self.setTextCursor(tc)
-
-    def get_dynamic_words(self):
-        text = self.toPlainText()
-        try:
-            raw_words = re.findall(r'\b[a-zA-Z_]\w{2,}\b', text)
-            return list(set(raw_words))
-        except: return []
+        if self.ranker: self.ranker.record_accept(completion)
+
+    def score_candidates(self, names, kinds):
+        """Puntúa sugerencias con lo aprendido en el proyecto y el documento actual"""
+        if not self.ranker: return None
+        nearby = set()
+        if self.dynamic_words_enabled:
+            line = self.textCursor().blockNumber()
+            for words in self.word_index.lines[max(0, line - LOCAL_RADIUS):line + LOCAL_RADIUS + 1]: nearby.update(words)
+        return self.ranker.scores(names, kinds, self.word_index.counts, nearby)
+
+    def set_large_file_mode(self, enabled):
+        """Archivo grande: sin palabras dinámicas ni Jedi, resaltado solo en pantalla y sin ajuste de línea"""
+        self.jedi_enabled = not enabled
+        self.set_dynamic_words(not enabled)
+        self.highlighter.set_viewport_only(enabled)
+        if enabled:
+            self.setWordWrapMode(QTextOption.NoWrap)
+            self.setCenterOnScroll(False)
+
+    def set_dynamic_words(self, enabled):
+        """Activa el índice de palabras del documento (al activarlo se lee entero una vez)"""
+        self.dynamic_words_enabled = enabled
+        self.word_index.clear()
+        self.doc_access.take_dirty(self.word_token) # Se relee todo: lo pendiente sobra
+        doc = self.document()
+        if enabled:
+            self.word_index.replace_lines(0, 1, [doc.findBlockByNumber(i).text() for i in range(doc.blockCount())])
+
+    def _update_word_index(self, *_):
+        """Vuelve a leer sólo los bloques que tocó la edición"""
+        region = self.doc_access.take_dirty(self.word_token)
+        if not self.dynamic_words_enabled or region is None: return
+        first, last, delta = region
+        block, texts = self.document().findBlockByNumber(first), []
+        for _ in range(last - first + 1):
+            texts.append(block.text()); block = block.next()
+        self.word_index.replace_lines(first, last - first + 1 - delta, texts)
+
+    def get_dynamic_words(self, prefix):
+        if not self.dynamic_words_enabled: return []
+        return self.word_index.complete(prefix)
+
+    def word_prefix(self):
+        tc = self.textCursor()
+        match = re.search(r'([a-zA-Z0-9_]+)$', tc.block().text()[:tc.positionInBlock()])
+        return match.group(1) if match else ""
 
     def show_static_suggestions(self):
-        tc = self.textCursor()
-        line_text = tc.block().text()
-        pos_in_block = tc.positionInBlock()
-        text_before = line_text[:pos_in_block]
-        
-        match = re.search(r'([a-zA-Z0-9_]+)$', text_before)
-        prefix = match.group(1) if match else ""
+        prefix = self.word_prefix()
         
         if len(prefix) < 2:
             self.completer.popup().hide()
             return
 
-        dynamic = self.get_dynamic_words()
-        combined = list(set(self.base_keywords + dynamic))
-        filtered = [w for w in combined if w.lower().startswith(prefix.lower())]
-        filtered.sort(key=lambda x: (x.lower() != prefix.lower(), x.lower()))
+        # Con la lista abierta, otra letra sólo estrecha lo que ya hay
+        if self.completer.popup().isVisible() and self.completer.refine(prefix): return
+
+        doc_words = set(self.get_dynamic_words(prefix))
+        combined = doc_words.union(prefix_matches(self.keyword_pairs, prefix))
+        filtered = sorted(combined, key=lambda x: (x.lower() != prefix.lower(), x.lower()))
         
         if not filtered:
             self.completer.popup().hide()
             return
 
-        self.completer.load_keywords(filtered)
+        self.completer.load_keywords(filtered, ['word' if w in doc_words else 'keyword' for w in filtered])
         self.completer.setCompletionPrefix(prefix)
         cr = self.cursorRect()
-        cr.setWidth(self.completer.popup().sizeHintForColumn(0) + 40)
+        cr.setWidth(self.completer.popup_width() + 40)
         self.completer.complete(cr)
 
     def keyPressEvent(self, e: QKeyEvent):
@@ -497,33 +480,60 @@ class CodeEditor(QPlainTextEdit):
         is_ctrl_space = (e.modifiers() & Qt.ControlModifier) and e.key() == Qt.Key_Space
         triggers = ['.', '#', '$', '@', '-', '_', '<', '/']
         
-        if self.current_lang == 'python':
+        if self.lsp_session and self.lsp_session.is_attached(self):
+            if not self.jedi_enabled: return
+            if e.text().isalnum() or e.text() in self.lsp_session.trigger_characters(self) or is_ctrl_space:
+                self.refine_open_popup(e.text())
+                self.timer_jedi.start(50)
+        elif self.current_lang == 'python':
+            if not self.jedi_enabled: return
             if e.text().isalnum() or e.text() == "." or is_ctrl_space:
-                self.timer_jedi.start(150)
+                self.refine_open_popup(e.text())
+                self.timer_jedi.start(50)
         else:
             if e.text().isalnum() or e.text() in triggers or is_ctrl_space:
                 self.show_static_suggestions()
 
+    def refine_open_popup(self, typed):
+        """Mientras llega la respuesta nueva, la lista abierta se estrecha al instante"""
+        if not self.completer.popup().isVisible(): return
+        if not (typed.isalnum() or typed == '_') or not self.completer.refine(self.word_prefix()):
+            self.completer.popup().hide()
+
+    @property
+    def edit_revision(self):
+        """Sube con cada edición real; invalida respuestas viejas"""
+        return self.doc_access.revision
+
+    def lsp_contents_changed(self, pos, removed, added):
+        if self.lsp_session: self.lsp_session.document_changed(self, pos, removed, added)
+
     def run_jedi_analysis(self):
-        if self.worker and self.worker.isRunning(): return
         c = self.textCursor()
-        self.worker = JediWorker(self.toPlainText(), c.blockNumber()+1, c.columnNumber(), self.file_path)
-        self.worker.finished.connect(self.handle_jedi_results)
-        self.worker.start()
+        if self.lsp_session and self.lsp_session.is_attached(self):
+            self.lsp_session.request_completion(self, c.blockNumber(), c.positionInBlock(), self.edit_revision)
+            return
+        if not self.completion_service: return
+        self.completion_service.request(self, self.doc_access.snapshot(), c.blockNumber()+1, c.columnNumber(),
+                                        self.file_path, self.edit_revision)
+
+    def on_completion_result(self, revision, r):
+        if revision != self.edit_revision: return # El texto cambió desde la petición
+        if not self.isVisible(): return # La pestaña se ocultó mientras tanto
+        self.handle_jedi_results(r)
 
     def handle_jedi_results(self, r):
         if not r: 
             self.completer.popup().hide()
             return
         self.completer.update_jedi_completions(r)
-        tc = self.textCursor()
-        self.completer.setCompletionPrefix("")
-        line_text = tc.block().text()[:tc.positionInBlock()]
-        match = re.search(r'([a-zA-Z0-9_\.]+)$', line_text)
-        prefix = match.group(1) if match else ""
-        self.completer.setCompletionPrefix(prefix)
+        # Las sugerencias completan el identificador tras el último punto
+        self.completer.setCompletionPrefix(self.word_prefix())
+        if self.completer.model.rowCount() == 0:
+            self.completer.popup().hide()
+            return
         cr = self.cursorRect()
-        cr.setWidth(self.completer.popup().sizeHintForColumn(0) + 40)
+        cr.setWidth(self.completer.popup_width() + 40)
         self.completer.complete(cr)
         
     def update_font(self, s, t): 
@@ -532,13 +542,22 @@ class CodeEditor(QPlainTextEdit):
         self.setTabStopDistance(t * QFontMetricsF(f).horizontalAdvance(' '))
 
     def apply_theme(self, n):
-        self.theme_name = n
+        if n == self.applied_theme: return # Mismo tema: nada que repintar
+        self.theme_name = self.applied_theme = n
         c = THEMES.get(n, THEMES['Dark'])
         self.setStyleSheet(f"background-color: {c['bg']}; color: {c['fg']}; selection-background-color: {c['select_bg']}; border: none;")
         self.highlighter.set_theme(n)
         self.update_line_number_area_width(0)
         self.highlight_current_line()
 
+    def refresh_visible_highlight(self, *_):
+        self.highlighter.refresh_range(*self.visible_block_range())
+
+    def visible_block_range(self):
+        first = self.firstVisibleBlock().blockNumber()
+        rows = self.viewport().height() // max(1, self.fontMetrics().height())
+        return first, first + rows + 1
+
     def line_number_area_width(self):
         digits = 1
         max_num = max(1, self.blockCount())
@@ -558,6 +577,7 @@ class CodeEditor(QPlainTextEdit):
 
     def resizeEvent(self, e): 
         super().resizeEvent(e)
+        self.refresh_visible_highlight()
         cr = self.contentsRect()
         self.line_number_area.setGeometry(QRect(cr.left(), cr.top(), self.line_number_area_width(), cr.height()))
 
@@ -578,6 +598,32 @@ class CodeEditor(QPlainTextEdit):
             bottom = top + self.blockBoundingRect(block).height()
             num += 1
 
+    def set_diagnostics(self, diagnostics):
+        """Subraya los errores y avisos que publica el servidor LSP"""
+        self.diagnostics = diagnostics
+        doc = self.document()
+        colors = {1: QColor("#ff5555"), 2: QColor("#ffb86c")}
+        self.diagnostic_selections = []
+        for d in diagnostics[:500]:
+            start, end = d['range']['start'], d['range']['end']
+            c = QTextCursor(doc)
+            for point, mode in ((start, QTextCursor.MoveAnchor), (end, QTextCursor.KeepAnchor)):
+                block = doc.findBlockByNumber(min(point['line'], doc.blockCount() - 1))
+                c.setPosition(block.position() + min(point['character'], max(0, block.length() - 1)), mode)
+            if not c.hasSelection(): c.movePosition(QTextCursor.EndOfWord, QTextCursor.KeepAnchor)
+            sel = QTextEdit.ExtraSelection()
+            sel.format.setUnderlineStyle(QTextCharFormat.SpellCheckUnderline)
+            sel.format.setUnderlineColor(colors.get(d.get('severity'), QColor("#8be9fd")))
+            sel.cursor = c
+            self.diagnostic_selections.append(sel)
+        self.highlight_current_line()
+
+    def diagnostic_message(self):
+        line = self.textCursor().blockNumber()
+        for d in self.diagnostics:
+            if d['range']['start']['line'] <= line <= d['range']['end']['line']: return d.get('message', '')
+        return ""
+
     def highlight_current_line(self):
         extra = []
         if not self.isReadOnly():
@@ -591,7 +637,11 @@ class CodeEditor(QPlainTextEdit):
             sel.cursor = self.textCursor()
             sel.cursor.clearSelection()
             extra.append(sel)
-        self.setExtraSelections(extra)
+        self.setExtraSelections(extra + self.search_selections + self.diagnostic_selections)
+
+    def set_search_selections(self, selections):
+        self.search_selections = selections
+        self.highlight_current_line()
 
 
 # ==============================================================================
@@ -599,15 +649,76 @@ class CodeEditor(QPlainTextEdit):
 # ==============================================================================
 
 class EditorTab(QWidget):
-    def __init__(self, parent, path=None, content="", theme="Dark", size=12, tabs=4):
+    def __init__(self, parent, path=None, content="", theme="Dark", size=12, tabs=4, large_file=False):
         super().__init__(parent)
         self.file_path, self.saved = path, True
+        self.disk_stat = disk_signature(path) if path else None # Lo último leído o escrito en disco
+        self.conflict = None # None, 'changed' o 'deleted': el disco cambió y hay cambios sin guardar
+        self.large_file = large_file
+        self.large_features = {name: not large_file for name, _ in LARGE_FILE_FEATURES}
+        self.active = True # Las pestañas ocultas aplazan su trabajo hasta volver a verse
+        self.pending = {} # clave -> actualización aplazada (la última por clave gana)
         ly = QHBoxLayout(self); ly.setContentsMargins(0,0,0,0); ly.setSpacing(0)
-        self.editor = CodeEditor(self, theme, size, tabs); self.editor.setPlainText(content)
+        self.editor = CodeEditor(self, theme, size, tabs)
+        if large_file: self.editor.set_large_file_mode(True) # Antes de cargar el texto
+        self.editor.setPlainText(content)
         self.editor.file_path = path 
         self.minimap = CodeMinimap(self.editor); self.minimap.apply_theme(THEMES.get(theme, THEMES['Dark']))
+        self.minimap.setVisible(self.large_features['minimap'])
+        if self.large_features['minimap']: self.minimap.sync_with_parent()
         ly.addWidget(self.editor); ly.addWidget(self.minimap)
-        self.editor.textChanged.connect(self._mod); self.editor.textChanged.connect(self.minimap.sync_with_parent)
+        # contentsChange solo salta con ediciones reales; textChanged también con cada pasada del resaltador
+        self.editor.document().contentsChange.connect(self._on_contents_change)
+    def _on_contents_change(self, pos, removed, added):
+        self._mod() # El minimapa escucha el documento por su cuenta
+    def set_feature(self, name, enabled):
+        """Reactiva (o apaga) una función del modo archivo grande"""
+        self.large_features[name] = enabled
+        if name == 'minimap':
+            self.minimap.setVisible(enabled)
+            if enabled: self.minimap.sync_with_parent()
+        elif name == 'highlight': self.editor.highlighter.set_viewport_only(not enabled)
+        elif name == 'words': self.editor.set_dynamic_words(enabled)
+        elif name == 'jedi': self.editor.jedi_enabled = enabled
+
+    # --- CICLO DE VIDA: PESTAÑA ACTIVA / OCULTA ---
+    def defer(self, key, fn):
+        """Ejecuta fn ya si la pestaña está activa; si no, la guarda para cuando se active"""
+        if self.active: fn(); return
+        self.pending.pop(key, None); self.pending[key] = fn
+    def set_active(self, active):
+        if active == self.active: return
+        self.active = active
+        self.editor.highlighter.set_paused(not active)
+        if not active:
+            self.editor.timer_jedi.stop()
+            self.editor.completer.popup().hide()
+            return
+        # Se pone al día en el orden en que llegaron los cambios (el minimapa lo hace al mostrarse)
+        pending, self.pending = self.pending, {}
+        for fn in pending.values(): fn()
+    def apply_theme(self, name, colors):
+        self.defer('theme', lambda: (self.editor.apply_theme(name), self.minimap.apply_theme(colors)))
+    def update_font(self, size, tabs):
+        self.defer('font', lambda: self.editor.update_font(size, tabs))
+    def set_diagnostics(self, diagnostics):
+        self.defer('diagnostics', lambda: self.editor.set_diagnostics(diagnostics))
+    def reload_from_disk(self):
+        """Cambia el texto por el del disco sin mover el cursor ni la vista; False si no se pudo leer"""
+        stat = disk_signature(self.file_path)
+        try:
+            with open(self.file_path, 'r', encoding='utf-8') as f: content = f.read()
+        except (OSError, UnicodeDecodeError): return False
+        editor = self.editor
+        c = editor.textCursor(); line, col = c.blockNumber(), c.positionInBlock()
+        scroll = editor.verticalScrollBar().value()
+        editor.setPlainText(content)
+        block = editor.document().findBlockByNumber(min(line, editor.blockCount() - 1))
+        c = editor.textCursor(); c.setPosition(block.position() + min(col, block.length() - 1))
+        editor.setTextCursor(c); editor.verticalScrollBar().setValue(scroll)
+        self.disk_stat, self.conflict, self.saved = stat, None, True
+        self.window().update_tab_title(self)
+        return True
     def _mod(self):
         if self.saved: self.saved = False; self.window().update_tab_title(self)
     def get_title(self): return os.path.basename(self.file_path) if self.file_path else "Sin título"
@@ -633,6 +744,7 @@ class CapiEditor(QMainWindow):
         self.tab_width = 4
         self.autosave_enabled = True
         self.minimap_enabled = True
+        self.active_tab = None # EditorTab visible; las demás están en pausa
         self.root_dir = os.path.abspath(os.getcwd())
         
         self.all_themes = list(THEMES.keys())
@@ -645,7 +757,11 @@ class CapiEditor(QMainWindow):
         
         self.sidebar_widget = ProjectSidebarWrapper(self)
         self.sidebar_widget.tree_view.clicked.connect(self.on_file_click)
+        self.sidebar_widget.tree_view.paths_changed.connect(self.on_paths_changed)
+        self.sidebar_widget.tree_view.paths_moved.connect(self.on_paths_moved)
         main.addWidget(self.sidebar_widget)
+        self.file_watcher = FileWatcher(self) # Cambios en disco, en lotes, para pestañas, árbol e índices
+        self.sidebar_widget.set_watcher(self.file_watcher)
         
         ctr = QWidget()
         vbox = QVBoxLayout(ctr)
@@ -667,6 +783,17 @@ class CapiEditor(QMainWindow):
         main.setStretchFactor(1, 1)
 
         self.setup_status_bar()
+        self.jedi_service = JediService(self)
+        self.jedi_service.completions_ready.connect(self.on_completions_ready)
+        self.ranker = CompletionRanker()
+        self.project_index = ProjectIndexer(self) # Índice de trigramas para la búsqueda global
+        self.project_index.index_ready.connect(self.on_index_ready)
+        self.quick_open = QuickOpenIndexer(self) # Rutas del proyecto para Ctrl+P
+        self.file_watcher.changed.connect(self.on_disk_changes)
+        self.shared_words = SharedWordIndex() # Identificadores de todas las pestañas, por lenguaje
+        self.lsp = LspManager(self.config.get('lsp', {}).get('servers'), self)
+        self.lsp.completions_ready.connect(lambda e, r, res, ms: self.on_completions_ready(e, r, res, ms, "LSP"))
+        self.lsp.diagnostics_ready.connect(self.on_diagnostics_ready)
         self.init_sidebar_for_path(self.root_dir)
         self.load_session()
 
@@ -716,6 +843,66 @@ class CapiEditor(QMainWindow):
         self.root_dir = os.path.abspath(path)
         self.sidebar_widget.set_project_path(self.root_dir)
         self.setWindowTitle(f"{self.app_name} {self.app_version} - {os.path.basename(self.root_dir)}")
+        self.lsp.set_root(self.root_dir)
+        self.ranker.load(self.root_dir)
+        # Jedi prepara el proyecto (venv incluido) antes del primer Ctrl+Espacio
+        self.jedi_service.open_project(self.root_dir, self.config.get('jedi', {}).get('preload_modules'))
+        self.project_index.open_project(self.root_dir)
+        self.quick_open.open_project(self.root_dir)
+        self.file_watcher.open_project(self.root_dir)
+
+    def on_paths_changed(self, paths):
+        """Archivos o carpetas creados, renombrados o borrados desde el editor"""
+        self.file_watcher.touch(paths) # Llegan con el próximo lote, como los de fuera
+
+    def on_paths_moved(self, moves):
+        """Las pestañas de lo movido o renombrado desde el árbol siguen a su archivo"""
+        for old, new in moves:
+            for i in range(self.tabs.count()):
+                t = self.tabs.widget(i)
+                path = getattr(t, 'file_path', None)
+                if not path or not (path == old or path.startswith(old + os.sep)): continue
+                self.file_watcher.unwatch(path)
+                t.file_path = t.editor.file_path = new + path[len(old):]
+                t.disk_stat, t.conflict = disk_signature(t.file_path), None
+                self.file_watcher.watch(t.file_path)
+                self.update_tab_title(t)
+
+    def on_disk_changes(self, changes):
+        """Lote del vigilante: pone al día los índices y las pestañas abiertas"""
+        inside = self.root_dir + os.sep
+        for p in changes.created | changes.deleted:
+            if p.startswith(inside): self.quick_open.path_changed(p)
+        paths = changes.paths()
+        for p in paths:
+            if p.startswith(inside): self.project_index.file_changed(p)
+        for i in range(self.tabs.count()):
+            t = self.tabs.widget(i)
+            if getattr(t, 'file_path', None) in paths: self.check_disk_state(t)
+
+    def check_disk_state(self, t):
+        """Sin cambios propios se recarga; con ellos se marca el conflicto y auto_save no lo pisa"""
+        stat = disk_signature(t.file_path)
+        name = t.get_title()
+        if stat == t.disk_stat: # Lo escribimos nosotros (o volvió a quedar como estaba)
+            if t.conflict: t.conflict = None; self.update_tab_title(t)
+            return
+        if stat is None:
+            t.conflict = 'deleted'
+            self.status_bar.showMessage(f"⚠️ {name} se borró del disco", 5000)
+            self.update_tab_title(t)
+        elif t.saved and not t.conflict:
+            t.defer('reload', lambda: t.reload_from_disk() or self.mark_changed_on_disk(t))
+            return
+        else: self.mark_changed_on_disk(t)
+
+    def mark_changed_on_disk(self, t):
+        t.conflict = 'changed'
+        self.status_bar.showMessage(f"⚠️ {t.get_title()} cambió en disco: al guardar podrás elegir qué versión queda", 5000)
+        self.update_tab_title(t)
+
+    def on_index_ready(self, root, files, read, seconds):
+        if root == self.root_dir: self.status_bar.showMessage(f"⚡ Índice de búsqueda: {files} archivos ({read} leídos, {seconds:.1f} s)", 4000)
         
     def on_file_click(self, i): 
         p = self.sidebar_widget.tree_view.model().filePath(i)
@@ -729,27 +916,73 @@ class CapiEditor(QMainWindow):
         try:
             with open(path, 'r', encoding='utf-8') as f:
                 t = self.add_tab(path, f.read())
+                self.file_watcher.watch(path)
                 try:
                     from pygments.lexers import get_lexer_for_filename
                     lexer = get_lexer_for_filename(path)
                     t.editor.set_code_language(lexer.aliases[0])
                 except: t.editor.set_code_language("text")
+                self.lsp.attach(t.editor)
         except Exception as e: QMessageBox.critical(self, "Error", str(e))
+    def open_file_at(self, path, line, col=0):
+        """Abre el archivo y pone el cursor en la línea (desde 1) y columna (desde 0)"""
+        self.open_file(path)
+        t = self.tabs.currentWidget()
+        if getattr(t, 'file_path', None) != path: return
+        editor = t.editor
+        block = editor.document().findBlockByNumber(max(0, line - 1))
+        if not block.isValid(): return
+        c = editor.textCursor()
+        c.setPosition(block.position() + utf16_len(block.text()[:col])) # Qt cuenta en UTF-16
+        editor.setTextCursor(c); editor.centerCursor(); editor.setFocus()
+    def is_large_file(self, content):
+        limits = self.config.get('large_file', {})
+        max_chars = limits.get('max_size_mb', 5) * 1024 * 1024
+        return len(content) > max_chars or content.count('\n') >= limits.get('max_lines', 50000)
     def add_tab(self, path=None, content=""):
-        if self.tabs.count() == 1 and getattr(self.tabs.widget(0), 'is_welcome', False): self.tabs.removeTab(0)
-        t = EditorTab(self.tabs, path, content, self.current_theme, self.font_size, self.tab_width)
+        if self.tabs.count() == 1 and getattr(self.tabs.widget(0), 'is_welcome', False): self.close_current_tab(0)
+        t = EditorTab(self.tabs, path, content, self.current_theme, self.font_size, self.tab_width,
+                      large_file=self.is_large_file(content))
         i = self.tabs.addTab(t, t.get_title()); self.tabs.setCurrentIndex(i)
         t.editor.cursorPositionChanged.connect(self.update_status)
+        t.editor.completion_service = self.jedi_service
+        t.editor.ranker = self.ranker
+        t.editor.shared_words = self.shared_words
+        t.editor.word_index.set_bucket(self.shared_words.bucket(t.editor.current_lang))
         return t
+    def on_completions_ready(self, editor, revision, results, latency, source="Jedi"):
+        try: editor.on_completion_result(revision, results)
+        except RuntimeError: return # Pestaña cerrada mientras Jedi trabajaba
+        self.status_bar.showMessage(f"⚡ {source}: {latency:.0f} ms", 3000)
+    def on_diagnostics_ready(self, editor, diagnostics):
+        try: editor.parentWidget().set_diagnostics(diagnostics)
+        except RuntimeError: pass
     def update_status(self):
         t = self.tabs.currentWidget()
         if t and not getattr(t, 'is_welcome', False):
             c = t.editor.textCursor()
             self.lbl_cursor.setText(f"Ln {c.blockNumber()+1}, Col {c.columnNumber()+1}")
             self.lbl_lang.setText(t.editor.current_lang.upper())
+            msg = t.editor.diagnostic_message()
+            if msg: self.status_bar.showMessage(f"⚠️ {msg}", 4000)
+        self.btn_large.setVisible(bool(t) and getattr(t, 'large_file', False))
     def setup_status_bar(self):
         self.status_bar = self.statusBar(); self.lbl_lang = QLabel("Texto"); self.lbl_cursor = QLabel("Ln 1, Col 1")
+        # Indicador de modo archivo grande con menú para reactivar funciones
+        self.btn_large = QToolButton(); self.btn_large.setText("🐘 Archivo grande")
+        self.btn_large.setToolTip("Funciones reducidas para este archivo (clic para reactivarlas)")
+        self.btn_large.setPopupMode(QToolButton.InstantPopup); self.btn_large.setAutoRaise(True)
+        self.large_menu = QMenu(self); self.large_menu.aboutToShow.connect(self.build_large_file_menu)
+        self.btn_large.setMenu(self.large_menu); self.btn_large.hide()
+        self.status_bar.addPermanentWidget(self.btn_large)
         self.status_bar.addPermanentWidget(self.lbl_lang); self.status_bar.addPermanentWidget(self.lbl_cursor)
+    def build_large_file_menu(self):
+        self.large_menu.clear()
+        t = self.tabs.currentWidget()
+        if not t or not getattr(t, 'large_file', False): return
+        for name, label in LARGE_FILE_FEATURES:
+            act = self.large_menu.addAction(label); act.setCheckable(True); act.setChecked(t.large_features[name])
+            act.triggered.connect(lambda on, n=name, tab=t: tab.set_feature(n, on))
     
     # Este método ya leía dinámicamente de config, lo dejamos igual
     def show_welcome_tab(self):
@@ -761,25 +994,70 @@ class CapiEditor(QMainWindow):
         for i in range(self.tabs.count()):
             t = self.tabs.widget(i)
             if not getattr(t, 'is_welcome', False) and t.file_path and not t.saved:
-                try:
-                    with open(t.file_path, 'w', encoding='utf-8') as f: f.write(t.editor.toPlainText()); t.saved = True; self.update_tab_title(t)
-                except: pass
-    def update_tab_title(self, t): self.tabs.setTabText(self.tabs.indexOf(t), f"{'*' if not t.saved else ''}{t.get_title()}")
+                # Nunca encima de un cambio de fuera que aún no se ha visto (el vigilante espera unos ms)
+                if t.conflict or disk_signature(t.file_path) != t.disk_stat:
+                    if not t.conflict: self.check_disk_state(t)
+                    continue
+                self.write_tab(t)
+    def write_tab(self, t):
+        try:
+            with open(t.file_path, 'w', encoding='utf-8') as f: t.editor.doc_access.write_to(f)
+            t.disk_stat, t.conflict, t.saved = disk_signature(t.file_path), None, True
+            self.update_tab_title(t)
+            self.lsp.document_saved(t.editor) # Los índices se enteran por el vigilante
+        except: pass
+    def update_tab_title(self, t):
+        mark = '⚠ ' if getattr(t, 'conflict', None) else ''
+        self.tabs.setTabText(self.tabs.indexOf(t), f"{mark}{'*' if not t.saved else ''}{t.get_title()}")
     def close_current_tab(self, i=None): 
         idx = i if i is not None else self.tabs.currentIndex()
-        if idx != -1: self.tabs.removeTab(idx)
+        if idx == -1: return
+        t = self.tabs.widget(idx)
+        if hasattr(t, 'editor'):
+            if t.file_path: self.file_watcher.unwatch(t.file_path)
+            self.lsp.detach(t.editor)
+            t.editor.set_dynamic_words(False) # Sus palabras salen del índice compartido
+            t.editor.highlighter.stop_background() # Su hilo podía estar en pausa
+        self.tabs.removeTab(idx)
     def on_tab_change(self, i): 
-        t = self.tabs.currentWidget(); 
-        if t: t.editor.apply_theme(self.current_theme); self.update_status()
-    def save_current_file(self): self.auto_save()
+        # Sólo la pestaña visible trabaja; la anterior queda en pausa
+        t = self.tabs.currentWidget()
+        if self.active_tab is not None and self.active_tab is not t:
+            try: self.active_tab.set_active(False)
+            except RuntimeError: pass # Ya cerrada
+        self.active_tab = t
+        if t: t.set_active(True); self.update_status()
+    def save_current_file(self):
+        t = self.tabs.currentWidget()
+        if getattr(t, 'file_path', None) and not getattr(t, 'is_welcome', False) and not t.saved \
+                and (t.conflict or disk_signature(t.file_path) != t.disk_stat):
+            self.resolve_conflict(t)
+        self.auto_save()
+    def resolve_conflict(self, t):
+        """Guardar a mano sobre un archivo que cambió fuera: el usuario elige qué versión queda"""
+        box = QMessageBox(QMessageBox.Warning, "Cambios en disco",
+                          f"{t.get_title()} cambió en disco desde que lo abriste.", parent=self)
+        keep = box.addButton("Sobrescribir con la mía", QMessageBox.AcceptRole)
+        reload = box.addButton("Recargar del disco", QMessageBox.DestructiveRole)
+        box.addButton(QMessageBox.Cancel)
+        box.exec()
+        if box.clickedButton() is keep: self.write_tab(t)
+        elif box.clickedButton() is reload and not t.reload_from_disk():
+            QMessageBox.warning(self, "Cambios en disco", f"No se pudo leer {t.get_title()}")
     def save_file_as(self):
         t = self.tabs.currentWidget()
         if not t: return
         p, _ = QFileDialog.getSaveFileName(self, "Guardar", self.root_dir)
         if p:
-            t.file_path = p; self.save_current_file(); t.editor.file_path = p; self.update_tab_title(t)
+            if t.file_path: self.file_watcher.unwatch(t.file_path)
+            t.file_path = p; t.editor.file_path = p
+            t.saved, t.conflict = False, None # El diálogo ya preguntó si se sobrescribe
+            self.write_tab(t)
+            self.file_watcher.watch(p)
+            self.file_watcher.touch([p])
             try: from pygments.lexers import get_lexer_for_filename; t.editor.set_code_language(get_lexer_for_filename(p).aliases[0])
             except: pass
+            self.lsp.attach(t.editor)
 
     def show_shortcuts_dialog(self):
         dlg = ShortcutsDialog(THEMES.get(self.current_theme, {}), self)
@@ -789,7 +1067,8 @@ class CapiEditor(QMainWindow):
         dlg = AboutDialog(self.config, THEMES.get(self.current_theme, {}), icon_path, self)
         dlg.exec()
 
-    def show_global_search(self): GlobalSearchDialog(self.root_dir, self).exec()
+    def show_global_search(self): GlobalSearchDialog(self.root_dir, self, self.project_index).exec()
+    def show_quick_open(self): QuickOpenDialog(self.quick_open, self).exec()
     def toggle_console(self): self.term.hide() if self.term.isVisible() else self.term.show()
     def run_current_file(self):
         t = self.tabs.currentWidget()
@@ -798,7 +1077,7 @@ class CapiEditor(QMainWindow):
     def toggle_local_search(self): self.search.setVisible(not self.search.isVisible())
     def change_font_size(self, s): 
         self.font_size = s
-        for i in range(self.tabs.count()): self.tabs.widget(i).editor.update_font(s, self.tab_width)
+        for i in range(self.tabs.count()): self.tabs.widget(i).update_font(s, self.tab_width)
     def zoom_in(self): t = self.tabs.currentWidget(); t.editor.zoomIn(1) if t else None
     def zoom_out(self): t = self.tabs.currentWidget(); t.editor.zoomOut(1) if t else None
     def go_to_line(self):
@@ -808,7 +1087,8 @@ class CapiEditor(QMainWindow):
             if ok: c = t.editor.textCursor(); c.movePosition(QTextCursor.Start); c.movePosition(QTextCursor.Down, n=l-1); t.editor.setTextCursor(c); t.editor.centerCursor(); t.editor.setFocus()
     def toggle_minimap_global(self):
         self.minimap_enabled = not self.minimap_enabled
-        for i in range(self.tabs.count()): self.tabs.widget(i).minimap.setVisible(self.minimap_enabled)
+        for i in range(self.tabs.count()):
+            t = self.tabs.widget(i); t.minimap.setVisible(self.minimap_enabled and t.large_features['minimap'])
 
     def apply_theme(self, n):
         self.current_theme = n
@@ -913,17 +1193,26 @@ class CapiEditor(QMainWindow):
         
         self.sidebar_widget.update_theme(c)
         self.term.update_theme(c)
-        for i in range(self.tabs.count()):
-            self.tabs.widget(i).editor.apply_theme(n)
-            self.tabs.widget(i).minimap.apply_theme(c)
+        for i in range(self.tabs.count()): self.tabs.widget(i).apply_theme(n, c)
         
         self.save_session()
         
     def closeEvent(self, e):
         if hasattr(self, 'term'): self.term.stop_process()
+        stop_highlight_workers()
+        self.project_index.stop() # Guarda el índice antes de cerrar el pool que lo alimenta
+        self.quick_open.stop()
+        self.file_watcher.stop()
+        self.sidebar_widget.tree_view.operations.stop() # Cancela lo que quede a medias
+        self.sidebar_widget.f_model.shutdown()
+        SEARCH_POOL.shutdown()
+        self.jedi_service.stop()
+        self.lsp.shutdown()
+        self.ranker.save()
         self.save_session(); e.accept()
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support() # Procesos de la búsqueda global en el ejecutable de PyInstaller
     app = QApplication(sys.argv)
     
     # [NUEVO] Establecer el nombre interno de la aplicación
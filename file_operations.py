@@ -0,0 +1,246 @@
+import os
+import errno
+import shutil
+import threading
+import time
+from collections import deque
+from itertools import count
+from PySide6.QtCore import QThread, Signal
+
+PROGRESS_EVERY_MS = 100 # Avisos de progreso como mucho cada tanto (borrar node_modules son miles de archivos)
+ERRORS_KEPT = 20 # Errores que se guardan por operación; del resto sólo se cuentan
+
+# ==============================================================================
+#  COLA DE OPERACIONES CON ARCHIVOS
+# ==============================================================================
+# Copiar, mover, borrar y renombrar van a un hilo, una operación tras otra.
+# Cada operación lleva toda la selección y sus destinos se deciden al pedirla
+# (plan()), así el árbol puede mostrar el resultado antes de que termine. Se
+# puede cancelar entre archivo y archivo; lo ya hecho se queda hecho y la
+# relectura del árbol enseña lo que de verdad hay en disco.
+
+
+class Cancelled(Exception):
+    pass
+
+
+class FileOperation:
+    """Una operación de la cola sobre varias rutas a la vez"""
+    COPY, MOVE, DELETE, RENAME = 'copy', 'move', 'delete', 'rename'
+    VERBS = {COPY: "Copiando", MOVE: "Moviendo", DELETE: "Borrando", RENAME: "Renombrando"}
+    _ids = count(1)
+
+    def __init__(self, kind, pairs):
+        self.id = next(FileOperation._ids)
+        self.kind = kind
+        self.pairs = pairs # [(origen, destino)]; destino None al borrar
+        self.cancelled = False
+        self.done, self.total = 0, 0 # Archivos
+        self.errors = [] # (ruta, mensaje)
+        self.failed = 0
+        self.finished = [] # Pares que se completaron
+
+    def describe(self):
+        first = os.path.basename(self.pairs[0][0]) if self.pairs else ""
+        more = f" y {len(self.pairs) - 1} más" if len(self.pairs) > 1 else ""
+        return f"{FileOperation.VERBS[self.kind]} {first}{more}"
+
+    def error(self, path, e):
+        self.failed += 1
+        if len(self.errors) < ERRORS_KEPT: self.errors.append((path, getattr(e, 'strerror', None) or str(e)))
+
+
+def free_name(folder, name):
+    """`name` dentro de `folder`, o "nombre (copia N).ext" si ya existe"""
+    path = os.path.join(folder, name)
+    if not os.path.lexists(path): return path
+    stem, ext = os.path.splitext(name)
+    if os.path.isdir(path): stem, ext = name, ""
+    n = 1
+    while True:
+        path = os.path.join(folder, f"{stem} (copia{'' if n == 1 else f' {n}'}){ext}")
+        if not os.path.lexists(path): return path
+        n += 1
+
+
+def plan(kind, sources, target=None):
+    """Decide el destino de cada ruta. Para COPY y MOVE `target` es la carpeta
+    de destino; para RENAME, la ruta nueva. Devuelve (pares, errores)"""
+    pairs, errors = [], []
+    sources = [os.path.abspath(p) for p in sources]
+    # Si se eligió una carpeta y cosas de dentro, basta con la carpeta
+    chosen = set(sources)
+    sources = [p for p in dict.fromkeys(sources)
+               if not any(parent in chosen for parent in parents_of(p))]
+    if kind == FileOperation.DELETE: return [(p, None) for p in sources], errors
+    if kind == FileOperation.RENAME:
+        target = os.path.abspath(target)
+        if os.path.lexists(target): errors.append((target, "Ya existe"))
+        else: pairs.append((sources[0], target))
+        return pairs, errors
+    target = os.path.abspath(target)
+    for p in sources:
+        if target == p or target.startswith(p + os.sep): errors.append((p, "No se puede meter una carpeta dentro de sí misma")); continue
+        if kind == FileOperation.MOVE:
+            if os.path.dirname(p) == target: continue # Ya está ahí
+            dst = os.path.join(target, os.path.basename(p))
+            if os.path.lexists(dst): errors.append((dst, "Ya existe")); continue
+        else: dst = free_name(target, os.path.basename(p))
+        pairs.append((p, dst))
+    return pairs, errors
+
+
+def discard(path):
+    """Quita sin preguntar una copia a medias"""
+    if os.path.isdir(path) and not os.path.islink(path): shutil.rmtree(path, ignore_errors=True)
+    else:
+        try: os.remove(path)
+        except OSError: pass
+
+
+def parents_of(path):
+    parent = os.path.dirname(path)
+    while parent and parent != path:
+        yield parent
+        path, parent = parent, os.path.dirname(parent)
+
+
+class FileOperationQueue(QThread):
+    """Hace en su hilo, por orden, las operaciones que le llegan con submit().
+
+    started_op y finished_op llevan la FileOperation; progress, su número,
+    archivos hechos, total (0 si aún no se sabe) y la ruta en curso."""
+    started_op = Signal(object)
+    progress = Signal(int, int, int, str)
+    finished_op = Signal(object)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._cond = threading.Condition()
+        self._running = True
+        self._jobs = deque()
+        self.current = None
+        self.last_progress = 0
+
+    def submit(self, op):
+        with self._cond:
+            self._jobs.append(op)
+            self._cond.notify()
+        if not self.isRunning(): self.start()
+
+    def cancel(self):
+        """Cancela la operación en curso y las que esperan"""
+        with self._cond:
+            for op in self._jobs: op.cancelled = True
+            if self.current is not None: self.current.cancelled = True
+
+    def pending(self):
+        with self._cond: return len(self._jobs) + (self.current is not None)
+
+    def stop(self):
+        self.cancel()
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+        self.wait()
+
+    def run(self):
+        while True:
+            with self._cond:
+                while self._running and not self._jobs: self._cond.wait()
+                if not self._running: break
+                op = self.current = self._jobs.popleft()
+            try:
+                if not op.cancelled:
+                    self.started_op.emit(op)
+                    self.execute(op)
+            except Cancelled: pass
+            except Exception as e: op.error("", e)
+            with self._cond: self.current = None
+            self.finished_op.emit(op)
+
+    # --- Trabajo ---
+    def step(self, op, path):
+        """Un archivo más: mira si hay que parar y, de vez en cuando, avisa"""
+        if op.cancelled or not self._running: raise Cancelled()
+        op.done += 1
+        now = time.monotonic()
+        if (now - self.last_progress) * 1000 >= PROGRESS_EVERY_MS:
+            self.last_progress = now
+            self.progress.emit(op.id, op.done, op.total, path)
+
+    def count_files(self, op, path):
+        if not os.path.isdir(path) or os.path.islink(path): return 1
+        total = 0
+        stack = [path]
+        while stack:
+            if op.cancelled: raise Cancelled()
+            try:
+                with os.scandir(stack.pop()) as it:
+                    for e in it:
+                        if e.is_dir(follow_symlinks=False): stack.append(e.path)
+                        else: total += 1
+            except OSError: pass
+        return total
+
+    def execute(self, op):
+        if op.kind == FileOperation.RENAME:
+            for src, dst in op.pairs:
+                try: os.rename(src, dst); op.finished.append((src, dst))
+                except OSError as e: op.error(src, e)
+            return
+        if op.kind in (FileOperation.DELETE, FileOperation.COPY):
+            op.total = sum(self.count_files(op, src) for src, _ in op.pairs)
+            self.progress.emit(op.id, 0, op.total, "")
+        for src, dst in op.pairs:
+            failed = op.failed
+            try:
+                if op.kind == FileOperation.DELETE: self.delete(op, src)
+                elif op.kind == FileOperation.COPY: self.copy(op, src, dst)
+                else: self.move(op, src, dst)
+                if op.failed == failed: op.finished.append((src, dst)) # Sólo lo que salió entero
+            except OSError as e: op.error(src, e)
+
+    def delete(self, op, path):
+        """Como shutil.rmtree, pero archivo a archivo para avisar y poder parar"""
+        if not os.path.isdir(path) or os.path.islink(path):
+            os.remove(path); self.step(op, path); return
+        with os.scandir(path) as it: entries = list(it)
+        for e in entries:
+            if e.is_dir(follow_symlinks=False):
+                try: self.delete(op, e.path)
+                except OSError as err: op.error(e.path, err) # Se sigue con el resto
+                continue
+            try: os.remove(e.path)
+            except OSError as err: op.error(e.path, err)
+            self.step(op, e.path)
+        os.rmdir(path)
+
+    def copy(self, op, src, dst):
+        if not os.path.isdir(src) or os.path.islink(src):
+            shutil.copy2(src, dst, follow_symlinks=False); self.step(op, src); return
+        os.makedirs(dst)
+        with os.scandir(src) as it: entries = list(it)
+        for e in entries:
+            target = os.path.join(dst, e.name)
+            if e.is_dir(follow_symlinks=False): self.copy(op, e.path, target); continue
+            try: shutil.copy2(e.path, target, follow_symlinks=False)
+            except OSError as err: op.error(e.path, err)
+            self.step(op, e.path)
+        shutil.copystat(src, dst)
+
+    def move(self, op, src, dst):
+        try: os.rename(src, dst); self.step(op, src); return # Mismo disco: instantáneo
+        except OSError as e:
+            if e.errno != errno.EXDEV: raise
+        # Otro disco: copiar y luego borrar, con su progreso (cada archivo cuenta dos veces).
+        # El original sólo se borra si la copia llegó entera; si no, se quita la copia a medias.
+        op.total = op.done + 2 * self.count_files(op, src)
+        failed = op.failed
+        try: self.copy(op, src, dst)
+        except (Cancelled, OSError):
+            discard(dst); raise
+        if op.failed != failed:
+            discard(dst)
+            raise OSError(errno.EIO, "No se pudo copiar todo; el original se queda donde estaba")
+        self.delete(op, src)
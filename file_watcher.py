@@ -0,0 +1,328 @@
+import os
+import time
+import threading
+from collections import deque
+from PySide6.QtCore import QThread, QTimer, Signal, QFileSystemWatcher
+
+from project_walker import IGNORE_FILES, IgnoreMatcher, ignored_names
+
+DEBOUNCE_MS = 250 # Silencio que se espera antes de publicar un lote...
+MAX_DELAY_MS = 1000 # ... salvo que los avisos no paren: entonces se publica igual
+WATCH_CAP = 10000 # Carpetas vigiladas como mucho, por grande que sea el límite del sistema
+WATCH_SHARE = 2 # Del límite de inotify se usa como mucho 1/2 (lo comparten todos los programas)
+PINNED_RESERVE = 1024 # Huecos que el recorrido deja para el árbol y las pestañas abiertas
+CRAWL_CHUNK = 500 # Carpetas que se leen en el hilo entre dos miradas a los avisos
+DIRECTORY = None # Firma de una subcarpeta en una foto
+LINKED_DIRECTORY = 'link' # Enlace a carpeta: se lista pero no se recorre
+
+# ==============================================================================
+#  VIGILANTE DEL DISCO
+# ==============================================================================
+# Un solo QFileSystemWatcher para todo el editor. Vigila los archivos de las
+# pestañas, las carpetas desplegadas en el árbol y, mientras quede presupuesto
+# de inotify, las del proyecto de menos a más profundas. Los avisos sueltos se
+# juntan unos milisegundos; luego el hilo vuelve a leer esas carpetas, las
+# compara con la foto anterior (nombre -> mtime, tamaño, inodo) y publica un
+# único FileChanges. Inotify no avisa en una carpeta de que un archivo suyo se
+# reescribió en el sitio (sí de altas, bajas y renombrados, que es lo que
+# hacen git y los guardados atómicos): eso sólo se ve en los archivos
+# vigilados uno a uno, los de las pestañas.
+
+
+class FileChanges:
+    """Lote de cambios en disco (rutas absolutas)"""
+    __slots__ = ('created', 'modified', 'deleted', 'dirs')
+
+    def __init__(self):
+        self.created = set() # Archivos o carpetas nuevos
+        self.modified = set() # Archivos con otro contenido
+        self.deleted = set() # Archivos o carpetas que ya no están
+        self.dirs = set() # Carpetas cuyo listado cambió
+
+    def paths(self):
+        return self.created | self.modified | self.deleted
+
+    def __bool__(self):
+        return bool(self.created or self.modified or self.deleted or self.dirs)
+
+
+def disk_signature(path):
+    """(mtime, tamaño, inodo) de un archivo, o None si no existe"""
+    try: st = os.stat(path)
+    except OSError: return None
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+
+def watch_budget():
+    """Carpetas y archivos que se pueden vigilar sin agotar inotify"""
+    try:
+        with open('/proc/sys/fs/inotify/max_user_watches') as f: limit = int(f.read())
+    except (OSError, ValueError): limit = 8192 # Otros sistemas: un tope prudente
+    return max(PINNED_RESERVE * 2, min(WATCH_CAP, limit // WATCH_SHARE))
+
+
+class FileWatcher(QThread):
+    """Publica en `changed` los cambios del disco en lotes.
+
+    watch()/unwatch() fijan rutas concretas (archivos de las pestañas,
+    carpetas desplegadas en el árbol); open_project() recorre el proyecto en
+    el hilo y vigila sus carpetas hasta agotar el presupuesto. touch() avisa
+    de cambios hechos por el propio editor, para que lleguen por el mismo
+    camino aunque su carpeta no esté vigilada."""
+    changed = Signal(object) # FileChanges
+    dirs_found = Signal(str, list) # raíz, carpetas leídas por el recorrido (para vigilarlas)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._cond = threading.Condition()
+        self._running = True
+        self._crawl_job = None # (raíz, carpetas como mucho)
+        self._dirs, self._files, self._hints = set(), set(), set()
+        self._baseline, self._forget = set(), set()
+        # Sólo del hilo
+        self.snapshots = {} # carpeta -> {nombre: firma}
+        self.matcher = None
+        self.crawl_root = None
+        self.crawl = deque()
+        self.crawl_left = 0
+        # Sólo de la interfaz
+        self.root = None
+        self.budget = watch_budget()
+        self.pinned = set()
+        self.background = set()
+        self.warned = False
+        self.pending_dirs, self.pending_files, self.pending_hints = set(), set(), set()
+        self.first_event = None
+        self.fs = QFileSystemWatcher(self)
+        self.fs.directoryChanged.connect(self._on_directory_event)
+        self.fs.fileChanged.connect(self._on_file_event)
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(DEBOUNCE_MS)
+        self.timer.timeout.connect(self.flush)
+        self.dirs_found.connect(self._add_background)
+        self.changed.connect(self._after_batch) # Antes que nadie: deja las vigilancias al día
+
+    # --- Interfaz ---
+    def open_project(self, root):
+        self.root = os.path.abspath(root)
+        stale = [p for p in self.background if p not in self.pinned]
+        if stale: self.fs.removePaths(stale)
+        self.background = set()
+        self._submit(lambda: setattr(self, '_crawl_job', (self.root, self.budget - PINNED_RESERVE)))
+
+    def watch(self, path):
+        """Vigila una ruta concreta hasta unwatch()"""
+        path = os.path.abspath(path)
+        if path in self.pinned: return
+        self.pinned.add(path)
+        if path in self.background: return
+        if not self._add(path): return
+        if os.path.isdir(path): self._submit(lambda: self._baseline.add(path))
+
+    def unwatch(self, path):
+        path = os.path.abspath(path)
+        if path not in self.pinned: return
+        self.pinned.discard(path)
+        if path in self.background: return
+        self.fs.removePath(path)
+        self._submit(lambda: self._forget.add(path))
+
+    def touch(self, paths):
+        """Rutas que el editor acaba de crear, renombrar o borrar"""
+        self.pending_hints.update(os.path.abspath(p) for p in paths)
+        self._schedule()
+
+    def _add(self, path):
+        if len(self.pinned) + len(self.background) > self.budget:
+            self._warn(); return False
+        return self.fs.addPath(path)
+
+    def _warn(self):
+        if not self.warned:
+            self.warned = True
+            print(f"⚠️ Límite de vigilancia alcanzado ({self.budget} rutas): algunos cambios en disco no se verán")
+
+    def _add_background(self, root, paths):
+        if root != self.root: return # Proyecto anterior
+        room = self.budget - len(self.pinned) - len(self.background)
+        paths = [p for p in paths if p not in self.pinned]
+        if len(paths) > room: self._warn(); paths = paths[:max(0, room)]
+        if not paths: return
+        failed = set(self.fs.addPaths(paths))
+        self.background.update(p for p in paths if p not in failed)
+
+    def _on_directory_event(self, path):
+        self.pending_dirs.add(path); self._schedule()
+
+    def _on_file_event(self, path):
+        self.pending_files.add(path); self._schedule()
+
+    def _schedule(self):
+        now = time.monotonic()
+        if self.first_event is None: self.first_event = now
+        # Se reinicia la espera con cada aviso, pero sin pasarse de MAX_DELAY_MS
+        if (now - self.first_event) * 1000 < MAX_DELAY_MS - DEBOUNCE_MS or not self.timer.isActive(): self.timer.start()
+
+    def flush(self):
+        self.first_event = None
+        dirs, files, hints = self.pending_dirs, self.pending_files, self.pending_hints
+        self.pending_dirs, self.pending_files, self.pending_hints = set(), set(), set()
+        def queue():
+            self._dirs |= dirs; self._files |= files; self._hints |= hints
+        self._submit(queue)
+
+    def _after_batch(self, batch):
+        if batch.deleted: self.background &= set(self.fs.directories()) # inotify suelta las carpetas borradas
+        watched = set(self.fs.files())
+        for p in batch.created | batch.modified: # Un guardado atómico cambia el inodo y se pierde la vigilancia
+            if p in self.pinned and p not in watched and os.path.isfile(p): self.fs.addPath(p)
+
+    def _submit(self, change):
+        with self._cond:
+            change()
+            self._cond.notify()
+        if not self.isRunning(): self.start()
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+        self.wait()
+
+    # --- Hilo ---
+    def interrupted(self):
+        return not self._running or self._crawl_job is not None
+
+    def run(self):
+        while True:
+            with self._cond:
+                while self._running and not (self._crawl_job or self._dirs or self._files or self._hints
+                                             or self._baseline or self._forget or self.crawl):
+                    self._cond.wait()
+                if not self._running: break
+                job, self._crawl_job = self._crawl_job, None
+                dirs, files, hints = self._dirs, self._files, self._hints
+                baseline, forget = self._baseline, self._forget
+                self._dirs, self._files, self._hints = set(), set(), set()
+                self._baseline, self._forget = set(), set()
+            try:
+                if job is not None: self.start_crawl(*job)
+                for path in forget: self.snapshots.pop(path, None)
+                for path in baseline:
+                    if path not in self.snapshots:
+                        snap = self.scan(path)
+                        if snap is not None: self.snapshots[path] = snap
+                if dirs or files or hints:
+                    batch = self.collect(dirs, files, hints)
+                    if batch: self.changed.emit(batch)
+                if self.crawl: self.crawl_step()
+            except Exception as e: print(f"⚠️ Error vigilando el disco: {e}")
+
+    def start_crawl(self, root, limit):
+        self.matcher = IgnoreMatcher(root)
+        prefix = root + os.sep
+        # Las fotos de otro proyecto sobran; las de este (carpetas fijadas) siguen valiendo
+        self.snapshots = {p: s for p, s in self.snapshots.items() if p == root or p.startswith(prefix)}
+        self.crawl_root, self.crawl, self.crawl_left = root, deque([root]), limit
+
+    def crawl_step(self):
+        """Lee la siguiente tanda de carpetas del recorrido, de menos a más profundas"""
+        found = []
+        while self.crawl and self.crawl_left > 0 and len(found) < CRAWL_CHUNK and not self.interrupted():
+            path = self.crawl.popleft()
+            snap = self.snapshots.get(path)
+            if snap is None:
+                snap = self.scan(path)
+                if snap is None: continue
+                self.snapshots[path] = snap
+            self.crawl_left -= 1
+            found.append(path)
+            self.crawl.extend(os.path.join(path, name) for name, sig in snap.items() if sig is DIRECTORY)
+        if self.crawl_left <= 0: self.crawl.clear()
+        if found: self.dirs_found.emit(self.crawl_root, found)
+
+    def rel(self, path):
+        """Carpeta relativa al proyecto ('' la raíz), o None si está fuera"""
+        root = self.crawl_root
+        if root is None: return None
+        if path == root: return ''
+        if not path.startswith(root + os.sep): return None
+        return path[len(root) + 1:].replace(os.sep, '/')
+
+    def scan(self, path):
+        """Foto de una carpeta sin lo ignorado: {nombre: firma}, o None si ya no existe"""
+        snap, files, dirs = {}, [], []
+        try:
+            with os.scandir(path) as it:
+                for e in it:
+                    try:
+                        if e.is_dir():
+                            dirs.append(e.name)
+                            snap[e.name] = LINKED_DIRECTORY if e.is_symlink() else DIRECTORY
+                        else:
+                            st = e.stat()
+                            files.append(e.name)
+                            snap[e.name] = hash((st.st_mtime_ns, st.st_size, st.st_ino))
+                    except OSError: pass
+        except OSError: return None
+        rel = self.rel(path)
+        if rel is not None:
+            for name in ignored_names(self.matcher.chain_for(rel), rel, files, dirs): del snap[name]
+        return snap
+
+    def drop(self, path):
+        """Olvida la foto de una carpeta borrada y las de sus subcarpetas"""
+        prefix = path + os.sep
+        for p in [p for p in self.snapshots if p == path or p.startswith(prefix)]:
+            del self.snapshots[p]
+            self.crawl_left += 1 # Su hueco queda para otras
+
+    def collect(self, dirs, files, hints):
+        batch = FileChanges()
+        if self.matcher is not None and any(os.path.basename(p) in IGNORE_FILES for p in dirs | files | hints):
+            self.matcher.forget()
+        for path in hints: # Las de carpetas con foto salen de comparar la carpeta
+            parent = os.path.dirname(path)
+            if parent in self.snapshots: dirs.add(parent)
+            else:
+                (batch.created if os.path.exists(path) else batch.deleted).add(path)
+                batch.dirs.add(parent)
+        for path in dirs: self.compare(path, batch)
+        for path in files:
+            if path in batch.created or path in batch.deleted: continue
+            signature = disk_signature(path)
+            (batch.modified if signature is not None else batch.deleted).add(path)
+            snap = self.snapshots.get(os.path.dirname(path)) # Se pone al día para no avisar dos veces
+            name = os.path.basename(path)
+            if snap is not None and snap.get(name, DIRECTORY) is not DIRECTORY:
+                if signature is None: del snap[name]
+                else: snap[name] = hash(signature)
+        return batch
+
+    def compare(self, path, batch):
+        old = self.snapshots.get(path)
+        new = self.scan(path)
+        if new is None: # La carpeta ya no está
+            if old is not None: batch.deleted.add(path); self.drop(path)
+            return
+        if old is None: # Sin foto no hay con qué comparar: sólo se sabe que cambió el listado
+            batch.dirs.add(path)
+            return
+        self.snapshots[path] = new
+        listed = False
+        for name, sig in new.items():
+            was = old.get(name, False)
+            if was == sig: continue
+            child = os.path.join(path, name)
+            if was is False or was is DIRECTORY or sig is DIRECTORY or sig == LINKED_DIRECTORY:
+                batch.created.add(child); listed = True
+                if was is DIRECTORY: self.drop(child) # Era una carpeta y ahora es otra cosa
+                if sig is DIRECTORY and self.rel(child) is not None: self.crawl.append(child)
+            else: batch.modified.add(child)
+        for name, was in old.items():
+            if name in new: continue
+            child = os.path.join(path, name)
+            batch.deleted.add(child); listed = True
+            if was is DIRECTORY: self.drop(child)
+        if listed: batch.dirs.add(path)
@@ -0,0 +1,596 @@
+import time
+import threading
+from PySide6.QtCore import QThread, QTimer, Signal
+from PySide6.QtGui import QColor, QTextCharFormat, QFont, QSyntaxHighlighter, QTextBlockUserData, QTextLayout
+
+try:
+    from pygments.lexer import RegexLexer, ExtendedRegexLexer
+    from pygments.lexers import get_lexer_by_name
+    from pygments.lexers.php import PhpLexer
+    from pygments.token import Token, Error, Whitespace, _TokenType
+except ImportError as e:
+    print(f"❌ Error faltan librerías externas: {e}")
+    get_lexer_by_name = None
+
+from utils import THEMES
+
+# A partir de estas líneas el documento se tokeniza en un hilo aparte
+BACKGROUND_MIN_BLOCKS = 3000
+# Presupuesto por tanda al aplicar resultados del hilo (ms)
+APPLY_BUDGET_MS = 8
+
+# Lenguajes que se resaltan con el lexer de PHP en modo "inline"
+PHP_INLINE_LANGS = ('php', 'blade')
+
+# Comentarios multilínea que Pygments solo reconoce con una única regex:
+# línea a línea no se cierran nunca, así que los seguimos nosotros
+BLOCK_COMMENTS = {
+    'javascript': (('/*', '*/'),),
+    'css': (('/*', '*/'),),
+    'php': (('/*', '*/'),),
+    'blade': (('/*', '*/'),),
+    'html': (('<!--', '-->'),),
+}
+
+# Lenguajes incrustados: (etiqueta de apertura, etiqueta de cierre, lenguaje)
+EMBEDDED_LANGS = {
+    'html': (('<script', '</script', 'javascript'), ('<style', '</style', 'css')),
+}
+
+
+def tag_for_token(token_type):
+    """Traduce un tipo de token de Pygments a una etiqueta del tema"""
+    if token_type in Token.Keyword: return "keyword"
+    if token_type in Token.Name.Tag: return "tag"
+    if token_type in Token.Name.Attribute: return "attribute"
+    if token_type in Token.Literal.String: return "string"
+    if token_type in Token.Name.Builtin: return "builtin"
+    if token_type in Token.Name.Variable: return "variable"
+    if token_type in Token.Comment: return "comment"
+    if token_type in Token.Operator: return "operator"
+    if token_type in Token.Literal.Number: return "number"
+    if token_type in Token.Name.Function: return "function"
+    if token_type in Token.Name.Class: return "class"
+    if token_type in Token.Name: return "attribute"
+    return None
+
+
+class TokenFormatMap(dict):
+    """Tipo de token -> QTextCharFormat de un tema, resuelto una sola vez por tipo"""
+    def __init__(self, formats):
+        super().__init__()
+        self.formats = formats
+
+    def __missing__(self, token_type):
+        fmt = self.formats.get(tag_for_token(token_type))
+        self[token_type] = fmt
+        return fmt
+
+
+# ==============================================================================
+#  TOKENIZADOR REANUDABLE
+# ==============================================================================
+
+def initial_stack(lexer):
+    if getattr(lexer, 'startinline', False) and 'php' in getattr(lexer, '_tokens', {}):
+        return ('root', 'php')
+    return ('root',)
+
+
+def lex_range(lexer, text, pos, end, stack, spans):
+    """Tokeniza text[pos:end] partiendo de la pila `stack`.
+    Añade (inicio, largo, tipo) a `spans` y devuelve la pila final."""
+    if pos >= end: return stack
+    if not isinstance(lexer, RegexLexer) or isinstance(lexer, ExtendedRegexLexer):
+        # Lexers sin pila de estados: se tokeniza el tramo por separado
+        for index, token_type, value in lexer.get_tokens_unprocessed(text[pos:end]):
+            spans.append((pos + index, len(value), token_type))
+        return stack
+
+    # Mismo bucle que RegexLexer.get_tokens_unprocessed, pero conservando la pila
+    builtins = lexer._functions if isinstance(lexer, PhpLexer) else ()
+    tokendefs = lexer._tokens
+    statestack = list(stack)
+    try: statetokens = tokendefs[statestack[-1]]
+    except KeyError:
+        statestack = list(initial_stack(lexer))
+        statetokens = tokendefs[statestack[-1]]
+    while pos < end:
+        for rexmatch, action, new_state in statetokens:
+            m = rexmatch(text, pos, end)
+            if m:
+                if action is not None:
+                    if type(action) is _TokenType:
+                        value = m.group()
+                        if builtins and action is Token.Name.Other and value in builtins:
+                            action = Token.Name.Builtin
+                        spans.append((pos, len(value), action))
+                    else:
+                        for index, token_type, value in action(lexer, m):
+                            spans.append((index, len(value), token_type))
+                pos = m.end()
+                if new_state is not None:
+                    if isinstance(new_state, tuple):
+                        for state in new_state:
+                            if state == '#pop':
+                                if len(statestack) > 1: statestack.pop()
+                            elif state == '#push':
+                                statestack.append(statestack[-1])
+                            else:
+                                statestack.append(state)
+                    elif isinstance(new_state, int):
+                        if abs(new_state) >= len(statestack): del statestack[1:]
+                        else: del statestack[new_state:]
+                    elif new_state == '#push':
+                        statestack.append(statestack[-1])
+                    statetokens = tokendefs[statestack[-1]]
+                break
+        else:
+            if text[pos] == '\n':
+                # Fin de línea sin regla: Pygments vuelve a "root"
+                statestack = ['root']
+                statetokens = tokendefs['root']
+                spans.append((pos, 1, Whitespace))
+            else:
+                spans.append((pos, 1, Error))
+            pos += 1
+    return tuple(statestack)
+
+
+def _is_literal(spans, first, index):
+    """True si la posición cae dentro de un comentario o una cadena"""
+    for i in range(len(spans) - 1, first - 1, -1):
+        start, length, token_type = spans[i]
+        if start <= index:
+            return index < start + length and (token_type in Token.Comment or token_type in Token.Literal.String)
+    return False
+
+
+def _cut_spans(spans, first, at):
+    while len(spans) > first and spans[-1][0] >= at: spans.pop()
+    if len(spans) > first:
+        start, length, token_type = spans[-1]
+        if start + length > at: spans[-1] = (start, at - start, token_type)
+
+
+class LineTokenizer:
+    """Tokeniza un bloque a partir del estado en que terminó el anterior.
+
+    El estado es una tupla (lenguaje incrustado, pila del lexer, cierre de
+    comentario pendiente), así que es hashable y se puede guardar por bloque."""
+    def __init__(self, language, cache):
+        self.language = language
+        self.cache = cache
+        self.lexer = cache.get_lexer(language)
+        self.initial_state = (None, initial_stack(self.lexer), None)
+
+    def tokenize(self, text, state):
+        sub, stack, closer = state
+        line = text + "\n"
+        n = len(text)
+        lower = None
+        spans = []
+        pos = 0
+        while True:
+            if closer:
+                i = text.find(closer, pos)
+                stop = n if i < 0 else i + len(closer)
+                if stop > pos: spans.append((pos, stop - pos, Token.Comment.Multiline))
+                if i < 0: break
+                pos, closer = stop, None
+                continue
+
+            lang = sub or self.language
+            lexer = self.cache.get_lexer(lang) if sub else self.lexer
+            if lexer is None: break
+            end = n + 1
+            if sub:
+                if lower is None: lower = line.lower()
+                i = lower.find(self._closing_tag(sub), pos)
+                if i >= 0: end = i
+
+            first = len(spans)
+            new_stack = lex_range(lexer, line, pos, end, stack, spans)
+            opening = self._find_opening(lang, line, spans, first, pos, min(end, n))
+            if opening:
+                at, resume, kind, value = opening
+                _cut_spans(spans, first, resume)
+                if kind == 'comment':
+                    stack = lex_range(lexer, line, pos, at, stack, [])
+                    closer = value
+                else:
+                    sub = value
+                    stack = initial_stack(self.cache.get_lexer(sub))
+                pos = resume
+                continue
+
+            stack = new_stack
+            if sub and end <= n:
+                # Cierre de </script> o </style>: vuelve el lenguaje anfitrión
+                sub, stack, pos = None, initial_stack(self.lexer), end
+                continue
+            break
+
+        _cut_spans(spans, 0, n)
+        return spans, (sub, stack, closer)
+
+    def _closing_tag(self, sub):
+        for _, close_tag, lang in EMBEDDED_LANGS.get(self.language, ()):
+            if lang == sub: return close_tag
+        return "\0"
+
+    def _find_opening(self, lang, line, spans, first, pos, end):
+        """Primer comentario o bloque incrustado que se abre en la línea y no se cierra"""
+        best = None
+        for opener, closer in BLOCK_COMMENTS.get(lang, ()):
+            i = line.find(opener, pos, end)
+            while i >= 0 and _is_literal(spans, first, i):
+                i = line.find(opener, i + 1, end)
+            if i >= 0 and line.find(closer, i + len(opener), end) < 0:
+                best = (i, i, 'comment', closer)
+        if lang == self.language:
+            lower = line.lower()
+            for tag, close_tag, sub in EMBEDDED_LANGS.get(lang, ()):
+                i = lower.find(tag, pos, end)
+                if i < 0 or (best and best[0] < i) or _is_literal(spans, first, i): continue
+                if lower[i + len(tag):i + len(tag) + 1] not in ('>', ' ', '\t', ''): continue
+                gt = line.find('>', i, end)
+                if gt < 0 or lower.find(close_tag, gt, end) >= 0: continue
+                best = (i, gt + 1, 'embedded', sub)
+        return best
+
+
+# ==============================================================================
+#  CACHÉ COMPARTIDA DE LEXERS Y FORMATOS
+# ==============================================================================
+
+class LexerCache:
+    """Un lexer por lenguaje y un mapa de formatos por tema, compartidos por todas las pestañas"""
+    def __init__(self):
+        self._lexers = {}
+        self._tokenizers = {}
+        self._token_formats = {}
+        self._state_ids = {}
+        self._states = []
+
+    def get_lexer(self, language):
+        if language in self._lexers: return self._lexers[language]
+        lexer = None
+        if get_lexer_by_name and language != "text":
+            try:
+                if language in PHP_INLINE_LANGS:
+                    lexer = get_lexer_by_name("php", startinline=True)
+                else:
+                    lexer = get_lexer_by_name(language)
+            except Exception: lexer = None
+        self._lexers[language] = lexer
+        return lexer
+
+    def get_tokenizer(self, language):
+        if language not in self._tokenizers:
+            tokenizer = LineTokenizer(language, self) if self.get_lexer(language) else None
+            self._tokenizers[language] = tokenizer
+        return self._tokenizers[language]
+
+    def state_id(self, state):
+        """Estado del tokenizador -> entero para setCurrentBlockState"""
+        sid = self._state_ids.get(state)
+        if sid is None:
+            sid = self._state_ids[state] = len(self._states)
+            self._states.append(state)
+        return sid
+
+    def state_of(self, sid):
+        return self._states[sid] if 0 <= sid < len(self._states) else None
+
+    def get_token_formats(self, theme_name):
+        if theme_name not in self._token_formats:
+            self._token_formats[theme_name] = TokenFormatMap(self._build_formats(theme_name))
+        return self._token_formats[theme_name]
+
+    def _build_formats(self, theme_name):
+        theme_tags = THEMES.get(theme_name, THEMES['Dark']).get('tags', {})
+        formats = {}
+        for tag, hex_color in theme_tags.items():
+            fmt = QTextCharFormat()
+            fmt.setForeground(QColor(hex_color))
+            if tag in ['keyword', 'class']: fmt.setFontWeight(QFont.Bold)
+            if tag == 'comment': fmt.setFontItalic(True)
+            formats[tag] = fmt
+        return formats
+
+
+LEXER_CACHE = LexerCache()
+
+
+# ==============================================================================
+#  CLASE: HIGHLIGHTER
+# ==============================================================================
+
+class BlockData(QTextBlockUserData):
+    """Punto de control del lexer: estado de entrada, de salida y tokens del bloque"""
+    def __init__(self, tokenizer, text_hash, start_state, end_state, spans):
+        super().__init__()
+        self.tokenizer = tokenizer
+        self.text_hash = text_hash
+        self.start_state = start_state
+        self.end_state = end_state
+        self.spans = spans
+        self.theme_name = None # Tema con el que se aplicaron los formatos
+
+
+# Hilos en marcha: se mantienen vivos aunque se cierre la pestaña que los lanzó
+_RUNNING_WORKERS = set()
+
+
+def stop_highlight_workers():
+    """Cancela y espera a los hilos de resaltado (al cerrar la ventana)"""
+    for worker in list(_RUNNING_WORKERS):
+        worker.cancel()
+        worker.wait()
+
+
+class HighlightWorker(QThread):
+    """Tokeniza una copia de las líneas del documento fuera del hilo de la interfaz"""
+    chunk_ready = Signal(object, int, list) # hilo, primer bloque, resultados
+    def __init__(self, tokenizer, lines, chunk_size=500):
+        super().__init__()
+        self.tokenizer, self.lines, self.chunk_size = tokenizer, lines, chunk_size
+        self.cancelled = False
+        self.running = threading.Event() # Sin marcar = en pausa (pestaña oculta)
+        self.running.set()
+        _RUNNING_WORKERS.add(self)
+        self.finished.connect(lambda: _RUNNING_WORKERS.discard(self))
+
+    def run(self):
+        tokenizer = self.tokenizer
+        state = tokenizer.initial_state
+        first, results = 0, []
+        for text in self.lines:
+            if self.cancelled: return
+            spans, end = tokenizer.tokenize(text, state)
+            results.append((hash(text), state, end, spans))
+            state = end
+            if len(results) >= self.chunk_size:
+                self.chunk_ready.emit(self, first, results)
+                first, results = first + len(results), []
+                self.yieldCurrentThread()
+                self.running.wait()
+        if results and not self.cancelled: self.chunk_ready.emit(self, first, results)
+
+    def cancel(self):
+        self.cancelled = True
+        self.running.set() # Si estaba en pausa, que despierte para terminar
+
+
+class PySideHighlighter(QSyntaxHighlighter):
+    def __init__(self, parent, language="text", theme_name="Dark"):
+        super().__init__(parent)
+        self.language = language
+        self.theme_name = theme_name
+        self.tokenizer = None
+        self.token_formats = {}
+        self.setup_formats()
+        self.tokenizer = LEXER_CACHE.get_tokenizer(self.language)
+
+        # Modo en segundo plano: los bloques >= frontier aún no tienen tokens
+        self.worker = None
+        self.frontier = 0
+        self.applied_upto = 0
+        self.applied_early = set()
+        self.paused = False # Pestaña oculta: el hilo de tokenización espera
+        self.bulk = False # Dentro de begin_bulk_edit/end_bulk_edit
+        self.visible_range = None # Callable -> (primer, último) bloque visible
+        self.apply_timer = QTimer(self)
+        self.apply_timer.setInterval(0)
+        self.apply_timer.timeout.connect(self._apply_pending)
+
+        # Modo solo viewport (archivos grandes): el resaltador se desconecta del
+        # documento y se pintan a mano los bloques visibles, sin arrastrar estado
+        self.target_document = parent
+        self.viewport_only = False
+        self.manual_timer = QTimer(self)
+        self.manual_timer.setSingleShot(True)
+        self.manual_timer.setInterval(0)
+        self.manual_timer.timeout.connect(self._refresh_visible)
+
+    def setup_formats(self):
+        self.token_formats = LEXER_CACHE.get_token_formats(self.theme_name)
+
+    def set_language(self, l):
+        self.language = l.lower()
+        self.tokenizer = LEXER_CACHE.get_tokenizer(self.language)
+        self.stop_background()
+        if self.viewport_only:
+            self._refresh_visible()
+            return
+        doc = self.document()
+        if self.tokenizer and doc and doc.blockCount() >= BACKGROUND_MIN_BLOCKS:
+            self.start_background()
+        else:
+            self.rehighlight()
+
+    def set_theme(self, t):
+        if t == self.theme_name: return
+        self.theme_name = t
+        self.setup_formats()
+        # Los tokens no dependen del tema: solo se recolorea lo visible y el
+        # resto se pone al día al desplazarse (refresh_range)
+        if self.visible_range: self.refresh_range(*self.visible_range())
+        else: self.rehighlight()
+
+    def refresh_range(self, first, last):
+        """Reaplica el tema actual a los bloques [first, last] que lo tengan desactualizado"""
+        if self.viewport_only:
+            self._paint_range(first, last)
+            return
+        block = self.target_document.findBlockByNumber(first)
+        while block.isValid() and block.blockNumber() <= last:
+            data = block.userData()
+            if data is not None and data.theme_name != self.theme_name:
+                self.rehighlightBlock(block)
+            block = block.next()
+
+    # --- MODO SOLO VIEWPORT ---
+    def set_viewport_only(self, enabled):
+        if enabled == self.viewport_only: return
+        self.viewport_only = enabled
+        doc = self.target_document
+        if enabled:
+            self.stop_background()
+            self.setDocument(None) # Qt deja de llamar a highlightBlock por cada bloque
+            doc.contentsChange.connect(self._on_manual_change)
+        else:
+            doc.contentsChange.disconnect(self._on_manual_change)
+            self.setDocument(doc)
+            self.set_language(self.language)
+
+    # --- EDICIONES MASIVAS ---
+    def begin_bulk_edit(self):
+        """Antes de un cambio que toca miles de bloques (reemplazar todo): Qt
+        llama a highlightBlock por cada bloque del cambio, así que mientras dure
+        no se tokeniza nada. end_bulk_edit retokeniza después en segundo plano."""
+        doc = self.target_document
+        if self.viewport_only or self.tokenizer is None or doc.blockCount() < BACKGROUND_MIN_BLOCKS: return False
+        self.stop_background()
+        self.bulk = True
+        return True
+
+    def end_bulk_edit(self):
+        self.bulk = False
+        self.set_language(self.language)
+
+    def _on_manual_change(self, pos, removed, added):
+        self.manual_timer.start()
+
+    def _refresh_visible(self):
+        if self.visible_range: self.refresh_range(*self.visible_range())
+
+    def _paint_range(self, first, last):
+        """Tokeniza cada bloque visible por separado y le aplica los formatos directamente"""
+        tokenizer = self.tokenizer
+        if tokenizer is None: return
+        doc = self.target_document
+        token_formats = self.token_formats
+        block = doc.findBlockByNumber(first)
+        while block.isValid() and block.blockNumber() <= last:
+            text = block.text()
+            text_hash = hash(text)
+            data = block.userData()
+            if data is None or data.tokenizer is not tokenizer or data.text_hash != text_hash:
+                start = tokenizer.initial_state
+                spans, end = tokenizer.tokenize(text, start)
+                data = BlockData(tokenizer, text_hash, start, end, spans)
+                block.setUserData(data)
+            elif data.theme_name == self.theme_name:
+                block = block.next()
+                continue
+            ranges = []
+            for index, length, token_type in data.spans:
+                fmt = token_formats[token_type]
+                if fmt is not None:
+                    r = QTextLayout.FormatRange()
+                    r.start, r.length, r.format = index, length, fmt
+                    ranges.append(r)
+            block.layout().setFormats(ranges)
+            data.theme_name = self.theme_name
+            doc.markContentsDirty(block.position(), block.length())
+            block = block.next()
+
+    # --- TOKENIZACIÓN EN SEGUNDO PLANO ---
+    def start_background(self):
+        """Tokeniza el documento en un hilo y aplica los resultados por tandas"""
+        doc = self.document()
+        self.worker = HighlightWorker(self.tokenizer, doc.toPlainText().split("\n"))
+        self.worker.chunk_ready.connect(self._on_chunk_ready)
+        if self.paused: self.worker.running.clear()
+        self.frontier, self.applied_upto = 0, 0
+        self.applied_early = set()
+        self.rehighlight() # Limpia formatos anteriores; todo queda pendiente
+        self.worker.start()
+        if not self.paused: self.apply_timer.start()
+
+    def stop_background(self):
+        if self.worker:
+            self.worker.cancel()
+            self.worker.chunk_ready.disconnect(self._on_chunk_ready)
+            self.worker = None
+        self.apply_timer.stop()
+        self.frontier = 0
+
+    def set_paused(self, paused):
+        """Detiene (o reanuda) la tokenización en segundo plano de una pestaña oculta.
+        El hilo se para en el siguiente fin de tanda; al reanudar sigue donde estaba."""
+        self.paused = paused
+        if self.worker is None: return
+        if paused: self.apply_timer.stop(); self.worker.running.clear()
+        else: self.worker.running.set(); self.apply_timer.start()
+
+    def _on_chunk_ready(self, worker, first, results):
+        """Guarda el punto de control de cada bloque; el formato se aplica después"""
+        # Tandas que ya estaban en la cola de eventos de un hilo parado o sustituido
+        if worker is not self.worker: return
+        block = self.document().findBlockByNumber(first)
+        tokenizer = worker.tokenizer
+        for text_hash, start, end, spans in results:
+            if not block.isValid(): break
+            block.setUserData(BlockData(tokenizer, text_hash, start, end, spans))
+            block.setUserState(LEXER_CACHE.state_id(end))
+            block = block.next()
+        self.frontier = first + len(results)
+
+    def _apply_pending(self):
+        doc = self.document()
+        deadline = time.perf_counter() + APPLY_BUDGET_MS / 1000
+        # 1. Primero lo que está a la vista
+        if self.visible_range:
+            first, last = self.visible_range()
+            block = doc.findBlockByNumber(max(first, self.applied_upto))
+            while block.isValid() and block.blockNumber() <= min(last, self.frontier - 1):
+                num = block.blockNumber()
+                if num not in self.applied_early:
+                    self.rehighlightBlock(block)
+                    self.applied_early.add(num)
+                block = block.next()
+        # 2. Después el resto, en orden y con presupuesto de tiempo
+        block = doc.findBlockByNumber(self.applied_upto)
+        while block.isValid() and self.applied_upto < self.frontier:
+            if self.applied_upto not in self.applied_early:
+                self.rehighlightBlock(block)
+            self.applied_upto += 1
+            block = block.next()
+            if time.perf_counter() > deadline: return
+        if self.worker and self.frontier < len(self.worker.lines): return
+        # Terminado: se vuelve al modo síncrono normal
+        self.worker = None
+        self.apply_timer.stop()
+        self.applied_early = set()
+        if block.isValid(): self.rehighlightBlock(block) # Líneas añadidas mientras tanto
+
+    def highlightBlock(self, text):
+        tokenizer = self.tokenizer
+        if tokenizer is None or self.bulk: return
+        # Se reanuda desde el estado del bloque anterior; Qt sigue con el
+        # siguiente bloque solo mientras el estado de salida cambie
+        block = self.currentBlock()
+        if self.worker is not None and block.blockNumber() >= self.frontier:
+            # Todavía no ha llegado del hilo: se deja sin color y sin estado
+            self.setCurrentBlockState(-1)
+            return
+        start = LEXER_CACHE.state_of(self.previousBlockState()) or tokenizer.initial_state
+        text_hash = hash(text)
+        data = self.currentBlockUserData()
+        if (data is not None and data.tokenizer is tokenizer
+                and data.text_hash == text_hash and data.start_state == start):
+            spans, end = data.spans, data.end_state
+        else:
+            spans, end = tokenizer.tokenize(text, start)
+            data = BlockData(tokenizer, text_hash, start, end, spans)
+        token_formats = self.token_formats
+        for index, length, token_type in spans:
+            fmt = token_formats[token_type]
+            if fmt is not None:
+                self.setFormat(index, length, fmt)
+        data.theme_name = self.theme_name
+        self.setCurrentBlockState(LEXER_CACHE.state_id(end))
+        self.setCurrentBlockUserData(data)
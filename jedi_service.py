@@ -0,0 +1,126 @@
+import os
+import time
+import threading
+from PySide6.QtCore import QThread, Signal
+
+try:
+    import jedi
+except ImportError as e:
+    print(f"❌ Error faltan librerías externas: {e}")
+    jedi = None
+
+# Proyectos por carpeta suelta (archivos fuera del proyecto abierto) que se guardan
+PROJECTS_KEPT = 16
+
+# Módulos que se precargan al abrir un proyecto si config.json no indica otros
+DEFAULT_PRELOAD_MODULES = ['os', 'sys', 're', 'json', 'time', 'math', 'random',
+                           'pathlib', 'collections', 'typing', 'subprocess', 'datetime']
+VENV_DIR_NAMES = ('.venv', 'venv', 'env', '.env')
+
+
+def find_virtualenv(root):
+    """Devuelve la ruta del entorno virtual dentro del proyecto, o None."""
+    for name in VENV_DIR_NAMES:
+        candidate = os.path.join(root, name)
+        if os.path.isfile(os.path.join(candidate, 'pyvenv.cfg')): return candidate
+    return None
+
+
+class JediService(QThread):
+    """Autocompletado de Python: un único hilo por ventana que mantiene Jedi
+    caliente y atiende siempre la petición más reciente.
+
+    Si llega una petición mientras hay otra en cola, la sustituye; si el
+    mismo editor pide de nuevo mientras Jedi trabaja, el resultado viejo se
+    descarta. Cada resultado lleva la revisión del documento con que se pidió,
+    para que el editor ignore respuestas de texto que ya cambió."""
+    completions_ready = Signal(object, int, list, float) # editor, revisión, resultados, ms
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._cond = threading.Condition()
+        self._pending = None
+        self._running = True
+        self._projects = {} # Carpeta -> jedi.Project (se reutilizan; los más viejos se sueltan)
+        self._project = None # Proyecto abierto en la barra lateral
+        self._warmup = [] # Módulos pendientes de precargar (prioridad baja)
+        self.last_latency = 0.0
+
+    def request(self, requester, code, line, col, path, revision):
+        with self._cond:
+            self._pending = (requester, code, line, col, path, revision, time.perf_counter())
+            self._cond.notify()
+        if not self.isRunning(): self.start()
+
+    def open_project(self, root, preload_modules=None):
+        """Crea el jedi.Project del proyecto (con su venv si lo tiene) y
+        precarga en segundo plano los módulos habituales."""
+        if jedi is None: return
+        with self._cond:
+            self._warmup = [('project', os.path.abspath(root))]
+            self._warmup += [('module', m) for m in (preload_modules or DEFAULT_PRELOAD_MODULES)]
+            self._cond.notify()
+        if not self.isRunning(): self.start()
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            self._pending = None
+            self._cond.notify()
+        self.wait()
+
+    def get_project(self, path):
+        project = self._project
+        if project is not None and path:
+            root = str(project.path)
+            if os.path.abspath(path).startswith(root + os.sep): return project
+        folder = os.path.dirname(os.path.abspath(path)) if path else os.getcwd()
+        project = self._projects.pop(folder, None) or jedi.get_default_project(folder)
+        self._projects[folder] = project # Al final: el orden del dict es el de uso
+        if len(self._projects) > PROJECTS_KEPT: del self._projects[next(iter(self._projects))]
+        return project
+
+    def make_script(self, code, path):
+        """Un jedi.Script por petición, con el Project reutilizado (su entorno y
+        sys.path ya calculados). Los árboles de los módulos ya leídos salen de la
+        caché de parso, que mira la fecha del archivo: lo editado fuera se relee."""
+        return jedi.Script(code=code, path=path, project=self.get_project(path))
+
+    def run_warmup_step(self, kind, value):
+        try:
+            if kind == 'project':
+                venv = find_virtualenv(value)
+                self._project = jedi.Project(value, environment_path=venv)
+                self._project.get_environment() # Descubre sys.path del intérprete ahora
+            else:
+                code = f"import {value}\n{value}."
+                path = os.path.join(str(self._project.path), '__capi_preload__.py') if self._project else None
+                self.make_script(code, path).complete(2, len(value) + 1)
+        except Exception as e:
+            print(f"⚠️ Jedi no pudo precargar {value}: {e}")
+
+    def run(self):
+        while True:
+            with self._cond:
+                while self._running and self._pending is None and not self._warmup: self._cond.wait()
+                if not self._running: return
+                if self._pending is None:
+                    # Sin peticiones reales: un paso de precarga y se vuelve a mirar
+                    step = self._warmup.pop(0)
+                    req = None
+                else:
+                    req, self._pending = self._pending, None
+            if req is None:
+                self.run_warmup_step(*step)
+                continue
+            requester, code, line, col, path, revision, started = req
+            try:
+                script = self.make_script(code, path)
+                results = [{'name': c.name, 'type': c.type} for c in script.complete(line, col)]
+            except Exception: results = []
+
+            with self._cond:
+                superseded = self._pending is not None and self._pending[0] is requester
+            if superseded: continue # Ya hay texto más nuevo del mismo editor
+            self.last_latency = (time.perf_counter() - started) * 1000
+            self.completions_ready.emit(requester, revision, results, self.last_latency)
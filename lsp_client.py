@@ -0,0 +1,352 @@
+import os
+import json
+import time
+from pathlib import Path
+from urllib.parse import urlparse
+from urllib.request import url2pathname
+from PySide6.QtCore import QObject, QProcess, Signal
+from PySide6.QtGui import QTextCursor
+
+# ==============================================================================
+#  CLIENTE LSP (Language Server Protocol) SOBRE STDIO
+# ==============================================================================
+# Cada servidor corre en su propio proceso: el análisis pesado usa sus propios
+# núcleos y no compite con la interfaz por el GIL. Los servidores se declaran en
+# config.json -> "lsp" -> "servers" -> {lenguaje: {"command": [...]}}.
+
+# Tipos de CompletionItemKind del protocolo -> tipos que entiende AutoCompleter
+COMPLETION_KINDS = {2: 'function', 3: 'function', 4: 'function', 7: 'class', 8: 'class', 22: 'class'}
+
+
+def path_to_uri(path):
+    """file:///... bien formada también en Windows (unidad, \\, UNC)."""
+    return Path(path).resolve().as_uri()
+
+
+def uri_to_path(uri):
+    """Ruta local de una URI file:// (None si es de otro tipo). Normalizada
+    para comparar: cada servidor escribe la unidad y los escapes a su manera."""
+    parsed = urlparse(uri or '')
+    if parsed.scheme != 'file': return None
+    raw = parsed.path
+    if os.name == 'nt' and raw[2:5].upper() == '%3A': raw = f"{raw[:2]}:{raw[5:]}" # "/c%3A/..." de algunos servidores
+    if parsed.netloc and parsed.netloc != 'localhost': raw = f"//{parsed.netloc}{raw}" # UNC: \\servidor\recurso
+    path = url2pathname(raw)
+    return os.path.normcase(os.path.abspath(path))
+
+
+def utf16_len(text):
+    """Longitud en unidades UTF-16 (las que usan Qt y el protocolo)."""
+    if text.isascii(): return len(text)
+    return len(text.encode('utf-16-le')) // 2
+
+
+def utf16_to_index(text, units):
+    """Convierte una columna UTF-16 en índice de str de Python. Una columna
+    que parte un par sustituto (emoji) no tiene índice: ValueError."""
+    if text.isascii(): return units
+    count = 0
+    for i, ch in enumerate(text):
+        if count >= units:
+            if count > units: raise ValueError("columna dentro de un par sustituto")
+            return i
+        count += 2 if ord(ch) > 0xFFFF else 1
+    if count > units: raise ValueError("columna dentro de un par sustituto")
+    return len(text)
+
+
+class LspDocument:
+    """Copia por líneas del texto que conoce el servidor. Sirve para traducir
+    cada contentsChange de Qt (posición + cantidades) en el rango del texto
+    anterior que pide didChange incremental."""
+    def __init__(self, uri, language_id, text):
+        self.uri = uri
+        self.language_id = language_id
+        self.version = 1
+        self.lines = text.split('\n')
+
+    def apply(self, line, column, removed, added_text):
+        """Aplica un cambio que empieza en (línea, columna UTF-16), quita
+        `removed` unidades y mete `added_text`. Devuelve el TextDocumentContentChangeEvent."""
+        end_line, end_col = line, column
+        left = removed
+        while left > 0:
+            rest = utf16_len(self.lines[end_line]) - end_col
+            if left <= rest:
+                end_col += left
+                break
+            left -= rest + 1 # +1 por el salto de línea
+            if end_line + 1 >= len(self.lines):
+                end_col += rest
+                break
+            end_line += 1
+            end_col = 0
+        first, last = self.lines[line], self.lines[end_line]
+        new_text = first[:utf16_to_index(first, column)] + added_text + last[utf16_to_index(last, end_col):]
+        self.lines[line:end_line + 1] = new_text.split('\n')
+        self.version += 1
+        return {'range': {'start': {'line': line, 'character': column},
+                          'end': {'line': end_line, 'character': end_col}},
+                'text': added_text}
+
+
+class LspConnection(QObject):
+    """Un proceso servidor y su canal JSON-RPC (cabecera Content-Length)."""
+    notification_received = Signal(str, object) # método, parámetros
+
+    def __init__(self, command, root_dir, parent=None):
+        super().__init__(parent)
+        self.command = command
+        self.root_dir = root_dir
+        self.buffer = bytearray()
+        self.next_id = 1
+        self.callbacks = {} # id -> función que recibe (result, error)
+        self.queue = [] # Mensajes en espera hasta que el servidor responda a initialize
+        self.initialized = False
+        self.dead = False
+        self.capabilities = {}
+
+        self.process = QProcess(self)
+        self.process.readyReadStandardOutput.connect(self._on_stdout)
+        self.process.readyReadStandardError.connect(lambda: self.process.readAllStandardError())
+        self.process.errorOccurred.connect(self._on_error)
+        self.process.finished.connect(self._on_finished)
+
+    def start(self):
+        self.process.setWorkingDirectory(self.root_dir)
+        self.process.start(self.command[0], self.command[1:])
+        params = {'processId': os.getpid(), 'rootUri': path_to_uri(self.root_dir),
+                  'workspaceFolders': [{'uri': path_to_uri(self.root_dir), 'name': os.path.basename(self.root_dir)}],
+                  'capabilities': {
+                      'textDocument': {
+                          'synchronization': {'didSave': True, 'dynamicRegistration': False},
+                          'completion': {'completionItem': {'snippetSupport': False}},
+                          'publishDiagnostics': {'relatedInformation': False}},
+                      'workspace': {'workspaceFolders': True, 'configuration': True}}}
+        self._send({'jsonrpc': '2.0', 'id': 0, 'method': 'initialize', 'params': params})
+        self.callbacks[0] = self._on_initialized
+
+    def _on_initialized(self, result, error):
+        if error: self._mark_dead(f"initialize falló: {error.get('message')}"); return
+        self.capabilities = (result or {}).get('capabilities', {})
+        self.initialized = True
+        self._send({'jsonrpc': '2.0', 'method': 'initialized', 'params': {}})
+        for msg in self.queue: self._send(msg)
+        self.queue = []
+
+    def trigger_characters(self):
+        return self.capabilities.get('completionProvider', {}).get('triggerCharacters', []) or []
+
+    def wants_incremental(self):
+        sync = self.capabilities.get('textDocumentSync', 1)
+        if isinstance(sync, dict): sync = sync.get('change', 1)
+        return sync == 2
+
+    def request(self, method, params, callback):
+        req_id = self.next_id; self.next_id += 1
+        self.callbacks[req_id] = callback
+        self._post({'jsonrpc': '2.0', 'id': req_id, 'method': method, 'params': params})
+        return req_id
+
+    def cancel(self, req_id):
+        if self.callbacks.pop(req_id, None) is not None:
+            self._post({'jsonrpc': '2.0', 'method': '$/cancelRequest', 'params': {'id': req_id}})
+
+    def notify(self, method, params):
+        self._post({'jsonrpc': '2.0', 'method': method, 'params': params})
+
+    def shutdown(self):
+        if self.dead: return
+        if self.initialized:
+            self._send({'jsonrpc': '2.0', 'id': self.next_id, 'method': 'shutdown', 'params': None})
+            self._send({'jsonrpc': '2.0', 'method': 'exit', 'params': None})
+        self.dead = True
+        if not self.process.waitForFinished(500): self.process.kill(); self.process.waitForFinished(500)
+
+    def _post(self, msg):
+        if self.dead: return
+        if self.initialized: self._send(msg)
+        else: self.queue.append(msg)
+
+    def _send(self, msg):
+        body = json.dumps(msg, ensure_ascii=False).encode('utf-8')
+        self.process.write(b"Content-Length: %d\r\n\r\n" % len(body) + body)
+
+    def _on_stdout(self):
+        self.buffer += bytes(self.process.readAllStandardOutput())
+        while True:
+            header_end = self.buffer.find(b"\r\n\r\n")
+            if header_end == -1: return
+            length = None
+            for line in bytes(self.buffer[:header_end]).split(b"\r\n"):
+                name, _, value = line.partition(b":")
+                if name.strip().lower() == b"content-length": length = int(value.strip())
+            if length is None: # Cabecera rota: se descarta
+                del self.buffer[:header_end + 4]; continue
+            start = header_end + 4
+            if len(self.buffer) < start + length: return
+            body = bytes(self.buffer[start:start + length])
+            del self.buffer[:start + length]
+            try: self._dispatch(json.loads(body))
+            except Exception as e: print(f"⚠️ LSP: mensaje inválido ({e})")
+
+    def _dispatch(self, msg):
+        if 'method' in msg:
+            if 'id' in msg: self._answer_server_request(msg)
+            else: self.notification_received.emit(msg['method'], msg.get('params'))
+            return
+        callback = self.callbacks.pop(msg.get('id'), None)
+        if callback: callback(msg.get('result'), msg.get('error'))
+
+    def _answer_server_request(self, msg):
+        # Peticiones del servidor al cliente: se responde lo mínimo válido
+        result = None
+        if msg['method'] == 'workspace/configuration':
+            result = [None] * len(msg.get('params', {}).get('items', []))
+        elif msg['method'] == 'workspace/workspaceFolders':
+            result = [{'uri': path_to_uri(self.root_dir), 'name': os.path.basename(self.root_dir)}]
+        self._send({'jsonrpc': '2.0', 'id': msg['id'], 'result': result})
+
+    def _on_finished(self, *_):
+        self._mark_dead("el servidor terminó")
+
+    def _on_error(self, error):
+        if error == QProcess.FailedToStart: self._mark_dead(f"no se pudo lanzar {self.command[0]}")
+
+    def _mark_dead(self, reason):
+        if self.dead: return
+        self.dead = True
+        self.callbacks.clear(); self.queue = []
+        print(f"⚠️ LSP {' '.join(self.command)}: {reason}")
+
+
+class LspManager(QObject):
+    """Servidores LSP de la ventana: uno por lenguaje y proyecto, arrancados la
+    primera vez que se abre un archivo de ese lenguaje."""
+    completions_ready = Signal(object, int, list, float) # editor, revisión, resultados, ms (igual que JediService)
+    diagnostics_ready = Signal(object, list) # editor, diagnósticos
+
+    def __init__(self, servers, parent=None):
+        super().__init__(parent)
+        self.servers = servers or {} # lenguaje -> {"command": [...]}
+        self.root_dir = os.getcwd()
+        self.connections = {} # (lenguaje, raíz) -> LspConnection
+        self.documents = {} # editor -> (LspConnection, LspDocument)
+        self.pending = {} # editor -> id de la petición de completado en curso
+
+    def has_server(self, language):
+        conf = self.servers.get(language)
+        return bool(conf and conf.get('command'))
+
+    def connection_for(self, language):
+        key = (language, self.root_dir)
+        conn = self.connections.get(key)
+        if conn is not None: return None if conn.dead else conn # Si ya falló no se reintenta
+        conn = LspConnection(self.servers[language]['command'], self.root_dir, self)
+        conn.notification_received.connect(self._on_notification)
+        self.connections[key] = conn
+        conn.start()
+        return conn
+
+    def attach(self, editor):
+        """Abre el documento del editor en su servidor (si su lenguaje tiene uno)."""
+        self.detach(editor)
+        if not editor.file_path or not self.has_server(editor.current_lang): return False
+        conn = self.connection_for(editor.current_lang)
+        if conn is None: return False
+        doc = LspDocument(path_to_uri(editor.file_path), editor.current_lang, editor.doc_access.snapshot())
+        self.documents[editor] = (conn, doc)
+        conn.notify('textDocument/didOpen', {'textDocument': {
+            'uri': doc.uri, 'languageId': doc.language_id, 'version': doc.version, 'text': '\n'.join(doc.lines)}})
+        editor.document().contentsChange.connect(editor.lsp_contents_changed)
+        editor.lsp_session = self
+        return True
+
+    def detach(self, editor):
+        entry = self.documents.pop(editor, None)
+        if entry is None: return
+        conn, doc = entry
+        try: editor.document().contentsChange.disconnect(editor.lsp_contents_changed)
+        except (RuntimeError, TypeError): pass
+        editor.lsp_session = None
+        self.pending.pop(editor, None)
+        conn.notify('textDocument/didClose', {'textDocument': {'uri': doc.uri}})
+
+    def is_attached(self, editor):
+        entry = self.documents.get(editor)
+        return entry is not None and not entry[0].dead
+
+    def trigger_characters(self, editor):
+        entry = self.documents.get(editor)
+        return entry[0].trigger_characters() if entry else []
+
+    def document_changed(self, editor, pos, removed, added):
+        """Convierte un contentsChange de Qt en didChange incremental."""
+        entry = self.documents.get(editor)
+        if entry is None: return
+        conn, doc = entry
+        qdoc = editor.document()
+        # Qt a veces cuenta el separador final del documento en ambas cantidades
+        excess = pos + added - (qdoc.characterCount() - 1)
+        if excess > 0: removed -= excess; added -= excess
+        block = qdoc.findBlock(pos)
+        c = QTextCursor(qdoc)
+        c.setPosition(pos); c.setPosition(pos + added, QTextCursor.KeepAnchor)
+        text = c.selectedText().replace('\u2029', '\n').replace('\u2028', '\n')
+        try: change = doc.apply(block.blockNumber(), pos - block.position(), max(0, removed), text)
+        except ValueError: # Edición a mitad de un emoji: se reenvía el documento entero
+            doc.lines = editor.doc_access.snapshot().split('\n'); doc.version += 1
+            change = {'text': '\n'.join(doc.lines)}
+        if not conn.wants_incremental(): change = {'text': '\n'.join(doc.lines)}
+        conn.notify('textDocument/didChange', {'textDocument': {'uri': doc.uri, 'version': doc.version},
+                                               'contentChanges': [change]})
+
+    def document_saved(self, editor):
+        entry = self.documents.get(editor)
+        if entry: entry[0].notify('textDocument/didSave', {'textDocument': {'uri': entry[1].uri}})
+
+    def request_completion(self, editor, line, character, revision):
+        entry = self.documents.get(editor)
+        if entry is None: return
+        conn, doc = entry
+        old = self.pending.pop(editor, None)
+        if old is not None: conn.cancel(old) # Sólo interesa la última
+        started = time.perf_counter()
+
+        def on_result(result, error, editor=editor):
+            if self.pending.get(editor) != req_id: return
+            del self.pending[editor]
+            items = result.get('items', []) if isinstance(result, dict) else (result or [])
+            results = [{'name': completion_text(i), 'type': COMPLETION_KINDS.get(i.get('kind'), 'statement')}
+                       for i in items]
+            self.completions_ready.emit(editor, revision, results, (time.perf_counter() - started) * 1000)
+
+        req_id = conn.request('textDocument/completion', {'textDocument': {'uri': doc.uri},
+                                                          'position': {'line': line, 'character': character}}, on_result)
+        self.pending[editor] = req_id
+
+    def set_root(self, root_dir):
+        """Los documentos ya abiertos siguen con su servidor; los nuevos usan la raíz nueva."""
+        self.root_dir = root_dir
+
+    def shutdown(self):
+        for editor in list(self.documents): self.detach(editor)
+        for conn in self.connections.values(): conn.shutdown()
+        self.connections = {}
+
+    def _on_notification(self, method, params):
+        if method != 'textDocument/publishDiagnostics' or not params: return
+        path = uri_to_path(params.get('uri'))
+        if path is None: return
+        for editor, (conn, doc) in self.documents.items():
+            if uri_to_path(doc.uri) == path:
+                self.diagnostics_ready.emit(editor, params.get('diagnostics', []))
+                return
+
+
+def completion_text(item):
+    """Texto a insertar de un CompletionItem (los snippets se insertan por su etiqueta)."""
+    if item.get('insertTextFormat') == 2: return item.get('filterText') or item['label']
+    edit = item.get('textEdit')
+    if edit and edit.get('newText'): return edit['newText']
+    return item.get('insertText') or item['label']
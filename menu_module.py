@@ -19,6 +19,7 @@ class MenuBuilder:
         file_menu.addSeparator()
         self.add_act(file_menu, "📂 Abrir Proyecto...", None, self.p.select_folder)
         self.add_act(file_menu, "📄 Abrir Archivo...", "Ctrl+O", lambda: self.p.open_file())
+        self.add_act(file_menu, "🔎 Ir a Archivo...", "Ctrl+P", self.p.show_quick_open)
         file_menu.addSeparator()
         self.add_act(file_menu, "💾 Guardar", "Ctrl+S", self.p.save_current_file)
         self.add_act(file_menu, "💾 Guardar como...", "Ctrl+Shift+S", self.p.save_file_as)
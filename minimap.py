@@ -1,47 +1,183 @@
-from PySide6.QtWidgets import QPlainTextEdit
-from PySide6.QtCore import Qt
-from PySide6.QtGui import QFont, QColor
+import re
+from PySide6.QtWidgets import QWidget
+from PySide6.QtCore import Qt, QTimer, QRect
+from PySide6.QtGui import QColor, QImage, QPainter
 
-class CodeMinimap(QPlainTextEdit):
+from highlighter import LEXER_CACHE
+
+LINE_HEIGHT = 2 # Píxeles por línea
+CHAR_WIDTH = 1 # Píxeles por carácter
+REFRESH_DELAY_MS = 120 # Las ediciones seguidas se pintan juntas
+INK_RE = re.compile(r'\S+')
+
+
+class CodeMinimap(QWidget):
+    """Vista lejana del documento pintada en una imagen.
+
+    Cada línea es una fila de LINE_HEIGHT píxeles con los colores de sus tokens
+    (o la densidad del texto si aún no está resaltada). La imagen cubre el
+    tramo de líneas que cabe en el widget; al editar o resaltar sólo se
+    repintan las filas cuyo contenido cambió, y al desplazarse se reaprovechan
+    las filas que siguen a la vista."""
     def __init__(self, parent_editor):
         super().__init__()
         self.parent_editor = parent_editor
-        self.setReadOnly(True)
         self.setFixedWidth(120)
-        
-        # Ocultar scrollbars
-        self.setVerticalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
-        self.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
-        
-        # Fuente pequeña para simular vista lejana
-        font = QFont("Consolas", 4)
-        self.setFont(font)
-        
+        self.setCursor(Qt.PointingHandCursor)
+
         # Configuración inicial (se sobreescribirá con el tema)
-        self.setLineWrapMode(QPlainTextEdit.NoWrap)
+        self.bg = QColor('#1e1e1e'); self.fg = QColor('#d4d4d4'); self.border = QColor('#333')
+        self.image = None
+        self.top = 0 # Primer bloque pintado en la imagen
+        self.rows = [] # Firma de lo pintado en cada fila (None = por pintar)
+        self.colors = {} # Tipo de token -> QColor del tema actual
+        self.drag_origin = None # (y, valor del scroll) al empezar a arrastrar
+
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.setSingleShot(True)
+        self.refresh_timer.setInterval(REFRESH_DELAY_MS)
+        self.refresh_timer.timeout.connect(self.refresh)
+        # contentsChanged también salta cuando el resaltador colorea bloques
+        parent_editor.document().contentsChanged.connect(self.sync_with_parent)
+        bar = parent_editor.verticalScrollBar()
+        bar.valueChanged.connect(lambda v: self.update_scroll(v, bar.maximum()))
+        bar.rangeChanged.connect(lambda _min, m: self.update_scroll(bar.value(), m))
 
     def sync_with_parent(self):
-        """Copia el texto del editor principal al minimapa"""
-        self.setPlainText(self.parent_editor.toPlainText())
+        """Programa el repintado de las filas que hayan cambiado"""
+        if self.isVisible(): self.refresh_timer.start()
 
     def update_scroll(self, value, maximum):
         """Sincroniza el scroll"""
-        if maximum > 0:
-            ratio = value / maximum
-            my_max = self.verticalScrollBar().maximum()
-            self.verticalScrollBar().setValue(int(my_max * ratio))
+        if not self.isVisible(): return
+        top = self.top_for(value, maximum)
+        if top != self.top: self.shift_rows(top)
+        self.refresh()
+
+    def top_for(self, value, maximum):
+        total = self.parent_editor.document().blockCount()
+        lines = self.height() // LINE_HEIGHT
+        if total <= lines or maximum <= 0: return 0
+        return int((total - lines) * value / maximum)
+
+    def shift_rows(self, top):
+        """Mueve la imagen al nuevo primer bloque reaprovechando las filas comunes"""
+        d = top - self.top
+        self.top = top
+        if self.image is None or abs(d) >= len(self.rows):
+            self.rows = [None] * len(self.rows); return
+        old = self.image.copy()
+        p = QPainter(self.image)
+        p.fillRect(self.image.rect(), self.bg)
+        p.drawImage(0, -d * LINE_HEIGHT, old)
+        p.end()
+        self.rows = self.rows[d:] + [None] * d if d > 0 else [None] * -d + self.rows[:d]
+
+    def refresh(self):
+        """Repinta en la imagen las filas cuyo bloque cambió desde la última vez"""
+        if not self.isVisible(): return
+        editor = self.parent_editor
+        bar = editor.verticalScrollBar()
+        lines = max(1, self.height() // LINE_HEIGHT)
+        if self.image is None or self.image.size() != self.size():
+            self.image = QImage(self.size(), QImage.Format_ARGB32_Premultiplied)
+            self.image.fill(self.bg)
+            self.rows = [None] * lines
+        top = self.top_for(bar.value(), bar.maximum())
+        if top != self.top: self.shift_rows(top)
+
+        formats = LEXER_CACHE.get_token_formats(editor.theme_name)
+        width = self.width()
+        p = QPainter(self.image)
+        block = editor.document().findBlockByNumber(self.top)
+        for row in range(lines):
+            if block.isValid():
+                text = block.text()
+                data = block.userData()
+                sig = (text, id(data), getattr(data, 'theme_name', None))
+            else:
+                text, data, sig = None, None, ()
+            if self.rows[row] != sig:
+                y = row * LINE_HEIGHT
+                p.fillRect(0, y, width, LINE_HEIGHT, self.bg)
+                if text: self.paint_line(p, y, text, data, formats, width)
+                self.rows[row] = sig
+            if block.isValid(): block = block.next()
+        p.end()
+        self.update()
+
+    def paint_line(self, p, y, text, data, formats, width):
+        spans = getattr(data, 'spans', None)
+        if spans is None: # Sin resaltar todavía: sólo la densidad del texto
+            for m in INK_RE.finditer(text):
+                x = m.start() * CHAR_WIDTH
+                if x >= width: break
+                p.fillRect(x, y, min(width - x, (m.end() - m.start()) * CHAR_WIDTH), LINE_HEIGHT, self.fg)
+            return
+        for index, length, token_type in spans:
+            x = index * CHAR_WIDTH
+            if x >= width: break
+            if text[index:index + length].isspace(): continue
+            p.fillRect(x, y, min(width - x, length * CHAR_WIDTH), LINE_HEIGHT, self.color_for(token_type, formats))
+
+    def color_for(self, token_type, formats):
+        if token_type not in self.colors: # Los tokens sin formato (nombres, texto) van en el color base
+            fmt = formats[token_type]
+            brush = fmt.foreground() if fmt is not None else None
+            self.colors[token_type] = brush.color() if brush is not None and brush.style() != Qt.NoBrush else self.fg
+        return self.colors[token_type]
+
+    def paintEvent(self, event):
+        p = QPainter(self)
+        if self.image is not None: p.drawImage(0, 0, self.image)
+        else: p.fillRect(self.rect(), self.bg)
+        # Indicador de la zona visible del editor
+        first, last = self.parent_editor.visible_block_range()
+        indicator = QColor(self.fg); indicator.setAlpha(40)
+        p.fillRect(QRect(0, (first - self.top) * LINE_HEIGHT, self.width(), max(LINE_HEIGHT, (last - first) * LINE_HEIGHT)), indicator)
+        p.setPen(self.border)
+        p.drawLine(0, 0, 0, self.height()) # Borde sutil a la izquierda
+        p.end()
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.refresh() # Oculto no se pinta nada: al volver sólo cambian las filas editadas
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self.refresh()
+
+    # --- NAVEGACIÓN CON EL RATÓN ---
+    def mousePressEvent(self, event):
+        if event.button() != Qt.LeftButton: return
+        # Clic: centra el editor en la línea pulsada; arrastrar mueve como una barra de scroll
+        editor = self.parent_editor
+        first, last = editor.visible_block_range()
+        line = self.top + int(event.position().y()) // LINE_HEIGHT
+        bar = editor.verticalScrollBar()
+        bar.setValue(line - (last - first) // 2)
+        self.drag_origin = (event.position().y(), bar.value())
+
+    def mouseMoveEvent(self, event):
+        if self.drag_origin is None: return
+        y0, value0 = self.drag_origin
+        bar = self.parent_editor.verticalScrollBar()
+        total = self.parent_editor.document().blockCount()
+        span = min(self.height(), total * LINE_HEIGHT) or 1
+        bar.setValue(int(value0 + (event.position().y() - y0) * total / span))
+
+    def mouseReleaseEvent(self, event):
+        self.drag_origin = None
+
+    def wheelEvent(self, event):
+        self.parent_editor.wheelEvent(event)
 
     def apply_theme(self, colors):
         """Recibe el diccionario de colores y actualiza el estilo"""
-        bg = colors.get('bg', '#1e1e1e')
-        fg = colors.get('fg', '#d4d4d4')
-        
-        # Aplicamos el estilo CSS dinámicamente
-        self.setStyleSheet(f"""
-            QPlainTextEdit {{
-                background-color: {bg};
-                color: {fg};
-                border: none;
-                border-left: 1px solid {colors.get('line_bg', '#333')}; /* Borde sutil a la izquierda */
-            }}
-        """)
\ No newline at end of file
+        self.bg = QColor(colors.get('bg', '#1e1e1e'))
+        self.fg = QColor(colors.get('fg', '#d4d4d4'))
+        self.border = QColor(colors.get('line_bg', '#333'))
+        self.colors = {}
+        if self.image is not None: self.image.fill(self.bg)
+        self.rows = [None] * len(self.rows)
+        self.refresh()
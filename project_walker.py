@@ -0,0 +1,280 @@
+import os
+import re
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# ==============================================================================
+#  RECORRIDO DEL PROYECTO
+# ==============================================================================
+# Un único recorrido para la búsqueda global, el índice y la apertura rápida.
+# Cada carpeta es una tarea de un pool de hilos (os.scandir suelta el GIL
+# mientras lee del disco); los archivos salen por una cola según se
+# encuentran. Respeta .gitignore y .capiignore (con sus reglas anidadas, como
+# git) y opcionalmente descarta binarios y archivos enormes.
+
+IGNORE_FILES = ('.gitignore', '.capiignore')
+# Reglas base, con la sintaxis de .gitignore (un "!carpeta/" las anula)
+DEFAULT_IGNORES = ['.git/', '.hg/', '.svn/', '__pycache__/', 'node_modules/', 'venv/', '.venv/', '.env/', '*.pyc']
+WALK_WORKERS = min(8, 2 * (os.cpu_count() or 1)) # Hilos del recorrido
+BINARY_SNIFF = 8192 # Bytes iniciales donde un NUL delata un binario
+
+# Extensiones que se deciden sin abrir el archivo; las demás se olfatean
+TEXT_EXTENSIONS = {
+    '.py', '.pyw', '.pyi', '.js', '.jsx', '.mjs', '.cjs', '.ts', '.tsx', '.json', '.html', '.htm', '.css',
+    '.scss', '.less', '.md', '.rst', '.txt', '.xml', '.svg', '.yml', '.yaml', '.toml', '.ini', '.cfg', '.conf',
+    '.sh', '.bash', '.bat', '.ps1', '.c', '.h', '.cpp', '.hpp', '.cc', '.java', '.kt', '.go', '.rs', '.rb',
+    '.php', '.sql', '.csv', '.lua', '.vue', '.svelte', '.tex', '.desktop', '.spec', '.in', '.lock'}
+BINARY_EXTENSIONS = {
+    '.png', '.jpg', '.jpeg', '.gif', '.bmp', '.ico', '.icns', '.webp', '.pdf', '.zip', '.gz', '.tgz', '.bz2',
+    '.xz', '.7z', '.rar', '.tar', '.jar', '.class', '.so', '.dll', '.dylib', '.exe', '.o', '.a', '.lib',
+    '.pyc', '.pyo', '.pyd', '.whl', '.egg', '.woff', '.woff2', '.ttf', '.otf', '.eot', '.mp3', '.mp4',
+    '.wav', '.ogg', '.flac', '.avi', '.mov', '.mkv', '.db', '.sqlite', '.bin', '.dat', '.npy', '.pkl'}
+
+
+def pattern_regex(pattern):
+    """Traduce un patrón de .gitignore (ya sin '!' ni '/' de los extremos) a
+    regex sobre una línea: nunca cruza un salto, porque se compara con los
+    nombres de toda una carpeta unidos con '\\n'."""
+    out, i, n = [], 0, len(pattern)
+    while i < n:
+        c = pattern[i]
+        if pattern.startswith('**/', i): out.append('(?:.*/)?'); i += 3; continue
+        if pattern.startswith('**', i): out.append('.*'); i += 2; continue
+        if c == '*': out.append('[^/\\n]*')
+        elif c == '?': out.append('[^/\\n]')
+        elif c == '\\' and i + 1 < n: i += 1; out.append(re.escape(pattern[i]))
+        elif c == '[':
+            end = pattern.find(']', i + 2)
+            if end < 0: out.append(re.escape(c))
+            else:
+                body = pattern[i + 1:end]
+                if body[0] in '!^': body = '^' + body[1:]
+                out.append('[' + body.replace('\\', '\\\\') + ']'); i = end
+        else: out.append(re.escape(c))
+        i += 1
+    return ''.join(out)
+
+
+class RuleMatcher:
+    """Una o varias reglas del mismo signo, comprobadas de una vez sobre todos
+    los nombres de una carpeta: los patrones sin '/' contra los nombres y los
+    anclados contra las rutas (relativas a la carpeta del archivo de reglas).
+    Una llamada a la regex por carpeta en vez de una por entrada, y ni eso si
+    el texto no contiene ninguno de los literales que exigen los patrones."""
+    def __init__(self, patterns, negate=False, dir_only=False):
+        self.negate, self.dir_only = negate, dir_only
+        by_name = [p for p, anchored in patterns if not anchored]
+        by_path = [p for p, anchored in patterns if anchored]
+        self.by_name = re.compile('^(?:%s)$' % '|'.join(map(pattern_regex, by_name)), re.M).findall if by_name else None
+        self.by_path = re.compile('^(?:%s)$' % '|'.join(map(pattern_regex, by_path)), re.M).findall if by_path else None
+        self.name_literals, self.path_literals = required_literals(by_name), required_literals(by_path)
+
+    def hits(self, prefix, names):
+        """Nombres de `names` que coinciden; `prefix` es la carpeta ('' o 'a/b/')"""
+        found = set()
+        if self.by_name is not None:
+            text = '\n'.join(names)
+            if maybe_contains(text, self.name_literals): found.update(self.by_name(text))
+        if self.by_path is not None:
+            text = prefix + ('\n' + prefix).join(names)
+            if maybe_contains(text, self.path_literals):
+                cut = len(prefix)
+                found.update(line[cut:] for line in self.by_path(text))
+        return found
+
+
+def required_literals(patterns):
+    """El trozo literal más largo de cada patrón, o None si alguno no tiene"""
+    out = []
+    for p in patterns:
+        p = re.sub(r'\[\]?[^\]]*\]', '\0', p.replace('**/', '\0')) # Clases y '**/' (cuya '/' es opcional) no son literales
+        pieces = re.split(r'[*?\\\0]', p)
+        best = max(pieces, key=len)
+        if not best: return None
+        out.append(best)
+    return out
+
+
+def maybe_contains(text, literals):
+    return literals is None or any(lit in text for lit in literals)
+
+
+class IgnoreRules:
+    """Reglas de un archivo de ignorados (o las de por defecto).
+
+    `base` es la carpeta del archivo relativa a la raíz ('' en la raíz). Sin
+    negaciones bastan dos RuleMatcher (todas las entradas y sólo carpetas);
+    con ellas hay uno por regla y manda el último que coincide."""
+    def __init__(self, base, lines):
+        self.base = base
+        rules = [] # (patrón, anclado, negada, sólo carpetas)
+        for line in lines:
+            line = line.rstrip('\n').rstrip()
+            if not line or line.startswith('#'): continue
+            negate = line.startswith('!')
+            if negate or line.startswith('\\'): line = line[1:]
+            dir_only = line.endswith('/')
+            line = line.rstrip('/')
+            anchored = '/' in line
+            line = line.lstrip('/')
+            if not line: continue
+            try: re.compile(pattern_regex(line))
+            except re.error: continue
+            rules.append((line, anchored, negate, dir_only))
+        self.count = len(rules)
+        if any(negate for _p, _a, negate, _d in rules):
+            self.matchers = [RuleMatcher([(p, a)], negate, dir_only) for p, a, negate, dir_only in rules]
+        else:
+            self.matchers = [RuleMatcher([(p, a) for p, a, _n, d in rules if d == dir_only], False, dir_only) for dir_only in (False, True)]
+
+
+def load_rules(dir_path, base):
+    """Reglas de los archivos de ignorados de una carpeta (None si no tiene)"""
+    lines = []
+    for name in IGNORE_FILES:
+        try:
+            with open(os.path.join(dir_path, name), 'r', encoding='utf-8', errors='replace') as f: lines += f.readlines()
+        except OSError: pass
+    rules = IgnoreRules(base, lines)
+    return rules if rules.count else None
+
+
+def root_rules(root):
+    """Cadena de reglas de la raíz: las de por defecto y .git/info/exclude"""
+    chain = (IgnoreRules('', DEFAULT_IGNORES),)
+    try:
+        with open(os.path.join(root, '.git', 'info', 'exclude'), 'r', encoding='utf-8', errors='replace') as f:
+            chain += (IgnoreRules('', f.readlines()),)
+    except OSError: pass
+    return chain
+
+
+def ignored_names(chain, rel_dir, files, dirs):
+    """Nombres de una carpeta (relativa a la raíz) que quedan ignorados. Como
+    en git, manda el archivo de reglas más profundo que opine y, dentro de
+    él, la última regla que coincide."""
+    ignored, undecided, undecided_dirs = set(), set(files) | set(dirs), set(dirs)
+    for rules in reversed(chain):
+        sub = rel_dir[len(rules.base) + 1:] if rules.base else rel_dir
+        prefix = sub + '/' if sub else ''
+        for m in reversed(rules.matchers):
+            names = undecided_dirs if m.dir_only else undecided
+            if not names: continue
+            found = m.hits(prefix, names)
+            found &= names # Por si un nombre traía un salto de línea
+            if not found: continue
+            if not m.negate: ignored |= found
+            undecided -= found
+            undecided_dirs -= found
+    return ignored
+
+
+def is_binary(path, entry_name=None):
+    ext = os.path.splitext(entry_name or path)[1].lower()
+    if ext in TEXT_EXTENSIONS: return False
+    if ext in BINARY_EXTENSIONS: return True
+    try:
+        with open(path, 'rb') as f: return b'\0' in f.read(BINARY_SNIFF)
+    except OSError: return True
+
+
+def walk_project(root, text_only=False, max_size=None, with_stat=False, workers=WALK_WORKERS):
+    """Generador de los archivos del proyecto que no están ignorados.
+
+    - text_only: descarta binarios (por extensión o mirando el principio).
+    - max_size: descarta archivos más grandes (bytes).
+    - with_stat: da (ruta, os.stat_result) en vez de sólo la ruta.
+    El orden depende de qué carpeta termine antes. Cerrar el generador (o
+    dejar de usarlo) para el recorrido."""
+    root = os.path.abspath(root)
+    results = queue.SimpleQueue()
+    lock = threading.Lock()
+    state = {'pending': 1, 'stop': False}
+    need_stat = with_stat or max_size is not None
+    executor = ThreadPoolExecutor(max(1, workers), thread_name_prefix='walker')
+
+    def scan(dir_path, rel, chain):
+        files, subdirs = [], []
+        try:
+            if state['stop']: return
+            try:
+                with os.scandir(dir_path) as it: entries = list(it)
+            except OSError: entries = []
+            file_entries, dir_entries = [], []
+            for e in entries:
+                try: (dir_entries if e.is_dir(follow_symlinks=False) else file_entries).append(e) # Sin seguir enlaces: nada de ciclos
+                except OSError: pass
+            if any(e.name in IGNORE_FILES for e in file_entries):
+                rules = load_rules(dir_path, rel)
+                if rules: chain = chain + (rules,)
+            ignored = ignored_names(chain, rel, [e.name for e in file_entries], [e.name for e in dir_entries])
+            if ignored:
+                file_entries = [e for e in file_entries if e.name not in ignored]
+                dir_entries = [e for e in dir_entries if e.name not in ignored]
+            subdirs = [(e.path, f"{rel}/{e.name}" if rel else e.name) for e in dir_entries]
+            for e in file_entries:
+                try:
+                    if not e.is_file(): continue
+                    st = e.stat() if need_stat else None
+                except OSError: continue
+                if max_size is not None and st.st_size > max_size: continue
+                if text_only and is_binary(e.path, e.name): continue
+                files.append((e.path, st) if with_stat else e.path)
+            with lock: state['pending'] += len(subdirs)
+            for path, erel in subdirs:
+                if state['stop']: break
+                executor.submit(scan, path, erel, chain)
+        except RuntimeError: pass # El pool ya se cerró: el generador terminó antes
+        except Exception as ex: print(f"⚠️ Error recorriendo {dir_path}: {ex}")
+        finally:
+            if files: results.put(files)
+            with lock:
+                state['pending'] -= 1
+                if state['pending'] == 0: results.put(None) # Fin del recorrido
+
+    executor.submit(scan, root, '', root_rules(root))
+    try:
+        while True:
+            batch = results.get()
+            if batch is None: return
+            yield from batch
+    finally:
+        state['stop'] = True
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+class IgnoreMatcher:
+    """Las mismas reglas que walk_project para rutas sueltas (p. ej. un
+    archivo que acaba de cambiar): carga y guarda las de cada carpeta del
+    camino la primera vez."""
+    def __init__(self, root):
+        self.root = os.path.abspath(root)
+        self.forget()
+
+    def chain_for(self, rel_dir):
+        chain = self.chains.get(rel_dir)
+        if chain is None:
+            parent = rel_dir.rpartition('/')[0]
+            chain = self.chain_for(parent)
+            rules = load_rules(os.path.join(self.root, rel_dir), rel_dir)
+            if rules: chain = chain + (rules,)
+            self.chains[rel_dir] = chain
+        return chain
+
+    def ignored(self, path, is_dir=False):
+        """¿Queda fuera del proyecto `path` (o alguna carpeta de su camino)?"""
+        rel = os.path.relpath(os.path.abspath(path), self.root)
+        if rel == os.pardir or rel.startswith(os.pardir + os.sep): return True
+        parts = rel.replace(os.sep, '/').split('/')
+        for i in range(1, len(parts) + 1):
+            folder, name = '/'.join(parts[:i - 1]), parts[i - 1]
+            as_dir = is_dir or i < len(parts)
+            if ignored_names(self.chain_for(folder), folder, () if as_dir else (name,), (name,) if as_dir else ()): return True
+        return False
+
+    def forget(self):
+        """Olvida las reglas guardadas (cuando cambia un .gitignore)"""
+        chain = root_rules(self.root)
+        rules = load_rules(self.root, '')
+        self.chains = {'': chain + (rules,) if rules else chain}
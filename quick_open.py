@@ -0,0 +1,366 @@
+import os
+import re
+import time
+import threading
+from array import array
+from bisect import bisect_left, bisect_right, insort
+from itertools import islice
+from PySide6.QtCore import Qt, QThread, QTimer, Signal, QEvent
+from PySide6.QtWidgets import QDialog, QVBoxLayout, QLineEdit, QListWidget, QLabel
+
+from project_walker import walk_project, IgnoreMatcher
+
+QUICK_OPEN_LIMIT = 50 # Filas que se muestran
+REBUILD_DELAY_MS = 2000 # Pausa tras cambios en disco antes de rehacer la lista en el hilo
+REBUILD_MIN_CHANGES = 200 # Con menos, los cambios se miran aparte (ver FileList)
+MATCH_CHUNK_LINES = 2000 # Líneas que se buscan entre dos miradas al reloj
+MATCH_BUDGET_MS = 10 # Tiempo por tecla; lo que falte se busca después sin bloquear
+
+# ==============================================================================
+#  LISTA DE ARCHIVOS PARA CTRL+P
+# ==============================================================================
+# Las rutas relativas del proyecto van en dos textos enormes (rutas y nombres,
+# en minúsculas, una por línea) ordenados de nombre más corto a más largo.
+# Cada letra tecleada son unas pocas búsquedas de regex sobre esos textos, que
+# corren en C y se paran al llenar la lista: no se crea nada por archivo. Las
+# capas van de mejor a peor coincidencia (el nombre empieza por lo escrito, lo
+# contiene, lo contiene salteado; la ruta lo contiene, lo contiene salteado) y
+# dentro de cada una manda el orden de los textos: nombres cortos primero.
+
+
+class FileListSnapshot:
+    """Lista ya preparada para buscar (se construye en el hilo)"""
+    def __init__(self, paths):
+        self.order = sorted(paths, key=by_name_length)
+        self.members = frozenset(self.order)
+        self.sorted = sorted(self.order) # Por orden alfabético: una carpeta es un tramo seguido
+        names = [p[p.rfind('/') + 1:] for p in self.order]
+        # Un '\n' delante de cada línea: "empieza por" es buscar '\n' + texto
+        self.path_blob = '\n' + '\n'.join(self.order).lower() + '\n'
+        self.name_blob = '\n' + '\n'.join(names).lower() + '\n'
+        self.path_offsets = line_offsets(self.order)
+        self.name_offsets = line_offsets(names)
+
+
+def line_offsets(lines):
+    """Dónde empieza cada línea en '\\n' + '\\n'.join(lines) + '\\n' (y el final)"""
+    offsets, pos = array('I', [1]), 1
+    for line in lines:
+        pos += len(line) + 1
+        offsets.append(pos)
+    return offsets
+
+
+def fuzzy_regex(text, by_line=False):
+    """Las letras de `text` en orden y sin cruzar de línea. Cada hueco es
+    posesivo y se detiene en la siguiente letra: nada de retrocesos. Con
+    by_line empieza en el '\\n' de cada línea y la prueba una sola vez (mejor
+    para rutas largas, donde la primera letra aparece muchas veces)."""
+    gaps = [f'[^\\n{c}]*+{c}' for c in map(re.escape, text)]
+    return '\n' + ''.join(gaps) if by_line else re.escape(text[0]) + ''.join(gaps[1:])
+
+
+def match_layers(q):
+    """(sobre el nombre, regex) de mejor a peor coincidencia"""
+    esc = re.escape(q)
+    layers = [(False, re.compile(esc)), (False, re.compile(fuzzy_regex(q, True)))]
+    if '/' in q: return layers
+    return [(True, re.compile('\n' + esc)), (True, re.compile(esc)), (True, re.compile(fuzzy_regex(q)))] + layers
+
+
+def by_name_length(p):
+    return (len(p) - p.rfind('/'), len(p), p)
+
+
+class FileList:
+    """Rutas relativas (con '/') de un proyecto para el Ctrl+P.
+
+    `snap` es la última lista preparada. Lo que cambia después va aparte:
+    los archivos nuevos en `extra` (pocos: se revisan uno a uno) y los
+    borrados se filtran al mirar cada resultado contra `paths`. Cuando se
+    juntan bastantes cambios el dueño pide otra lista al hilo."""
+    def __init__(self, root, snap):
+        self.root = root
+        self.snap = snap
+        self.paths = set(snap.order)
+        self.sorted = snap.sorted # Las mismas rutas que `paths`, ordenadas (para quitar carpetas)
+        self.extra = set() # Archivos que no están en snap
+        self.changes = 0
+        self.last = (None, None) # Última búsqueda recorrida entera y lo que encontró
+
+    def __len__(self):
+        return len(self.paths)
+
+    def add(self, rel):
+        if rel in self.paths: return
+        self.paths.add(rel)
+        insort(self.sorted, rel)
+        if rel not in self.snap.members: self.extra.add(rel)
+        self.changes += 1
+        self.last = (None, None)
+
+    def remove(self, rel):
+        """Quita un archivo o, si es una carpeta, todo lo que cuelga de ella"""
+        if rel in self.paths: lo = bisect_left(self.sorted, rel); hi = lo + 1
+        else: # Lo de dentro de la carpeta va seguido: de 'rel/' a 'rel0' ('0' va tras '/')
+            lo, hi = bisect_left(self.sorted, rel + '/'), bisect_left(self.sorted, rel + '0')
+            if lo == hi: return # Ni archivo ni carpeta conocidos (p. ej. uno que acaba de crearse)
+        gone = self.sorted[lo:hi]
+        del self.sorted[lo:hi]
+        self.paths.difference_update(gone)
+        self.extra.difference_update(gone)
+        self.changes += len(gone)
+        self.last = (None, None)
+
+    def install(self, snap):
+        """Cambia a una lista nueva (pedida con una copia de `paths`)"""
+        self.snap = snap
+        self.extra = self.paths - snap.members # Lo que cambió mientras se preparaba
+        dead = len(snap.members) - (len(self.paths) - len(self.extra))
+        self.changes = len(self.extra) + dead
+        self.last = (None, None)
+
+    def match(self, query, limit=QUICK_OPEN_LIMIT):
+        """Hasta `limit` rutas para lo escrito, de una vez"""
+        return list(islice(filter(None, self.iter_matches(query)), limit))
+
+    def iter_matches(self, query):
+        """Generador de rutas para lo escrito (sin distinguir mayúsculas ni
+        espacios), de mejor a peor. Entre trozo y trozo de texto da None para
+        que quien lo consume mire el reloj y siga más tarde si hace falta."""
+        q = ''.join(query.lower().split())
+        snap, paths = self.snap, self.paths
+        if not q:
+            yield from (p for p in snap.order if p in paths)
+            yield from sorted(self.extra, key=by_name_length)
+            return
+        last_q, last_found = self.last
+        # Al alargar la búsqueda sólo pueden quedar rutas que ya coincidían
+        narrowed = sorted(last_found, key=by_name_length) if last_q is not None and q.startswith(last_q) else None
+        extra = sorted(self.extra, key=by_name_length) if self.extra else ()
+        found, seen = [], set()
+        for on_name, regex in match_layers(q):
+            search = regex.search
+            if narrowed is None:
+                blob, offsets = (snap.name_blob, snap.name_offsets) if on_name else (snap.path_blob, snap.path_offsets)
+                order, lines = snap.order, len(snap.order)
+                for first in range(0, lines, MATCH_CHUNK_LINES):
+                    pos, end = offsets[first] - 1, offsets[min(first + MATCH_CHUNK_LINES, lines)] # Trozo de líneas enteras
+                    while pos < end:
+                        m = search(blob, pos, end)
+                        if m is None: break
+                        line = bisect_right(offsets, m.end() - 1) - 1 # Línea donde acaba la coincidencia
+                        path = order[line]
+                        if path not in seen and path in paths:
+                            seen.add(path); found.append(path)
+                            yield path
+                        pos = offsets[line + 1] - 1 # Desde el '\n' de la siguiente línea
+                    yield None
+            for path in (narrowed if narrowed is not None else extra):
+                if path in seen: continue
+                text = '\n' + (path[path.rfind('/') + 1:] if on_name else path).lower()
+                if search(text):
+                    seen.add(path); found.append(path)
+                    yield path
+            yield None
+        self.last = (q, found) # Recorrida entera: sirve para acotar la siguiente
+
+
+def project_file_list(root, cancelled=lambda: False):
+    """Rutas relativas (con '/') de los archivos no ignorados del proyecto"""
+    cut = len(os.path.join(os.path.abspath(root), ''))
+    out = []
+    walk = walk_project(root)
+    try:
+        for path in walk:
+            if cancelled(): return None
+            out.append(path[cut:].replace(os.sep, '/'))
+    finally: walk.close()
+    return out
+
+
+class QuickOpenIndexer(QThread):
+    """Lista de archivos del proyecto abierto, preparada en segundo plano.
+
+    open_project() recorre el disco en el hilo; path_changed() apunta un
+    archivo o carpeta que cambió (alta, baja o renombrado) y, pasados unos
+    segundos con bastantes cambios, rehace la lista en el hilo. files es
+    None hasta que la primera lista está lista."""
+    list_ready = Signal(str, object, float) # raíz, FileListSnapshot, segundos
+    files_found = Signal(str, list) # raíz, rutas relativas de una carpeta nueva
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._cond = threading.Condition()
+        self._running = True
+        self._job = None # (raíz, rutas o None para recorrer el disco)
+        self._walks = [] # (raíz, matcher, carpeta nueva) que recorrer en el hilo
+        self.root = None
+        self.files = None
+        self.matcher = None
+        self.list_ready.connect(self._install)
+        self.files_found.connect(self._add_found)
+        self.rebuild_timer = QTimer(self)
+        self.rebuild_timer.setSingleShot(True)
+        self.rebuild_timer.setInterval(REBUILD_DELAY_MS)
+        self.rebuild_timer.timeout.connect(self._request_rebuild)
+
+    def open_project(self, root):
+        self.root, self.files = os.path.abspath(root), None
+        self.matcher = IgnoreMatcher(self.root)
+        self._submit((self.root, None))
+
+    def _submit(self, job):
+        with self._cond:
+            self._job = job
+            self._cond.notify()
+        if not self.isRunning(): self.start()
+
+    def path_changed(self, path):
+        """Un archivo o carpeta del proyecto se creó, borró o renombró"""
+        files = self.files
+        if files is None or self.root is None: return
+        path = os.path.abspath(path)
+        rel = os.path.relpath(path, self.root).replace(os.sep, '/')
+        if rel.startswith('../') or rel == '..': return
+        if path.endswith(('.gitignore', '.capiignore')):
+            self.open_project(self.root); return # Otras reglas: se recorre todo de nuevo
+        files.remove(rel)
+        if os.path.isdir(path):
+            if not self.matcher.ignored(path, True):
+                with self._cond:
+                    self._walks.append((self.root, self.matcher, path))
+                    self._cond.notify()
+        elif os.path.isfile(path) and not self.matcher.ignored(path): files.add(rel)
+        if files.changes >= REBUILD_MIN_CHANGES: self.rebuild_timer.start()
+
+    def _add_found(self, root, rels):
+        files = self.files
+        if root != self.root or files is None: return
+        for rel in rels: files.add(rel)
+        if files.changes >= REBUILD_MIN_CHANGES: self.rebuild_timer.start()
+
+    def _request_rebuild(self):
+        if self.files is not None: self._submit((self.root, list(self.files.paths)))
+
+    def _install(self, root, snap, seconds):
+        if root != self.root: return # Proyecto anterior
+        if self.files is None: self.files = FileList(root, snap)
+        else: self.files.install(snap)
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+        self.wait()
+
+    def interrupted(self):
+        return not self._running or self._job is not None
+
+    def run(self):
+        while True:
+            with self._cond:
+                while self._running and self._job is None and not self._walks: self._cond.wait()
+                if not self._running: break
+                if self._job is None:
+                    walks, self._walks = self._walks, []
+                    self.walk_new_dirs(walks); continue
+                (root, paths), self._job = self._job, None
+            try:
+                started = time.perf_counter()
+                if paths is None: paths = project_file_list(root, self.interrupted)
+                if paths is None: continue
+                snap = FileListSnapshot(paths)
+                if not self.interrupted(): self.list_ready.emit(root, snap, time.perf_counter() - started)
+            except Exception as e: print(f"⚠️ Error preparando la lista de archivos: {e}")
+
+    def walk_new_dirs(self, walks):
+        """Archivos de carpetas que aparecieron (con sus reglas; las de las
+        carpetas de encima las mira matcher)"""
+        for root, matcher, path in walks:
+            try:
+                cut = len(os.path.join(root, ''))
+                walk = walk_project(path)
+                try: rels = [p[cut:].replace(os.sep, '/') for p in walk if not matcher.ignored(p)]
+                finally: walk.close()
+                if rels: self.files_found.emit(root, rels)
+            except Exception as e: print(f"⚠️ Error leyendo {path}: {e}")
+
+
+# ==============================================================================
+#  DIÁLOGO CTRL+P
+# ==============================================================================
+class QuickOpenDialog(QDialog):
+    def __init__(self, indexer, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Ir a Archivo")
+        self.resize(600, 420)
+        self.indexer = indexer
+        self.results = []
+        layout = QVBoxLayout(self)
+        self.input_line = QLineEdit()
+        self.input_line.setPlaceholderText("Nombre del archivo...")
+        self.input_line.textChanged.connect(self.refresh)
+        self.input_line.returnPressed.connect(self.open_selected)
+        self.input_line.installEventFilter(self) # Flechas y páginas mueven la lista sin soltar el texto
+        self.list = QListWidget()
+        self.list.setUniformItemSizes(True)
+        self.list.itemActivated.connect(lambda _item: self.open_selected())
+        self.lbl_status = QLabel("")
+        layout.addWidget(self.input_line)
+        layout.addWidget(self.list)
+        layout.addWidget(self.lbl_status)
+        self.wait_timer = QTimer(self) # Mientras la lista se prepara en el hilo
+        self.wait_timer.setInterval(200)
+        self.wait_timer.timeout.connect(self.refresh)
+        self.pending = None # Búsqueda a medias (generador de FileList.iter_matches)
+        self.pump_timer = QTimer(self)
+        self.pump_timer.setSingleShot(True)
+        self.pump_timer.setInterval(0)
+        self.pump_timer.timeout.connect(self.pump)
+        self.refresh()
+
+    def eventFilter(self, obj, event):
+        if obj is self.input_line and event.type() == QEvent.KeyPress:
+            if event.key() in (Qt.Key_Up, Qt.Key_Down, Qt.Key_PageUp, Qt.Key_PageDown):
+                self.list.keyPressEvent(event); return True
+        return super().eventFilter(obj, event)
+
+    def refresh(self, *_):
+        files = self.indexer.files
+        if files is None:
+            self.lbl_status.setText("⏳ Preparando la lista de archivos...")
+            self.wait_timer.start(); return
+        self.wait_timer.stop()
+        self.pending = files.iter_matches(self.input_line.text())
+        self.results = []
+        self.list.clear()
+        self.pump()
+
+    def pump(self):
+        """Sigue la búsqueda con un presupuesto de tiempo: cada tecla responde
+        enseguida aunque las capas más lentas terminen en las siguientes vueltas"""
+        if self.pending is None: return
+        deadline = time.perf_counter() + MATCH_BUDGET_MS / 1000
+        new, room = [], QUICK_OPEN_LIMIT - len(self.results)
+        for path in self.pending:
+            if path is not None:
+                new.append(path)
+                if len(new) >= room: self.pending = None; break
+            elif time.perf_counter() >= deadline: break
+        else: self.pending = None # Recorrida entera
+        if new:
+            self.results += new
+            self.list.addItems([f"📄 {p[p.rfind('/') + 1:]}    {p[:p.rfind('/') + 1]}" for p in new])
+            if self.list.currentRow() < 0: self.list.setCurrentRow(0)
+        total = len(self.indexer.files)
+        if self.pending is not None:
+            self.lbl_status.setText(f"🔎 {len(self.results)} de {total} archivos...")
+            self.pump_timer.start()
+        else: self.lbl_status.setText(f"{len(self.results)} de {total} archivos" if self.results else "No hay coincidencias")
+
+    def open_selected(self):
+        row = self.list.currentRow()
+        if not 0 <= row < len(self.results): return
+        self.parent().open_file(os.path.join(self.indexer.root, *self.results[row].split('/')))
+        self.accept()
@@ -0,0 +1,83 @@
+import os
+import json
+import math
+
+from utils import get_cache_dir
+
+# Peso de cada tipo de sugerencia (tipos de Jedi/LSP; 'keyword' y 'word' para las estáticas)
+KIND_WEIGHTS = {'param': 1.0, 'statement': 0.8, 'variable': 0.8, 'word': 0.7, 'property': 0.6,
+                'function': 0.6, 'instance': 0.5, 'class': 0.5, 'module': 0.3, 'keyword': 0.2, 'path': 0.2}
+ACCEPT_HALF_LIFE = 200 # Aceptaciones tras las que el peso de una palabra elegida se reduce a la mitad
+MAX_LEARNED_WORDS = 4000
+LOCAL_RADIUS = 40 # Líneas alrededor del cursor que cuentan como "cercanas"
+STATS_FILE = "completion_stats.json"
+
+
+class CompletionRanker:
+    """Ordena sugerencias por lo útiles que suelen ser en este proyecto.
+
+    Suma cuatro señales: palabras aceptadas hace poco (con decaimiento),
+    frecuencia en el documento, cercanía al cursor y tipo de sugerencia.
+    Lo aprendido se guarda por proyecto en la carpeta de caché."""
+    def __init__(self):
+        self.project_root = None
+        self.accepted = {} # palabra -> [veces, tick de la última vez]
+        self.tick = 0
+        self.dirty = False
+
+    def load(self, project_root):
+        """Cambia de proyecto: guarda lo del anterior y lee lo del nuevo."""
+        if self.project_root == project_root: return
+        self.save()
+        self.project_root, self.accepted, self.tick = project_root, {}, 0
+        try:
+            with open(os.path.join(get_cache_dir(project_root), STATS_FILE), 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            self.tick = int(data.get('tick', 0))
+            self.accepted = {w: [int(v[0]), int(v[1])] for w, v in data.get('words', {}).items()}
+        except FileNotFoundError: pass
+        except Exception as e: print(f"⚠️ No se pudieron leer las estadísticas de autocompletado: {e}")
+
+    def save(self):
+        if not self.dirty or not self.project_root: return
+        try:
+            path = os.path.join(get_cache_dir(self.project_root), STATS_FILE)
+            with open(path + ".tmp", 'w', encoding='utf-8') as f:
+                json.dump({'tick': self.tick, 'words': self.accepted}, f, separators=(',', ':'))
+            os.replace(path + ".tmp", path)
+            self.dirty = False
+        except Exception as e: print(f"⚠️ No se pudieron guardar las estadísticas de autocompletado: {e}")
+
+    def record_accept(self, word):
+        self.tick += 1
+        entry = self.accepted.get(word)
+        if entry: entry[0] += 1; entry[1] = self.tick
+        else: self.accepted[word] = [1, self.tick]
+        self.dirty = True
+        if len(self.accepted) > MAX_LEARNED_WORDS: self._prune()
+
+    def _prune(self):
+        # Se queda con la mitad que más pesa ahora mismo
+        keep = sorted(self.accepted.items(), key=lambda kv: -self._accept_weight(kv[1]))[:MAX_LEARNED_WORDS // 2]
+        self.accepted = dict(keep)
+
+    def _accept_weight(self, entry):
+        return entry[0] * 0.5 ** ((self.tick - entry[1]) / ACCEPT_HALF_LIFE)
+
+    def scores(self, names, kinds=None, counts=None, nearby=()):
+        """Puntuación de cada nombre (mayor = mejor), en el mismo orden.
+        kinds: tipo por nombre; counts: apariciones en el documento; nearby:
+        palabras cerca del cursor."""
+        accepted, tick, log1p = self.accepted, self.tick, math.log1p
+        counts = counts or {}
+        out = []
+        for i, name in enumerate(names):
+            score = KIND_WEIGHTS.get(kinds[i], 0.5) if kinds else 0.5
+            entry = accepted.get(name)
+            if entry: score += 3.0 * log1p(entry[0] * 0.5 ** ((tick - entry[1]) / ACCEPT_HALF_LIFE))
+            n = counts.get(name)
+            if n: score += log1p(n)
+            if name in nearby: score += 1.0
+            if name[:1] == '_': score -= 1.0 if name[:2] == '__' else 0.5
+            out.append(score)
+        return out
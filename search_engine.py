@@ -0,0 +1,229 @@
+import os
+import re
+import mmap
+import itertools
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from project_walker import BINARY_SNIFF
+
+# ==============================================================================
+#  MOTOR DE BÚSQUEDA EN DISCO
+# ==============================================================================
+# Sin Qt a propósito: los procesos del pool importan este módulo y conviene
+# que arranquen rápido. Los archivos se leen en bytes (mmap si son grandes),
+# la regex corre sobre los bytes y sólo se decodifican las líneas que coinciden.
+
+MMAP_MIN_SIZE = 1024 * 1024 # A partir de aquí se mapea en vez de leer
+MAX_FILE_SIZE = 50 * 1024 * 1024 # Archivos más grandes no se revisan
+BATCH_FILES = 64 # Archivos por tarea enviada a un proceso
+MMAP_CHUNK = 4 * 1024 * 1024 # Trozo que se copia de un archivo mapeado
+
+
+class SearchQuery:
+    """Búsqueda ya preparada (se envía tal cual a los procesos del pool).
+
+    - pattern: regex compilada, de bytes siempre que se puede. Sin distinguir
+      mayúsculas y con letras no ASCII es str (los bytes sólo pliegan ASCII) y
+      el archivo se decodifica entero.
+    - needle: texto literal en bytes (en minúsculas si no se distinguen) para
+      descartar archivos con un find de C antes de correr la regex.
+    - plain: la búsqueda es sólo ese literal y basta con find."""
+    def __init__(self, pattern, needle=None, case=False, plain=False):
+        self.pattern, self.needle, self.case, self.plain = pattern, needle, case, plain
+
+
+def compile_query(text, regex=False, case=False, word=False):
+    """SearchQuery para scan_file. Lanza re.error si la regex no es válida."""
+    body = text if regex else re.escape(text)
+    if word: body = rf'\b(?:{body})\b'
+    flags = re.MULTILINE | (0 if case else re.IGNORECASE)
+    if not case and not text.isascii(): return SearchQuery(re.compile(body, flags))
+    pattern = re.compile(body.encode('utf-8'), flags)
+    if regex: return SearchQuery(pattern)
+    needle = (text if case else text.lower()).encode('utf-8')
+    return SearchQuery(pattern, needle, case, plain=not word)
+
+
+def scan_file(path, query):
+    """Coincidencias de un archivo: [(ruta, línea, columna, byte de la línea)], una por línea"""
+    try:
+        with open(path, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            if size == 0 or size > MAX_FILE_SIZE: return []
+            mapped = size >= MMAP_MIN_SIZE
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if mapped else f.read()
+            try:
+                if b'\0' in data[:BINARY_SNIFF]: return []
+                pattern = query.pattern
+                if isinstance(pattern.pattern, str):
+                    text = data[:].decode('utf-8', 'replace')
+                    return scan_data(path, text, regex_locator(pattern, text), '\n')
+                locate = regex_locator(pattern, data)
+                if query.needle is not None:
+                    needle = query.needle
+                    if query.case: find = data.find
+                    elif mapped: find = folded_finder(data)
+                    else: find = data.lower().find # Sólo pliega ASCII: las posiciones no cambian
+                    if find(needle, 0) < 0: return [] # Descarte rápido antes de la regex
+                    if query.plain: locate = lambda pos: find(needle, pos)
+                return scan_data(path, data, locate, b'\n')
+            finally:
+                if mapped: data.close()
+    except (OSError, ValueError): return []
+
+
+def regex_locator(pattern, data):
+    search = pattern.search
+    def locate(pos):
+        m = search(data, pos)
+        return m.start() if m else -1
+    return locate
+
+
+def folded_finder(data, chunk=MMAP_CHUNK):
+    """find(needle, pos) sin distinguir mayúsculas ASCII sobre un mmap, pasando
+    a minúsculas un trozo cada vez en lugar de copiar el archivo entero."""
+    cached = [-1, b''] # Inicio del trozo y su copia en minúsculas
+    size = len(data)
+    def find(needle, pos):
+        overlap = len(needle) - 1
+        while pos < size:
+            start, text = cached
+            if not (start <= pos and pos + len(needle) <= start + len(text)):
+                start, text = pos, data[pos:pos + chunk + overlap].lower()
+                cached[:] = start, text
+            i = text.find(needle, pos - start)
+            if i >= 0: return start + i
+            if start + len(text) >= size: return -1
+            pos = start + len(text) - overlap # El siguiente trozo se solapa por si la aguja quedó partida
+        return -1
+    return find
+
+
+def chunked_count(data, chunk=MMAP_CHUNK):
+    """count(sub, a, b) para un mmap (que no lo tiene) sin copiar más de un trozo"""
+    def count(sub, a, b):
+        if b - a <= chunk: return data[a:b].count(sub)
+        return sum(data[i:min(i + chunk, b)].count(sub) for i in range(a, b, chunk))
+    return count
+
+
+def scan_data(path, data, locate, nl):
+    """Recorre las coincidencias que da `locate(pos) -> inicio o -1` línea a
+    línea. Cada una es (ruta, línea, columna, byte donde empieza la línea): el
+    texto no viaja, la lista lo lee del archivo al pintar la fila."""
+    hits = []
+    line, counted, pos, end = 1, 0, 0, len(data)
+    rfind, find = data.rfind, data.find
+    count = data.count if hasattr(data, 'count') else chunked_count(data)
+    offset = 0
+    while pos <= end:
+        start = locate(pos)
+        if start < 0: break
+        line_start = rfind(nl, 0, start) + 1
+        line += count(nl, counted, line_start)
+        col = start - line_start
+        if nl == b'\n':
+            prefix = data[line_start:start]
+            if not prefix.isascii(): col = len(prefix.decode('utf-8', 'replace'))
+            offset = line_start
+        else: offset += len(data[counted:line_start].encode('utf-8')) # Texto decodificado: se cuentan sus bytes
+        counted = line_start
+        hits.append((path, line, col, offset))
+        line_end = find(nl, start)
+        pos = (line_end if line_end >= 0 else end) + 1 # Una coincidencia por línea
+    return hits
+
+
+def scan_files(paths, query):
+    """Tarea de un proceso del pool: (archivos revisados, coincidencias)"""
+    hits = []
+    for path in paths: hits.extend(scan_file(path, query))
+    return len(paths), hits
+
+
+# --- TRIGRAMAS (para trigram_index) ---
+TOKEN_RE = re.compile(rb'\w{3,}') # Sólo trigramas dentro de palabras ASCII: muchos menos que en todo el texto
+
+
+def text_trigrams(data):
+    """Trigramas (bytes de 3, en minúsculas ASCII) de las palabras de `data`"""
+    grams = set()
+    for token in set(TOKEN_RE.findall(data.lower())): # Cada palabra distinta una sola vez
+        grams.update([token[i:i + 3] for i in range(len(token) - 2)])
+    return grams
+
+
+def index_files(paths, _arg=None):
+    """Tarea de un proceso del pool: [(ruta, mtime_ns, tamaño, trigramas)].
+    Binarios, vacíos y enormes van con un conjunto vacío: nunca son candidatos."""
+    out = []
+    for path in paths:
+        try:
+            with open(path, 'rb') as f:
+                st = os.fstat(f.fileno())
+                data = f.read() if 0 < st.st_size <= MAX_FILE_SIZE else b''
+        except OSError: continue
+        grams = text_trigrams(data) if data and b'\0' not in data[:BINARY_SNIFF] else set()
+        out.append((path, st.st_mtime_ns, st.st_size, grams))
+    return out
+
+
+class SearchPool:
+    """Reparte los archivos entre procesos, uno por núcleo.
+
+    El pool se crea la primera vez y se reutiliza entre búsquedas. Con un solo
+    núcleo, o si no se pueden lanzar procesos, se busca en el hilo que llama."""
+    def __init__(self, workers=None):
+        self.workers = workers or os.cpu_count() or 1
+        self._executor = None
+
+    def executor(self):
+        if self._executor is None and self.workers > 1:
+            try:
+                # spawn también en Linux: el editor tiene hilos de Qt y fork los copiaría a medias
+                self._executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context('spawn'))
+            except (OSError, ValueError, NotImplementedError) as e:
+                print(f"⚠️ Búsqueda sin procesos auxiliares: {e}")
+                self.workers = 1
+        return self._executor
+
+    def search(self, paths, query, cancelled=lambda: False):
+        """Generador de (archivos revisados, coincidencias) por tanda, según van
+        terminando. `paths` puede ser un iterador: se consume sobre la marcha."""
+        return self.imap(scan_files, paths, query, cancelled)
+
+    def imap(self, task, paths, arg, cancelled=lambda: False):
+        """Aplica `task(tanda de rutas, arg)` a tandas de BATCH_FILES archivos y
+        devuelve sus resultados según terminan. `task` debe ser de módulo (los
+        procesos la importan por nombre)."""
+        it = iter(paths)
+        batches = iter(lambda: list(itertools.islice(it, BATCH_FILES)), [])
+        executor = self.executor()
+        if executor is None:
+            for batch in batches:
+                if cancelled(): return
+                yield task(batch, arg)
+            return
+        pending = set()
+        try:
+            for batch in batches:
+                if cancelled(): return
+                pending.add(executor.submit(task, batch, arg))
+                if len(pending) >= self.workers * 2: # Sin adelantarse demasiado al recorrido
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for f in done: yield f.result()
+            while pending:
+                if cancelled(): return
+                done, pending = wait(pending, timeout=0.1, return_when=FIRST_COMPLETED)
+                for f in done: yield f.result()
+        finally:
+            for f in pending: f.cancel()
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+SEARCH_POOL = SearchPool()
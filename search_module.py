@@ -1,13 +1,224 @@
 import os
-from PySide6.QtCore import Qt
-from PySide6.QtGui import QTextDocument
-from PySide6.QtWidgets import (QWidget, QHBoxLayout, QLineEdit, QPushButton, 
-                               QDialog, QVBoxLayout, QListWidget, QListWidgetItem)
+import re
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from itertools import chain, groupby
+from PySide6.QtCore import Qt, QObject, QThread, QTimer, Signal, QAbstractListModel, QModelIndex
+from PySide6.QtGui import QTextCursor, QColor
+from PySide6.QtWidgets import (QWidget, QHBoxLayout, QLineEdit, QPushButton, QLabel,
+                               QDialog, QVBoxLayout, QTableView, QHeaderView, QAbstractItemView, QTextEdit)
+
+from lsp_client import utf16_len, utf16_to_index
+from search_engine import SEARCH_POOL, MAX_FILE_SIZE, compile_query
+from project_walker import walk_project
+from trigram_index import required_literals
+
+FIND_DEBOUNCE_MS = 150 # Pausa al escribir antes de volver a buscar
+INLINE_REFRESH_BLOCKS = 2000 # Ediciones más grandes se rebuscan en el hilo
+MAX_VIEW_HIGHLIGHTS = 1000 # Resaltados como máximo en la zona visible
+BULK_REPLACE_BLOCKS = 3000 # Reemplazos que abarcan más bloques se resaltan en segundo plano
+MATCH_COLOR = QColor(255, 170, 0, 70)
+
+# ==============================================================================
+#  MOTOR DE BÚSQUEDA LOCAL
+# ==============================================================================
+# El índice guarda el inicio y la longitud (en posiciones de Qt, UTF-16) de
+# cada coincidencia, ordenados. Ir a la siguiente, contar "n de m" y saber qué
+# resaltar en pantalla es un bisect. Las búsquedas son línea a línea, así que
+# una edición sólo obliga a revisar los bloques que tocó.
+
+def compile_pattern(text, regex=False, case=False, word=False):
+    """Patrón con las opciones del panel. Lanza re.error si la regex no es válida."""
+    body = text if regex else re.escape(text)
+    if word: body = rf'\b(?:{body})\b'
+    return re.compile(body, 0 if case else re.IGNORECASE)
+
+
+def scan_line(pattern, line, base, starts, lengths):
+    """Añade a starts/lengths las coincidencias de una línea que empieza en `base`."""
+    plain = line.isascii()
+    for m in pattern.finditer(line):
+        s, e = m.span()
+        if s == e: continue # Las coincidencias vacías ('a*') no se pueden seleccionar
+        if not plain: s, e = utf16_len(line[:s]), utf16_len(line[:e])
+        starts.append(base + s); lengths.append(e - s)
+
+
+# Hilos en marcha: se mantienen vivos aunque el motor ya no los espere
+_RUNNING_FINDS = set()
+
+
+class FindWorker(QThread):
+    """Recorre una copia del documento fuera del hilo de la interfaz"""
+    matches_ready = Signal(int, object, object) # generación, inicios, longitudes
+    def __init__(self, generation, pattern, text):
+        super().__init__()
+        self.generation, self.pattern, self.text = generation, pattern, text
+        self.cancelled = False
+        _RUNNING_FINDS.add(self)
+        self.finished.connect(lambda: _RUNNING_FINDS.discard(self))
+
+    def run(self):
+        starts, lengths = array('i'), array('i')
+        base = 0
+        for n, line in enumerate(self.text.split('\n')):
+            if n % 2000 == 0 and self.cancelled: return
+            scan_line(self.pattern, line, base, starts, lengths)
+            base += utf16_len(line) + 1
+        if not self.cancelled: self.matches_ready.emit(self.generation, starts, lengths)
+
+
+class FindEngine(QObject):
+    """Índice de coincidencias del editor activo.
+
+    Se construye en un FindWorker y, una vez listo, cada edición sólo vuelve a
+    buscar en sus bloques (regiones sucias de DocumentAccess) y desplaza las
+    posiciones que quedan detrás."""
+    matches_changed = Signal()
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.editor = None
+        self.token = None
+        self.pattern = None
+        self.starts, self.lengths = array('i'), array('i')
+        self.ready = True # False mientras el hilo construye el índice
+        self.generation = 0
+        self.worker = None
+        self.char_count = 0 # characterCount() del documento que refleja el índice
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.setSingleShot(True)
+        self.refresh_timer.setInterval(FIND_DEBOUNCE_MS)
+        self.refresh_timer.timeout.connect(self.refresh)
+
+    def attach(self, editor):
+        if editor is self.editor: return
+        self.detach()
+        if editor is None: return
+        self.editor = editor
+        self.token = editor.doc_access.track()
+        editor.document().contentsChange.connect(self.on_contents_change)
+        self.rebuild()
+
+    def detach(self):
+        if self.editor is None: return
+        self.cancel()
+        self.refresh_timer.stop()
+        try:
+            self.editor.document().contentsChange.disconnect(self.on_contents_change)
+            self.editor.doc_access.untrack(self.token)
+        except RuntimeError: pass # Pestaña ya cerrada
+        self.editor = self.token = None
+        self.starts, self.lengths, self.ready = array('i'), array('i'), True
+
+    def set_pattern(self, pattern):
+        self.pattern = pattern
+        self.rebuild()
+
+    def rebuild(self):
+        self.cancel()
+        self.generation += 1
+        self.starts, self.lengths = array('i'), array('i')
+        if self.editor is None or self.pattern is None:
+            self.ready = True; self.matches_changed.emit(); return
+        self.ready = False
+        doc_access = self.editor.doc_access
+        doc_access.take_dirty(self.token) # El hilo parte del texto actual
+        self.char_count = self.editor.document().characterCount()
+        self.worker = FindWorker(self.generation, self.pattern, doc_access.snapshot())
+        self.worker.matches_ready.connect(self.on_matches_ready)
+        self.worker.start()
+
+    def cancel(self):
+        if self.worker:
+            self.worker.cancelled = True
+            self.worker.matches_ready.disconnect(self.on_matches_ready)
+            self.worker = None
+
+    def on_matches_ready(self, generation, starts, lengths):
+        if generation != self.generation: return
+        self.worker = None
+        self.starts, self.lengths, self.ready = starts, lengths, True
+        self.refresh() # Ediciones hechas mientras el hilo buscaba
+
+    def on_contents_change(self, pos, removed, added):
+        if self.pattern is not None and self.ready: self.refresh_timer.start()
+
+    def refresh(self):
+        """Vuelve a buscar sólo en los bloques editados desde la última vez"""
+        if not self.ready or self.editor is None: return
+        region = self.editor.doc_access.take_dirty(self.token)
+        if region is None or self.pattern is None: self.matches_changed.emit(); return
+        first, last, _delta = region
+        if last - first > INLINE_REFRESH_BLOCKS: self.rebuild(); return
+        doc = self.editor.document()
+        block = doc.findBlockByNumber(first)
+        end = doc.findBlockByNumber(last)
+        if not end.isValid(): end = doc.lastBlock()
+        lo_pos, hi_pos = block.position(), end.position() + end.length()
+        count = doc.characterCount()
+        shift, self.char_count = count - self.char_count, count
+        # Lo anterior a la región sigue igual; lo posterior sólo se desplaza
+        lo = bisect_left(self.starts, lo_pos)
+        hi = bisect_left(self.starts, hi_pos - shift)
+        starts, lengths = array('i'), array('i')
+        while block.isValid() and block.blockNumber() <= last:
+            scan_line(self.pattern, block.text(), block.position(), starts, lengths)
+            block = block.next()
+        tail = self.starts[hi:]
+        if shift: tail = array('i', [s + shift for s in tail])
+        self.starts = self.starts[:lo] + starts + tail
+        self.lengths = self.lengths[:lo] + lengths + self.lengths[hi:]
+        self.matches_changed.emit()
+
+    # --- CONSULTAS (bisect sobre el índice) ---
+    def count(self):
+        return len(self.starts)
+
+    def index_of(self, start, end):
+        """Índice de la coincidencia que ocupa exactamente [start, end), o -1"""
+        i = bisect_left(self.starts, start)
+        if i < len(self.starts) and self.starts[i] == start and self.lengths[i] == end - start: return i
+        return -1
+
+    def next_index(self, pos, include_pos=False):
+        """Primera coincidencia después de `pos` (o en `pos`), dando la vuelta al final"""
+        if not self.starts: return -1
+        i = (bisect_left if include_pos else bisect_right)(self.starts, pos)
+        return i if i < len(self.starts) else 0
+
+    def prev_index(self, pos):
+        if not self.starts: return -1
+        return (bisect_left(self.starts, pos) - 1) % len(self.starts)
+
+    def span(self, i):
+        return self.starts[i], self.starts[i] + self.lengths[i]
+
+    def in_range(self, first_pos, last_pos):
+        """Índices de las coincidencias que empiezan en [first_pos, last_pos)"""
+        return range(bisect_left(self.starts, first_pos), bisect_left(self.starts, last_pos))
+
+    def blocks_with_matches(self):
+        """Números de bloque con alguna coincidencia, del último al primero"""
+        doc = self.editor.document()
+        if not self.ready: return range(doc.blockCount() - 1, -1, -1)
+        numbers = []
+        for s in self.starts:
+            n = doc.findBlock(s).blockNumber()
+            if not numbers or numbers[-1] != n: numbers.append(n)
+        return reversed(numbers)
+
+
+# ==============================================================================
+#  PANEL DE BÚSQUEDA LOCAL
+# ==============================================================================
 
 class SearchWidget(QWidget):
     def __init__(self, parent=None):
         super().__init__(parent)
         self.main_window = parent 
+        self.engine = FindEngine(self) # Antes de hide(): hideEvent lo usa
+        self.engine.matches_changed.connect(self.on_matches_changed)
         self.setFixedHeight(50)
         self.hide() 
         
@@ -21,83 +232,536 @@ class SearchWidget(QWidget):
         self.input_search = QLineEdit()
         self.input_search.setPlaceholderText("Buscar en este archivo...")
         self.input_search.returnPressed.connect(self.find_next)
+        self.input_search.textChanged.connect(lambda _: self.search_timer.start())
+
+        # Opciones: expresión regular, mayúsculas y palabra completa
+        self.btn_regex = self.option_button(".*", "Expresión regular")
+        self.btn_case = self.option_button("Aa", "Distinguir mayúsculas")
+        self.btn_word = self.option_button("ab", "Palabra completa")
+        self.lbl_count = QLabel("")
+        self.lbl_count.setMinimumWidth(90)
         
         self.btn_prev = QPushButton("⬆")
         self.btn_next = QPushButton("⬇")
         self.btn_prev.clicked.connect(self.find_prev)
         self.btn_next.clicked.connect(self.find_next)
+
+        self.input_replace = QLineEdit()
+        self.input_replace.setPlaceholderText("Reemplazar por...")
+        self.input_replace.returnPressed.connect(self.replace_next)
+        self.btn_replace = QPushButton("Reemplazar")
+        self.btn_replace.clicked.connect(self.replace_next)
+        self.btn_replace_all = QPushButton("Todo")
+        self.btn_replace_all.setToolTip("Reemplazar todas (se deshace de una vez)")
+        self.btn_replace_all.clicked.connect(self.replace_all)
         
         layout.addWidget(self.btn_close)
         layout.addWidget(self.input_search)
-        layout.addWidget(self.btn_prev)
-        layout.addWidget(self.btn_next)
+        for w in (self.btn_regex, self.btn_case, self.btn_word, self.lbl_count, self.btn_prev, self.btn_next,
+                  self.input_replace, self.btn_replace, self.btn_replace_all):
+            layout.addWidget(w)
         self.setStyleSheet("background-color: #252526; border-top: 1px solid #3e3e42;")
 
+        self.jump_pending = False # Saltar a la primera coincidencia cuando el índice esté listo
+        self.invalid = False # La regex escrita no compila
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(FIND_DEBOUNCE_MS)
+        self.search_timer.timeout.connect(self.update_pattern)
+        if hasattr(self.main_window, 'tabs'):
+            self.main_window.tabs.currentChanged.connect(lambda _: self.isVisible() and self.attach_editor())
+
+    def option_button(self, text, tip):
+        btn = QPushButton(text)
+        btn.setCheckable(True); btn.setToolTip(tip); btn.setFixedWidth(30)
+        btn.toggled.connect(lambda _: self.update_pattern())
+        return btn
+
     def get_active_editor(self):
         if hasattr(self.main_window, 'tabs') and self.main_window.tabs.currentWidget():
             return self.main_window.tabs.currentWidget().editor
         return None
 
-    def find_next(self):
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.attach_editor()
+        self.input_search.setFocus(); self.input_search.selectAll()
+
+    def hideEvent(self, event):
+        super().hideEvent(event)
+        self.detach_editor()
+
+    def attach_editor(self):
         editor = self.get_active_editor()
-        if editor:
-            found = editor.find(self.input_search.text())
-            if not found: # Loop al inicio
-                editor.moveCursor(editor.textCursor().Start)
-                editor.find(self.input_search.text())
+        if editor is self.engine.editor: return
+        self.detach_editor()
+        if editor is None: return
+        editor.verticalScrollBar().valueChanged.connect(self.highlight_visible)
+        self.engine.attach(editor)
+        self.update_pattern()
+
+    def detach_editor(self):
+        editor = self.engine.editor
+        if editor is None: return
+        try:
+            editor.verticalScrollBar().valueChanged.disconnect(self.highlight_visible)
+            editor.set_search_selections([])
+        except RuntimeError: pass # Pestaña ya cerrada
+        self.engine.detach()
+
+    def update_pattern(self):
+        self.attach_editor()
+        text = self.input_search.text()
+        try:
+            pattern = compile_pattern(text, self.btn_regex.isChecked(), self.btn_case.isChecked(),
+                                      self.btn_word.isChecked()) if text else None
+        except re.error:
+            pattern = None
+        self.invalid = bool(text) and pattern is None
+        if pattern is not None and self.engine.pattern is not None and pattern.pattern == self.engine.pattern.pattern \
+                and pattern.flags == self.engine.pattern.flags: return
+        self.jump_pending = pattern is not None
+        self.engine.set_pattern(pattern)
+
+    def on_matches_changed(self):
+        if self.jump_pending and self.engine.ready:
+            self.jump_pending = False
+            editor = self.engine.editor
+            i = self.engine.next_index(editor.textCursor().selectionStart(), include_pos=True)
+            if i >= 0: self.select_match(i); return
+        self.update_count()
+        self.highlight_visible()
+
+    def update_count(self):
+        engine = self.engine
+        if engine.pattern is None: self.lbl_count.setText("Regex no válida" if self.invalid else ""); return
+        if not engine.ready: self.lbl_count.setText("Buscando..."); return
+        if not engine.count(): self.lbl_count.setText("Sin resultados"); return
+        c = engine.editor.textCursor()
+        i = engine.index_of(c.selectionStart(), c.selectionEnd())
+        self.lbl_count.setText(f"{i + 1} de {engine.count()}" if i >= 0 else f"{engine.count()} resultados")
+
+    def highlight_visible(self, *_):
+        """Resalta las coincidencias de la zona visible del editor"""
+        editor, engine = self.engine.editor, self.engine
+        if editor is None: return
+        first, last = editor.visible_block_range()
+        doc = editor.document()
+        end_block = doc.findBlockByNumber(last)
+        end = end_block.position() + end_block.length() if end_block.isValid() else doc.characterCount()
+        selections = []
+        for i in engine.in_range(doc.findBlockByNumber(first).position(), end)[:MAX_VIEW_HIGHLIGHTS]:
+            sel = QTextEdit.ExtraSelection()
+            sel.format.setBackground(MATCH_COLOR)
+            sel.cursor = QTextCursor(doc)
+            start, stop = engine.span(i)
+            sel.cursor.setPosition(start); sel.cursor.setPosition(stop, QTextCursor.KeepAnchor)
+            selections.append(sel)
+        editor.set_search_selections(selections)
+
+    def select_match(self, i):
+        editor = self.engine.editor
+        start, end = self.engine.span(i)
+        c = editor.textCursor()
+        c.setPosition(start); c.setPosition(end, QTextCursor.KeepAnchor)
+        editor.setTextCursor(c); editor.ensureCursorVisible()
+        self.update_count()
+        self.highlight_visible()
+
+    def find_next(self):
+        self.step(forward=True)
 
     def find_prev(self):
-        editor = self.get_active_editor()
-        if editor:
-            editor.find(self.input_search.text(), QTextDocument.FindBackward)
+        self.step(forward=False)
 
-class GlobalSearchDialog(QDialog):
+    def step(self, forward):
+        self.attach_editor()
+        if self.search_timer.isActive(): self.search_timer.stop(); self.update_pattern()
+        engine = self.engine
+        if engine.editor is None or engine.pattern is None: return
+        if not engine.ready: # Índice en construcción: se salta al terminar
+            self.jump_pending = True; return
+        c = engine.editor.textCursor()
+        i = engine.next_index(c.selectionStart()) if forward else engine.prev_index(c.selectionStart())
+        if i >= 0: self.select_match(i)
+
+    # --- REEMPLAZO ---
+    def replacement_for(self, match):
+        repl = self.input_replace.text()
+        return match.expand(repl) if self.btn_regex.isChecked() else repl
+
+    def replacement_ok(self, match):
+        """Prueba la plantilla con una coincidencia antes de tocar el documento
+        (\\9 sin ese grupo, un nombre que no existe...)"""
+        try: self.replacement_for(match); return True
+        except (re.error, IndexError) as e:
+            self.lbl_count.setText("Reemplazo no válido")
+            if hasattr(self.main_window, 'status_bar'): self.main_window.status_bar.showMessage(f"❌ Reemplazo no válido: {e}", 5000)
+            return False
+
+    def replace_next(self):
+        """Reemplaza la coincidencia seleccionada y pasa a la siguiente"""
+        engine = self.engine
+        editor = engine.editor
+        if editor is None or engine.pattern is None or not engine.ready: return
+        c = editor.textCursor()
+        if engine.index_of(c.selectionStart(), c.selectionEnd()) >= 0:
+            block = editor.document().findBlock(c.selectionStart())
+            text = block.text()
+            try: m = engine.pattern.match(text, utf16_to_index(text, c.selectionStart() - block.position()))
+            except ValueError: m = None
+            if m:
+                if not self.replacement_ok(m): return
+                c.insertText(self.replacement_for(m))
+        engine.refresh_timer.stop(); engine.refresh()
+        self.find_next()
+
+    def replace_all(self):
+        """Reemplaza todas las coincidencias en un único bloque de edición:
+        un solo paso de deshacer y una sola actualización del documento"""
+        self.attach_editor()
+        engine = self.engine
+        editor = engine.editor
+        if editor is None or engine.pattern is None or editor.isReadOnly(): return
+        doc = editor.document()
+        if engine.refresh_timer.isActive(): engine.refresh_timer.stop(); engine.refresh() # Lo escrito durante la espera
+        numbers = list(engine.blocks_with_matches()) # Del final al principio: las posiciones previas no se mueven
+        if not numbers: return
+        first = next((m for m in engine.pattern.finditer(doc.findBlockByNumber(numbers[-1]).text()) if m.end() > m.start()), None)
+        if first is not None and not self.replacement_ok(first): return
+        # Cambios repartidos por miles de bloques: se resaltan después, en segundo plano
+        bulk = numbers[0] - numbers[-1] >= BULK_REPLACE_BLOCKS and editor.highlighter.begin_bulk_edit()
+        cursor = QTextCursor(doc)
+        count = 0
+        cursor.beginEditBlock()
+        try:
+            for number in numbers:
+                block = doc.findBlockByNumber(number)
+                text, base = block.text(), block.position()
+                plain = text.isascii()
+                for m in reversed([m for m in engine.pattern.finditer(text) if m.end() > m.start()]):
+                    s, e = m.span()
+                    if not plain: s, e = utf16_len(text[:s]), utf16_len(text[:e])
+                    cursor.setPosition(base + s); cursor.setPosition(base + e, QTextCursor.KeepAnchor)
+                    cursor.insertText(self.replacement_for(m))
+                    count += 1
+        finally: # Un bloque de edición sin cerrar deja el documento sin avisar de más cambios
+            cursor.endEditBlock()
+            if bulk: editor.highlighter.end_bulk_edit()
+        if hasattr(self.main_window, 'status_bar'): self.main_window.status_bar.showMessage(f"🔁 {count} reemplazos", 4000)
+
+# ==============================================================================
+#  BÚSQUEDA GLOBAL
+# ==============================================================================
+
+RESULT_BATCH = 200 # Resultados por envío a la interfaz
+RESULT_BATCH_MS = 100 # ... o cada tanto tiempo, lo que llegue antes
+GLOBAL_DEBOUNCE_MS = 300 # Pausa al escribir antes de lanzar la búsqueda
+LIST_BUDGET_MS = 8 # Tiempo por pasada para añadir resultados a la lista
+MAX_RESULTS = 1000000 # Tope de resultados guardados (unos 12 bytes cada uno)
+AUTO_EXPAND_RESULTS = 2000 # Los archivos se despliegan solos hasta este número de filas
+PREVIEW_BYTES = 400 # Bytes de la línea que se leen para mostrarla
+PREVIEW_CACHE = 2000 # Líneas leídas que se recuerdan (las de la zona visible)
+
+
+class GlobalSearchWorker(QThread):
+    """Recorre el proyecto (o sólo los candidatos del índice de trigramas, si
+    está listo) y reparte los archivos entre los procesos de SEARCH_POOL;
+    envía los resultados a la interfaz por tandas.
+
+    Cada resultado es (ruta, línea, columna, byte de la línea). cancel() deja
+    de repartir archivos y descarta las tareas que aún no empezaron."""
+    results_ready = Signal(int, list) # generación, tanda de resultados
+    progress = Signal(int, int, int) # generación, archivos revisados, resultados
+    search_done = Signal(int, int, int, float, bool) # generación, archivos, resultados, segundos, con índice
+    def __init__(self, generation, root_dir, query, index=None, indexer=None):
+        super().__init__()
+        self.generation, self.root_dir, self.query, self.index = generation, root_dir, query, index
+        self.indexer = indexer # Se le avisa de los archivos que el índice tenía viejos
+        self.cancelled = False
+        _RUNNING_FINDS.add(self)
+        self.finished.connect(lambda: _RUNNING_FINDS.discard(self))
+
+    def cancel(self):
+        self.cancelled = True
+
+    def run(self):
+        started = time.perf_counter()
+        batch, files, hits = [], 0, 0
+        last_emit = time.perf_counter()
+        cancelled = lambda: self.cancelled
+        try:
+            if self.index is not None:
+                candidates = self.index.candidates(required_literals(self.query))
+                # Y los que cambiaron sin que el índice se enterase, mientras se revisan los candidatos
+                paths = chain(candidates, self.changed_files(set(candidates)))
+            else: paths = walk_project(self.root_dir, text_only=True, max_size=MAX_FILE_SIZE)
+            for n, found in SEARCH_POOL.search(paths, self.query, cancelled):
+                files += n
+                batch.extend(found)
+                now = time.perf_counter()
+                if len(batch) >= RESULT_BATCH or (now - last_emit) * 1000 >= RESULT_BATCH_MS:
+                    hits += len(batch)
+                    if batch: self.results_ready.emit(self.generation, batch)
+                    self.progress.emit(self.generation, files, hits)
+                    batch, last_emit = [], now
+        except Exception as e: print(f"⚠️ Error en la búsqueda global: {e}")
+        if self.cancelled: return
+        hits += len(batch)
+        if batch: self.results_ready.emit(self.generation, batch)
+        self.search_done.emit(self.generation, files, hits, time.perf_counter() - started, self.index is not None)
+
+    def changed_files(self, skip):
+        """Archivos que el índice tiene viejos: se buscan en disco y se reindexan"""
+        for path in self.index.changed_files(skip):
+            if self.cancelled: return
+            if self.indexer is not None: self.indexer.file_changed(path)
+            if os.path.isfile(path): yield path
+
+
+class SearchResultsModel(QAbstractListModel):
+    """Resultados de la búsqueda global agrupados por archivo, en una lista plana.
+
+    Nada de un item por resultado: línea, columna y byte de inicio de la línea
+    van en arrays (unos 12 bytes por resultado) y cada archivo guarda dónde
+    empiezan los suyos y cuántos son. Cada archivo ocupa una fila de cabecera
+    y, si está desplegado, una más por resultado; `row_start` (la fila de cada
+    cabecera) lleva de fila a archivo con bisect. El texto se lee del archivo
+    sólo al pintar la fila. Lista y no árbol: QTreeView vuelve a preguntar por
+    todos los archivos en cada inserción."""
     def __init__(self, root_dir, parent=None):
+        super().__init__(parent)
+        self.root_dir = root_dir
+        self.clear()
+
+    def clear(self):
+        self.beginResetModel()
+        self.paths = [] # Archivo -> ruta
+        self.first = array('I') # Archivo -> primer resultado
+        self.counts = array('I') # Archivo -> número de resultados
+        self.expanded = bytearray() # Archivo -> 1 si se ven sus resultados
+        self.row_start = array('I') # Archivo -> fila de su cabecera
+        self.rows = 0
+        self.lines, self.cols, self.offsets = array('I'), array('I'), array('I')
+        self.previews = {} # Resultado -> texto ya leído
+        self.endResetModel()
+
+    def hit_count(self):
+        return len(self.lines)
+
+    def add_hits(self, hits):
+        """Añade una tanda (los resultados de cada archivo, seguidos). Los
+        archivos se despliegan solos hasta AUTO_EXPAND_RESULTS resultados.
+        Devuelve cuántos entraron antes del tope MAX_RESULTS."""
+        hits = hits[:MAX_RESULTS - len(self.lines)]
+        groups = [(path, list(group)) for path, group in groupby(hits, key=lambda h: h[0])]
+        if groups and self.paths and groups[0][0] == self.paths[-1]:
+            # El último archivo sigue en esta tanda
+            _path, group = groups.pop(0)
+            last = len(self.paths) - 1
+            if self.expanded[last]: self.beginInsertRows(QModelIndex(), self.rows, self.rows + len(group) - 1)
+            self._append(group)
+            self.counts[last] += len(group)
+            if self.expanded[last]:
+                self.rows += len(group)
+                self.endInsertRows()
+            header = self.index(self.row_start[last])
+            self.dataChanged.emit(header, header) # La cuenta de la cabecera
+        if groups:
+            rows = self.rows
+            for _path, group in groups: rows += 1 + (len(group) if len(self.lines) < AUTO_EXPAND_RESULTS else 0)
+            self.beginInsertRows(QModelIndex(), self.rows, rows - 1)
+            for path, group in groups:
+                expand = len(self.lines) < AUTO_EXPAND_RESULTS
+                self.paths.append(path); self.first.append(len(self.lines)); self.counts.append(len(group))
+                self.expanded.append(expand); self.row_start.append(self.rows)
+                self.rows += 1 + (len(group) if expand else 0)
+                self._append(group)
+            self.endInsertRows()
+        return len(hits)
+
+    def _append(self, group):
+        self.lines.extend([h[1] for h in group])
+        self.cols.extend([h[2] for h in group])
+        self.offsets.extend([h[3] for h in group])
+
+    def locate(self, row):
+        """(archivo, resultado) de una fila; resultado -1 en las cabeceras"""
+        f = bisect_right(self.row_start, row) - 1
+        r = row - self.row_start[f]
+        return f, (self.first[f] + r - 1 if r else -1)
+
+    def location(self, index):
+        """(ruta, línea, columna) de una fila de resultado, o None"""
+        if not index.isValid(): return None
+        f, hit = self.locate(index.row())
+        if hit < 0: return None
+        return self.paths[f], self.lines[hit], self.cols[hit]
+
+    def toggle(self, index):
+        """Pliega o despliega el archivo de una cabecera. Devuelve False si no lo es."""
+        if not index.isValid(): return False
+        f, hit = self.locate(index.row())
+        if hit >= 0: return False
+        row, n = self.row_start[f], self.counts[f]
+        if self.expanded[f]:
+            self.beginRemoveRows(QModelIndex(), row + 1, row + n)
+            self.expanded[f] = 0
+            delta = -n
+        else:
+            self.beginInsertRows(QModelIndex(), row + 1, row + n)
+            self.expanded[f] = 1
+            delta = n
+        self.row_start[f + 1:] = array('I', [r + delta for r in self.row_start[f + 1:]])
+        self.rows += delta
+        self.endRemoveRows() if delta < 0 else self.endInsertRows()
+        self.dataChanged.emit(index, index)
+        return True
+
+    def preview(self, f, hit):
+        text = self.previews.get(hit)
+        if text is None:
+            try:
+                with open(self.paths[f], 'rb') as fh:
+                    fh.seek(self.offsets[hit])
+                    text = fh.readline(PREVIEW_BYTES).decode('utf-8', 'replace').strip()
+            except OSError: text = ""
+            if len(self.previews) >= PREVIEW_CACHE: self.previews.clear()
+            self.previews[hit] = text
+        return text
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self.rows
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or index.row() >= self.rows: return None
+        f, hit = self.locate(index.row())
+        if hit < 0: # Cabecera del archivo
+            if role == Qt.DisplayRole:
+                arrow = "▾" if self.expanded[f] else "▸"
+                return f"{arrow} 📄 {os.path.relpath(self.paths[f], self.root_dir)}  ({self.counts[f]})"
+            if role == Qt.ToolTipRole: return self.paths[f]
+            return None
+        if role == Qt.DisplayRole: return f"      {self.lines[hit]}:{self.cols[hit] + 1}   {self.preview(f, hit)[:200]}"
+        return None
+
+
+class GlobalSearchDialog(QDialog):
+    def __init__(self, root_dir, parent=None, indexer=None):
         super().__init__(parent)
         self.setWindowTitle("Búsqueda Global")
         self.resize(700, 500)
         self.root_dir = root_dir
+        self.indexer = indexer # ProjectIndexer: con el índice listo sólo se revisan candidatos
+        self.worker = None
+        self.generation = 0
+        self.pending = [] # Tandas recibidas del hilo que aún no están en la lista
+        self.drain_timer = QTimer(self)
+        self.drain_timer.setInterval(0)
+        self.drain_timer.timeout.connect(self.drain_results)
         
         layout = QVBoxLayout(self)
         self.input_line = QLineEdit()
-        self.input_line.setPlaceholderText("Buscar en todo el proyecto (Enter)...")
+        self.input_line.setPlaceholderText("Buscar en todo el proyecto...")
         self.input_line.returnPressed.connect(self.do_search)
+        # Cada letra cancela la búsqueda en curso; la nueva sale tras una pausa
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(GLOBAL_DEBOUNCE_MS)
+        self.search_timer.timeout.connect(self.do_search)
+        self.input_line.textChanged.connect(self.on_text_changed)
+        options = QHBoxLayout()
+        self.btn_regex = self.option_button(".*", "Expresión regular")
+        self.btn_case = self.option_button("Aa", "Distinguir mayúsculas")
+        self.btn_word = self.option_button("ab", "Palabra completa")
+        options.addWidget(self.input_line)
+        for btn in (self.btn_regex, self.btn_case, self.btn_word): options.addWidget(btn)
         
-        self.results_list = QListWidget()
-        self.results_list.itemDoubleClicked.connect(self.open_file)
+        self.model = SearchResultsModel(root_dir, self)
+        # Tabla de una columna y no QListView: ésta recorre todas las filas (llamando
+        # al modelo de Python) en cada inserción; la tabla sólo pide las visibles
+        view = self.results_view = QTableView()
+        view.setModel(self.model)
+        view.horizontalHeader().hide(); view.verticalHeader().hide()
+        view.horizontalHeader().setStretchLastSection(True)
+        view.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        view.verticalHeader().setDefaultSectionSize(view.fontMetrics().height() + 4)
+        view.setShowGrid(False); view.setWordWrap(False)
+        view.setSelectionBehavior(QAbstractItemView.SelectRows); view.setSelectionMode(QAbstractItemView.SingleSelection)
+        view.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        view.activated.connect(self.open_result)
+        self.lbl_status = QLabel("")
         
-        layout.addWidget(self.input_line)
-        layout.addWidget(self.results_list)
+        layout.addLayout(options)
+        layout.addWidget(self.results_view)
+        layout.addWidget(self.lbl_status)
+
+    def option_button(self, text, tip):
+        btn = QPushButton(text)
+        btn.setCheckable(True); btn.setToolTip(tip); btn.setFixedWidth(30)
+        btn.toggled.connect(lambda _: self.on_text_changed(None))
+        return btn
+
+    def on_text_changed(self, _text):
+        self.cancel_search()
+        self.search_timer.start()
+
+    def cancel_search(self):
+        self.generation += 1 # Lo que aún llegue del hilo anterior se descarta
+        self.pending = []
+        self.drain_timer.stop()
+        if self.worker:
+            self.worker.cancel()
+            self.worker = None
 
     def do_search(self):
-        text = self.input_line.text().lower()
-        if not text: return
-        self.results_list.clear()
-        
-        # EXCLUSIONES PARA VELOCIDAD
-        exclude = {'.git', '__pycache__', 'node_modules', 'venv', '.env'}
-        
-        for root, dirs, files in os.walk(self.root_dir):
-            dirs[:] = [d for d in dirs if d not in exclude] # Filtrar carpetas pesadas
-            
-            for file in files:
-                if file.endswith(('.py', '.js', '.html', '.css', '.json', '.txt', '.md')):
-                    full_path = os.path.join(root, file)
-                    try:
-                        with open(full_path, 'r', encoding='utf-8', errors='ignore') as f:
-                            for i, line in enumerate(f):
-                                if text in line.lower():
-                                    rel_path = os.path.relpath(full_path, self.root_dir)
-                                    item = QListWidgetItem(f"{rel_path}:{i+1} -> {line.strip()[:80]}")
-                                    item.setData(Qt.UserRole, (full_path, i+1))
-                                    self.results_list.addItem(item)
-                    except: pass
-        
-        if self.results_list.count() == 0:
-            self.results_list.addItem("No hay resultados.")
-
-    def open_file(self, item):
-        path, line = item.data(Qt.UserRole)
-        self.parent().open_file(path)
-        # Aquí podrías añadir lógica para ir a la línea específica
-        self.accept()
\ No newline at end of file
+        self.search_timer.stop()
+        self.cancel_search()
+        text = self.input_line.text()
+        self.model.clear()
+        if not text: self.lbl_status.setText(""); return
+        try: query = compile_query(text, self.btn_regex.isChecked(), self.btn_case.isChecked(), self.btn_word.isChecked())
+        except re.error as e: self.lbl_status.setText(f"❌ Regex no válida: {e}"); return
+        self.lbl_status.setText("🔎 Buscando...")
+        index = self.indexer.current(self.root_dir) if self.indexer else None
+        self.worker = GlobalSearchWorker(self.generation, self.root_dir, query, index, self.indexer)
+        self.worker.results_ready.connect(self.on_results)
+        self.worker.progress.connect(self.on_progress)
+        self.worker.search_done.connect(self.on_search_done)
+        self.worker.start()
+
+    def on_results(self, generation, batch):
+        if generation != self.generation: return
+        self.pending.append(batch)
+        self.drain_timer.start()
+
+    def drain_results(self):
+        """Pasa resultados al modelo con presupuesto de tiempo: el hilo puede
+        producir más deprisa de lo que la vista los pinta"""
+        deadline = time.perf_counter() + LIST_BUDGET_MS / 1000
+        while self.pending and time.perf_counter() < deadline:
+            batch = self.pending.pop(0)
+            if self.model.add_hits(batch) < len(batch):
+                self.cancel_search()
+                self.lbl_status.setText(f"⚠️ Búsqueda detenida: tope de {MAX_RESULTS} resultados")
+        if not self.pending: self.drain_timer.stop()
+
+    def on_progress(self, generation, files, hits):
+        if generation == self.generation: self.lbl_status.setText(f"🔎 {files} archivos · {hits} resultados")
+
+    def on_search_done(self, generation, files, hits, seconds, indexed):
+        if generation != self.generation: return
+        self.worker = None
+        source = "candidatos del índice" if indexed else "archivos"
+        self.lbl_status.setText(f"✅ {files} {source} · {hits} resultados · {seconds:.2f} s" if hits else f"✅ {files} {source} · No hay resultados")
+
+    def done(self, result):
+        # Cerrar (aceptar, Esc o la X) corta la búsqueda en curso
+        self.search_timer.stop()
+        self.cancel_search()
+        super().done(result)
+
+    def open_result(self, index):
+        if self.model.toggle(index): return # Cabecera: Enter / doble clic pliega o despliega
+        self.parent().open_file_at(*self.model.location(index))
+        self.accept()
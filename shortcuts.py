@@ -4,6 +4,7 @@ SHORTCUTS_DATA = {
     "📁 Archivo": [
         ("Nuevo Archivo", "Ctrl + N"),
         ("Abrir Archivo", "Ctrl + O"),
+        ("Ir a Archivo", "Ctrl + P"),
         ("Guardar", "Ctrl + S"),
         ("Guardar Como", "Ctrl + Shift + S"),
         ("Cerrar Pestaña", "Ctrl + W"),
@@ -28,5 +29,7 @@ SHORTCUTS_DATA = {
         ("Búsqueda Local", "Ctrl + F"),
         ("Búsqueda Global", "Ctrl + Shift + F"),
         ("Alternar Sidebar", "Clic en Cabecera"),
+        ("Eliminar en el Árbol", "Supr"),
+        ("Copiar al Soltar en el Árbol", "Ctrl + Arrastrar"),
     ]
 }
\ No newline at end of file
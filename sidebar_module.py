@@ -1,37 +1,396 @@
 import os
-import shutil
-from PySide6.QtCore import Qt, QDir
-from PySide6.QtWidgets import (QFileSystemModel, QTreeView, QMenu, QInputDialog, 
-                               QMessageBox, QWidget, QVBoxLayout, QPushButton, QSizePolicy)
+import threading
+from collections import deque
+from PySide6.QtCore import Qt, QThread, Signal, QAbstractItemModel, QModelIndex, QMimeData, QUrl
+from PySide6.QtWidgets import (QTreeView, QMenu, QInputDialog, QAbstractItemView,
+                               QMessageBox, QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QSizePolicy,
+                               QLabel, QProgressBar, QToolButton)
 from PySide6.QtGui import QFont
 
+from project_walker import IGNORE_FILES, IgnoreMatcher, ignored_names
+from file_operations import FileOperation, FileOperationQueue, plan
+
+TREE_CHUNK = 500 # Filas que se muestran de una carpeta antes de "Mostrar N más"
+ICON_MAP = {
+    ".py": "🐍", ".pyw": "🐍", ".js": "📜", ".json": "📋",
+    ".html": "🌐", ".css": "🎨", ".md": "📝", ".txt": "📄",
+    ".cpp": "⚙️", ".c": "⚙️", ".java": "☕", ".php": "🐘",
+    ".git": "🛑"
+}
+
 # =========================================================================
 #  1. MODELO DE DATOS 2.0
 # =========================================================================
-class EmojiFileSystemModel(QFileSystemModel):
-    def __init__(self):
-        super().__init__()
-        self.icon_map = {
-            ".py": "🐍", ".pyw": "🐍", ".js": "📜", ".json": "📋",
-            ".html": "🌐", ".css": "🎨", ".md": "📝", ".txt": "📄",
-            ".cpp": "⚙️", ".c": "⚙️", ".java": "☕", ".php": "🐘",
-            ".git": "🛑"
-        }
+# Un nodo por entrada mostrada, con su texto ya formado: pintar una fila es
+# devolver un atributo. Las carpetas se leen en un hilo al desplegarlas (ya
+# sin lo que ignoran las reglas del proyecto) y sólo se crean nodos para las
+# primeras TREE_CHUNK entradas; el resto espera tras una fila "Mostrar N más".
+
+class TreeNode:
+    __slots__ = ('name', 'is_dir', 'parent', 'row', 'label', 'kind', 'children', 'entries', 'dirs', 'limit', 'loading')
+    ENTRY, MORE, LOADING = 0, 1, 2
+
+    def __init__(self, name, is_dir, parent, kind=ENTRY):
+        self.name, self.is_dir, self.parent, self.kind = name, is_dir, parent, kind
+        self.row = 0
+        self.children = None # None: carpeta aún sin leer
+        self.entries = None # Todos los nombres de la carpeta, ordenados (ver list_directory)
+        self.dirs = 0 # Los primeros `dirs` nombres son carpetas
+        self.limit = TREE_CHUNK
+        self.loading = False
+        if kind != TreeNode.ENTRY: self.label = ""
+        elif is_dir: self.label = f"📂 {name}"
+        else: self.label = f"{ICON_MAP.get(os.path.splitext(name)[1].lower(), '📄')} {name}"
+
+    def rel(self):
+        parts, node = [], self
+        while node.parent is not None: parts.append(node.name); node = node.parent
+        return '/'.join(reversed(parts))
+
+    def shown(self):
+        """Número de entradas con nodo (sin contar la fila especial del final)"""
+        if not self.children: return 0
+        return len(self.children) - (self.children[-1].kind != TreeNode.ENTRY)
+
+
+def sorted_names(names):
+    names.sort() # Primero tal cual: empates sin mayúsculas siempre en el mismo orden
+    names.sort(key=str.lower)
+    return names
+
+
+def list_directory(root, rel, matcher):
+    """(nombres, cuántos son carpetas) de una carpeta del proyecto, sin los
+    ignorados: primero las carpetas y luego los archivos, por nombre"""
+    path = os.path.join(root, *rel.split('/')) if rel else root
+    files, dirs = [], []
+    with os.scandir(path) as it:
+        for e in it:
+            try: (dirs if e.is_dir() else files).append(e.name)
+            except OSError: pass
+    ignored = ignored_names(matcher.chain_for(rel), rel, files, dirs)
+    if ignored:
+        files = [n for n in files if n not in ignored]
+        dirs = [n for n in dirs if n not in ignored]
+    return sorted_names(dirs) + sorted_names(files), len(dirs)
+
+
+class DirectoryLister(QThread):
+    """Lee carpetas en segundo plano, en el orden en que se piden"""
+    listed = Signal(int, str, object) # generación, carpeta relativa, (nombres, carpetas) o None si no se pudo leer
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._cond = threading.Condition()
+        self._jobs = deque()
+        self._running = True
+
+    def request(self, generation, root, rel, matcher):
+        with self._cond:
+            self._jobs.append((generation, root, rel, matcher))
+            self._cond.notify()
+        if not self.isRunning(): self.start()
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+        self.wait()
+
+    def run(self):
+        while True:
+            with self._cond:
+                while self._running and not self._jobs: self._cond.wait()
+                if not self._running: break
+                generation, root, rel, matcher = self._jobs.popleft()
+            try: entries = list_directory(root, rel, matcher)
+            except OSError: entries = None
+            except Exception as e: print(f"⚠️ Error leyendo {rel or root}: {e}"); entries = None
+            self.listed.emit(generation, rel, entries)
+
+
+class ProjectTreeModel(QAbstractItemModel):
+    """Árbol del proyecto. Se reutiliza al cambiar de proyecto (set_root).
+
+    Pide al vigilante del disco (set_watcher) sólo las carpetas ya leídas y,
+    cuando una cambia, la vuelve a leer y aplica la diferencia fila a fila."""
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.root_path = ""
+        self.root = TreeNode("", True, None)
+        self.generation = 0
+        self.matcher = None
+        self.nodes = {} # carpeta relativa -> nodo leído (para los avisos del disco)
+        self.lister = DirectoryLister(self)
+        self.lister.listed.connect(self.on_listed)
+        self.watcher = None # FileWatcher del editor
+
+    def set_root(self, path):
+        self.beginResetModel()
+        self.generation += 1 # Lo que aún llegue del proyecto anterior se descarta
+        for rel in self.nodes: self.unwatch(rel)
+        self.nodes = {}
+        self.root_path = os.path.abspath(path)
+        self.root = TreeNode("", True, None)
+        self.matcher = IgnoreMatcher(self.root_path)
+        self.endResetModel()
+        self.request(self.root)
+
+    def shutdown(self):
+        self.lister.stop()
+
+    # --- Lectura de carpetas ---
+    def request(self, node):
+        node.loading = True
+        self.lister.request(self.generation, self.root_path, node.rel(), self.matcher)
+
+    def on_listed(self, generation, rel, entries):
+        if generation != self.generation: return
+        node = self.root if not rel else self.nodes.get(rel)
+        if node is None: return # Se borró o se plegó su padre mientras tanto
+        node.loading = False
+        if entries is None: entries = ([], 0)
+        if node.children is None or (node.children and node.children[0].kind == TreeNode.LOADING):
+            self.fill(node, entries)
+        else: self.merge(node, entries)
+
+    def fill(self, node, entries):
+        """Primera lectura: cambia el "Cargando..." por la primera tanda"""
+        parent = self.index_of(node)
+        if node.children:
+            self.beginRemoveRows(parent, 0, len(node.children) - 1)
+            node.children = []
+            self.endRemoveRows()
+        else: node.children = []
+        node.entries, node.dirs = entries
+        rel = node.rel()
+        self.nodes[rel] = node
+        if self.watcher is not None: self.watcher.watch(self.abs_path(rel))
+        self.show_more(node)
+
+    def show_more(self, node):
+        """Añade la siguiente tanda de entradas y pone al día la fila "Mostrar N más" """
+        shown = node.shown()
+        target = min(len(node.entries), max(node.limit, shown))
+        self.set_more_row(node, 0)
+        if target > shown:
+            self.beginInsertRows(self.index_of(node), shown, target - 1)
+            for i in range(shown, target): self.add_child(node, i, i)
+            self.endInsertRows()
+        self.set_more_row(node, len(node.entries) - node.shown())
+
+    def add_child(self, node, row, i):
+        child = TreeNode(node.entries[i], i < node.dirs, node)
+        node.children.insert(row, child)
+        for i in range(row, len(node.children)): node.children[i].row = i
+
+    def set_more_row(self, node, hidden):
+        """Pone, actualiza o quita la fila especial del final"""
+        children = node.children
+        last = children[-1] if children else None
+        if last is not None and last.kind == TreeNode.MORE:
+            if hidden:
+                last.label = f"⋯ Mostrar {min(hidden, TREE_CHUNK)} más (quedan {hidden})"
+                idx = self.createIndex(last.row, 0, last); self.dataChanged.emit(idx, idx)
+                return
+            self.beginRemoveRows(self.index_of(node), last.row, last.row)
+            children.pop()
+            self.endRemoveRows()
+        if hidden:
+            more = TreeNode("", False, node, TreeNode.MORE)
+            more.label = f"⋯ Mostrar {min(hidden, TREE_CHUNK)} más (quedan {hidden})"
+            self.beginInsertRows(self.index_of(node), len(children), len(children))
+            more.row = len(children); children.append(more)
+            self.endInsertRows()
+
+    def load_more(self, index):
+        """Si `index` es una fila "Mostrar N más", enseña la siguiente tanda"""
+        node = index.internalPointer() if index.isValid() else None
+        if node is None or node.kind != TreeNode.MORE: return False
+        parent = node.parent
+        parent.limit = parent.shown() + TREE_CHUNK
+        self.show_more(parent)
+        return True
+
+    def merge(self, node, entries):
+        """Relectura tras un cambio en disco: quita e inserta sólo las filas que
+        cambiaron (las ya mostradas siguen siendo el principio de `entries`)"""
+        parent = self.index_of(node)
+        names, dirs = entries
+        kinds = dict.fromkeys(names, False)
+        kinds.update(dict.fromkeys(names[:dirs], True))
+        fully_shown = node.shown() == len(node.entries)
+        for child in reversed(node.children[:node.shown()]):
+            if kinds.get(child.name) != child.is_dir:
+                self.beginRemoveRows(parent, child.row, child.row)
+                del node.children[child.row]
+                for i in range(child.row, len(node.children)): node.children[i].row = i
+                self.forget(child)
+                self.endRemoveRows()
+        node.entries, node.dirs = entries
+        i = 0
+        for name in names:
+            shown = node.shown()
+            if i < shown and node.children[i].name == name: i += 1; continue
+            if i >= shown and not (fully_shown and shown < node.limit): break
+            self.beginInsertRows(parent, i, i)
+            self.add_child(node, i, i)
+            self.endInsertRows()
+            i += 1
+        self.set_more_row(node, len(names) - node.shown())
+
+    def forget(self, node):
+        """Deja de vigilar una carpeta que desaparece del árbol (y sus hijas)"""
+        if not node.is_dir or node.children is None: return
+        rel = node.rel()
+        for key in [k for k in self.nodes if k == rel or k.startswith(rel + '/')]:
+            self.unwatch(key)
+            del self.nodes[key]
+
+    def set_watcher(self, watcher):
+        self.watcher = watcher
+        watcher.changed.connect(self.on_disk_changes)
+        for rel in self.nodes: watcher.watch(self.abs_path(rel))
+
+    def abs_path(self, rel):
+        return os.path.join(self.root_path, *rel.split('/')) if rel else self.root_path
+
+    def unwatch(self, rel):
+        if self.watcher is not None: self.watcher.unwatch(self.abs_path(rel))
+
+    def on_disk_changes(self, changes):
+        """Vuelve a leer las carpetas del árbol cuyo listado cambió"""
+        if any(os.path.basename(p) in IGNORE_FILES for p in changes.paths()):
+            self.matcher.forget() # Otras reglas: puede cambiar cualquier carpeta leída
+            nodes = list(self.nodes.values())
+        else:
+            nodes = []
+            for path in changes.dirs:
+                rel = os.path.relpath(path, self.root_path).replace(os.sep, '/')
+                node = self.root if rel == '.' else self.nodes.get(rel)
+                if node is not None: nodes.append(node)
+        for node in nodes: self.request(node) # Aunque ya se esté leyendo: esa lectura puede ser de antes del cambio
+
+    def optimistic(self, removed=(), added=()):
+        """Enseña ya lo que dejará en disco una operación que aún corre en el
+        hilo; la relectura de después corrige lo que al final no pasó"""
+        if self.matcher is None: return # Sin proyecto
+        changes = {} # carpeta relativa -> (nombres que se van, [(nombre, es carpeta)] que llegan)
+        for path in removed:
+            rel = self.rel_dir(path)
+            if rel is not None: changes.setdefault(rel, (set(), []))[0].add(os.path.basename(path))
+        for path, is_dir in added:
+            rel = self.rel_dir(path)
+            if rel is not None and not self.matcher.ignored(path, is_dir):
+                changes.setdefault(rel, (set(), []))[1].append((os.path.basename(path), is_dir))
+        for rel, (gone, new) in changes.items():
+            node = self.root if not rel else self.nodes.get(rel)
+            if node is None or node.entries is None: continue # Carpeta sin leer: ya se verá al abrirla
+            names, dirs = node.entries, node.dirs
+            dir_names = [n for n in names[:dirs] if n not in gone]
+            file_names = [n for n in names[dirs:] if n not in gone]
+            for name, is_dir in new:
+                if name not in gone and name in names: continue
+                (dir_names if is_dir else file_names).append(name)
+            self.merge(node, (sorted_names(dir_names) + sorted_names(file_names), len(dir_names)))
+
+    def rel_dir(self, path):
+        """Carpeta relativa ('' la raíz) que contiene `path`, o None si queda fuera del proyecto"""
+        rel = os.path.relpath(os.path.dirname(os.path.abspath(path)), self.root_path)
+        if rel == os.pardir or rel.startswith(os.pardir + os.sep): return None
+        return '' if rel == '.' else rel.replace(os.sep, '/')
+
+    # --- Interfaz de QAbstractItemModel ---
+    def index_of(self, node):
+        return QModelIndex() if node.parent is None else self.createIndex(node.row, 0, node)
+
+    def node(self, index):
+        return index.internalPointer() if index.isValid() else self.root
+
+    def index(self, row, column, parent=QModelIndex()):
+        children = self.node(parent).children
+        if column != 0 or not children or not 0 <= row < len(children): return QModelIndex()
+        return self.createIndex(row, 0, children[row])
+
+    def parent(self, index):
+        if not index.isValid(): return QModelIndex()
+        return self.index_of(index.internalPointer().parent)
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.column() > 0: return 0
+        children = self.node(parent).children
+        return len(children) if children else 0
+
+    def columnCount(self, parent=QModelIndex()):
+        return 1
+
+    def hasChildren(self, parent=QModelIndex()):
+        node = self.node(parent)
+        return node.is_dir and (node.children is None or bool(node.children))
+
+    def canFetchMore(self, parent):
+        node = self.node(parent)
+        return node.is_dir and node.children is None and not node.loading
+
+    def fetchMore(self, parent):
+        node = self.node(parent)
+        if not self.canFetchMore(parent): return
+        loading = TreeNode("", False, node, TreeNode.LOADING)
+        loading.label = "⏳ Cargando..."
+        self.beginInsertRows(parent, 0, 0)
+        node.children = [loading]
+        self.endInsertRows()
+        self.nodes[node.rel()] = node
+        self.request(node)
 
     def data(self, index, role=Qt.DisplayRole):
-        if role == Qt.DecorationRole: return None 
-        if role == Qt.DisplayRole:
-            original = super().data(index, role)
-            info = self.fileInfo(index)
-            if info.isDir(): return f"📂 {original}"
-            icon = self.icon_map.get(f".{info.suffix().lower()}", "📄")
-            return f"{icon} {original}"
-        return super().data(index, role)
+        if not index.isValid(): return None
+        node = index.internalPointer()
+        if role == Qt.DisplayRole: return node.label
+        if role == Qt.FontRole and node.kind != TreeNode.ENTRY:
+            font = QFont(); font.setItalic(True); return font
+        if role == Qt.ToolTipRole and node.kind == TreeNode.ENTRY: return self.filePath(index)
+        return None
+
+    def flags(self, index):
+        if not index.isValid(): return Qt.ItemIsDropEnabled # Soltar en el hueco: a la raíz
+        node = index.internalPointer()
+        if node.kind == TreeNode.LOADING: return Qt.ItemIsEnabled
+        if node.kind == TreeNode.MORE: return Qt.ItemIsEnabled | Qt.ItemIsSelectable
+        flags = Qt.ItemIsEnabled | Qt.ItemIsSelectable | Qt.ItemIsDragEnabled
+        return flags | Qt.ItemIsDropEnabled if node.is_dir else flags
+
+    # --- Arrastrar y soltar (el trabajo lo hace FileSidebar.dropEvent) ---
+    def mimeTypes(self):
+        return ['text/uri-list']
+
+    def mimeData(self, indexes):
+        data = QMimeData()
+        data.setUrls([QUrl.fromLocalFile(p) for p in dict.fromkeys(map(self.filePath, indexes)) if p])
+        return data
+
+    def supportedDragActions(self):
+        return Qt.CopyAction | Qt.MoveAction
+
+    def supportedDropActions(self):
+        return Qt.CopyAction | Qt.MoveAction
+
+    # --- Lo que usaba QFileSystemModel ---
+    def filePath(self, index):
+        node = index.internalPointer() if index.isValid() else None
+        if node is None or node.kind != TreeNode.ENTRY: return ""
+        return os.path.join(self.root_path, *node.rel().split('/'))
+
+    def rootPath(self):
+        return self.root_path
 
 # =========================================================================
 #  2. ÁRBOL DE ARCHIVOS
 # =========================================================================
 class FileSidebar(QTreeView):
+    paths_changed = Signal(list) # Rutas creadas, renombradas (la vieja y la nueva) o borradas
+    paths_moved = Signal(list) # [(ruta vieja, ruta nueva)] de lo movido o renombrado
+
     def __init__(self, parent=None):
         super().__init__(parent)
         self.setContextMenuPolicy(Qt.CustomContextMenu)
@@ -42,7 +401,15 @@ class FileSidebar(QTreeView):
         self.setDragEnabled(True)
         self.setAcceptDrops(True)
         self.setDropIndicatorShown(True)
+        self.setDefaultDropAction(Qt.MoveAction) # Con Ctrl, copia
+        self.setSelectionMode(QAbstractItemView.ExtendedSelection)
         self.setEditTriggers(QTreeView.NoEditTriggers)
+        self.setUniformRowHeights(True) # Sin medir cada fila
+        self.clicked.connect(lambda index: self.model().load_more(index))
+        self.activated.connect(lambda index: self.model().load_more(index))
+        # Copiar, mover, borrar y renombrar van a un hilo; el árbol se adelanta
+        self.operations = FileOperationQueue(self)
+        self.operations.finished_op.connect(self.on_operation_finished)
 
     def update_theme(self, c):
         self.setStyleSheet(f"""
@@ -52,24 +419,36 @@ class FileSidebar(QTreeView):
             QTreeView::item:selected {{ background-color: {c['select_bg']}; color: white; }}
         """)
 
+    def selected_paths(self):
+        model = self.model()
+        return [p for p in dict.fromkeys(map(model.filePath, self.selectionModel().selectedIndexes())) if p]
+
     def show_context_menu(self, pos):
         index = self.indexAt(pos)
         model = self.model()
         if not model: return
         
-        path = model.filePath(index) if index.isValid() else model.rootPath()
+        path = model.filePath(index) or model.rootPath() # Las filas especiales no tienen ruta
         if os.path.isfile(path): path = os.path.dirname(path)
+        # Sobre una fila seleccionada se actúa sobre toda la selección
+        selected = self.selected_paths()
+        targets = selected if model.filePath(index) in selected else [model.filePath(index)]
 
         menu = QMenu()
         menu.setStyleSheet("QMenu { background-color: #2d2d2d; color: white; border: 1px solid #454545; }")
         menu.addAction("📄 Nuevo Archivo", lambda: self.new_item(path, False))
         menu.addAction("📁 Nueva Carpeta", lambda: self.new_item(path, True))
         menu.addSeparator()
-        if index.isValid():
-            menu.addAction("✏️ Renombrar", lambda: self.rename_item(model.filePath(index)))
-            menu.addAction("🗑️ Eliminar", lambda: self.delete_item(model.filePath(index)))
+        if model.filePath(index):
+            if len(targets) == 1: menu.addAction("✏️ Renombrar", lambda: self.rename_item(targets[0]))
+            menu.addAction("🗑️ Eliminar" if len(targets) == 1 else f"🗑️ Eliminar {len(targets)} elementos",
+                           lambda: self.delete_items(targets))
         menu.exec(self.viewport().mapToGlobal(pos))
 
+    def keyPressEvent(self, e):
+        if e.key() == Qt.Key_Delete and self.selected_paths(): self.delete_items(self.selected_paths())
+        else: super().keyPressEvent(e)
+
     def new_item(self, path, is_folder):
         t = "Carpeta" if is_folder else "Archivo"
         name, ok = QInputDialog.getText(self, f"Nueva {t}", f"Nombre:")
@@ -78,18 +457,65 @@ class FileSidebar(QTreeView):
                 p = os.path.join(path, name)
                 if is_folder: os.makedirs(p, exist_ok=True)
                 else: open(p, 'a').close()
+                self.model().optimistic(added=[(p, is_folder)])
+                self.paths_changed.emit([p])
             except Exception as e: QMessageBox.critical(self, "Error", str(e))
     def rename_item(self, path):
         old = os.path.basename(path); new, ok = QInputDialog.getText(self, "Renombrar", "Nuevo nombre:", text=old)
-        if ok and new:
-            try: os.rename(path, os.path.join(os.path.dirname(path), new))
-            except Exception as e: QMessageBox.critical(self, "Error", str(e))
-    def delete_item(self, path):
-        if QMessageBox.question(self, "Eliminar", f"¿Borrar {os.path.basename(path)}?", QMessageBox.Yes|QMessageBox.No) == QMessageBox.Yes:
-            try: 
-                if os.path.isdir(path): shutil.rmtree(path)
-                else: os.remove(path)
-            except Exception as e: QMessageBox.critical(self, "Error", str(e))
+        if ok and new and new != old:
+            self.run_operation(FileOperation.RENAME, [path], os.path.join(os.path.dirname(path), new))
+    def delete_items(self, paths):
+        what = os.path.basename(paths[0]) if len(paths) == 1 else f"{len(paths)} elementos"
+        if QMessageBox.question(self, "Eliminar", f"¿Borrar {what}?", QMessageBox.Yes|QMessageBox.No) == QMessageBox.Yes:
+            self.run_operation(FileOperation.DELETE, paths)
+
+    # --- Operaciones en segundo plano ---
+    def run_operation(self, kind, sources, target=None):
+        pairs, errors = plan(kind, sources, target)
+        if errors: self.show_errors(errors, len(errors))
+        if not pairs: return
+        op = FileOperation(kind, pairs)
+        model = self.model()
+        removed = [src for src, _ in pairs] if kind != FileOperation.COPY else []
+        added = [(dst, os.path.isdir(src)) for src, dst in pairs if dst]
+        model.optimistic(removed, added)
+        self.operations.submit(op)
+
+    def on_operation_finished(self, op):
+        # Tanto si salió bien como si no, la relectura deja el árbol como el disco
+        self.paths_changed.emit([p for pair in op.pairs for p in pair if p])
+        moved = [pair for pair in op.finished if op.kind in (FileOperation.MOVE, FileOperation.RENAME)]
+        if moved: self.paths_moved.emit(moved)
+        if op.errors: self.show_errors(op.errors, op.failed)
+        elif op.cancelled and op.kind == FileOperation.MOVE:
+            QMessageBox.information(self, "Operación con archivos", "Movimiento cancelado: lo que faltaba por mover sigue en su sitio.")
+
+    def show_errors(self, errors, failed):
+        lines = [f"{os.path.basename(p) or p}: {msg}" for p, msg in errors]
+        if failed > len(errors): lines.append(f"... y {failed - len(errors)} errores más")
+        QMessageBox.warning(self, "Operación con archivos", "\n".join(lines))
+
+    # --- Arrastrar y soltar ---
+    def dragEnterEvent(self, e):
+        if e.mimeData().hasUrls(): super().dragEnterEvent(e); e.acceptProposedAction()
+        else: e.ignore()
+
+    def dragMoveEvent(self, e):
+        super().dragMoveEvent(e) # Indicador y desplazamiento automático
+        if e.mimeData().hasUrls(): e.acceptProposedAction() # Sobre un archivo se suelta en su carpeta
+
+    def dropEvent(self, e):
+        sources = [u.toLocalFile() for u in e.mimeData().urls() if u.isLocalFile()]
+        model = self.model()
+        if not sources or not model: e.ignore(); return
+        index = self.indexAt(e.position().toPoint())
+        target = model.filePath(index) or model.rootPath()
+        if not os.path.isdir(target): target = os.path.dirname(target)
+        # Dentro del árbol se mueve (Ctrl copia); lo que llega de fuera se copia
+        move = e.source() is self and e.dropAction() == Qt.MoveAction
+        self.run_operation(FileOperation.MOVE if move else FileOperation.COPY, sources, target)
+        e.setDropAction(Qt.CopyAction) # Que la vista no intente quitar filas: ya lo hace el modelo
+        e.accept()
 
 # =========================================================================
 #  3. WRAPPER (CORREGIDO: TEXTO CENTRADO EN EL BOTÓN)
@@ -139,12 +565,46 @@ class ProjectSidebarWrapper(QWidget):
         self.spacer.setSizePolicy(QSizePolicy.Minimum, QSizePolicy.Expanding)
         self.spacer.hide()
         
+        # Barra de la operación en curso (borrar, copiar, mover...)
+        self.op_bar = QWidget()
+        op_layout = QHBoxLayout(self.op_bar)
+        op_layout.setContentsMargins(6, 2, 2, 2)
+        self.op_label = QLabel()
+        self.op_progress = QProgressBar()
+        self.op_progress.setMaximumHeight(12); self.op_progress.setTextVisible(False)
+        self.op_cancel = QToolButton(); self.op_cancel.setText("✖"); self.op_cancel.setAutoRaise(True)
+        self.op_cancel.setToolTip("Cancelar")
+        self.op_cancel.clicked.connect(self.tree_view.operations.cancel)
+        op_layout.addWidget(self.op_label); op_layout.addWidget(self.op_progress, 1); op_layout.addWidget(self.op_cancel)
+        self.op_bar.hide()
+        operations = self.tree_view.operations
+        operations.started_op.connect(self.on_operation_started)
+        operations.progress.connect(self.on_operation_progress)
+        operations.finished_op.connect(self.on_operation_finished)
+
         self.layout.addWidget(self.toggle_btn)
         self.layout.addWidget(self.tree_view)
+        self.layout.addWidget(self.op_bar)
         self.layout.addWidget(self.spacer)
         
         self.root_path = ""
-        self.f_model = None
+        self.f_model = ProjectTreeModel(self) # Uno para siempre: cambiar de proyecto sólo lo vacía
+        self.tree_view.setModel(self.f_model)
+
+    def set_watcher(self, watcher):
+        self.f_model.set_watcher(watcher)
+
+    def on_operation_started(self, op):
+        self.op_label.setText(op.describe())
+        self.op_progress.setRange(0, 0) # Sin total todavía: barra en movimiento
+        self.op_bar.show()
+
+    def on_operation_progress(self, op_id, done, total, path):
+        if total: self.op_progress.setRange(0, total); self.op_progress.setValue(min(done, total))
+        if path: self.op_bar.setToolTip(path)
+
+    def on_operation_finished(self, op):
+        if not self.tree_view.operations.pending(): self.op_bar.hide()
 
     def toggle_view(self):
         if self.tree_view.isVisible():
@@ -158,26 +618,12 @@ class ProjectSidebarWrapper(QWidget):
 
     def set_project_path(self, path):
         self.root_path = os.path.abspath(path)
-        
-        self.f_model = EmojiFileSystemModel()
-        self.f_model.setRootPath(self.root_path)
-        self.f_model.setFilter(QDir.NoDotAndDotDot | QDir.AllDirs | QDir.Files)
-        self.f_model.setNameFilters(["!__pycache__", "!*.pyc", ".*"])
-        
-        self.tree_view.setModel(self.f_model)
-        for i in range(1, 4): self.tree_view.hideColumn(i)
-        
-        self.f_model.directoryLoaded.connect(lambda p: self.on_directory_loaded(p))
+        self.f_model.set_root(self.root_path)
         
         self.spacer.hide()
         self.tree_view.show()
         self.toggle_btn.setText(f"▼ {os.path.basename(self.root_path)}")
 
-    def on_directory_loaded(self, loaded_path):
-        if os.path.abspath(loaded_path) == self.root_path:
-            idx = self.f_model.index(self.root_path)
-            if idx.isValid(): self.tree_view.setRootIndex(idx)
-
     # [CORREGIDO] update_theme ahora también actualiza el botón
     def update_theme(self, c):
         self.tree_view.update_theme(c)
@@ -2,6 +2,7 @@ import sys, os, platform
 from PySide6.QtCore import Qt, QProcess, QTimer
 from PySide6.QtGui import QFont, QTextCursor
 from PySide6.QtWidgets import QPlainTextEdit
+from document_access import ends_with_newline
 
 class EditorTerminal(QPlainTextEdit):
     def __init__(self, parent=None):
@@ -103,10 +104,8 @@ class EditorTerminal(QPlainTextEdit):
         
         cursor = self.textCursor()
         cursor.movePosition(QTextCursor.End)
-        txt = self.document().toPlainText()
-        
-        # Asegurar que el prompt empiece en línea nueva
-        if len(txt) > 0 and not txt.endswith('\n'):
+        # Asegurar que el prompt empiece en línea nueva (sin copiar todo el historial)
+        if self.document().characterCount() > 1 and not ends_with_newline(self.document()):
             cursor.insertText("\n")
         
         cursor.insertHtml(self.get_prompt_html())
@@ -0,0 +1,350 @@
+import os
+import time
+import pickle
+import threading
+from array import array
+from bisect import bisect_left
+from PySide6.QtCore import QThread, Signal
+
+try: import re._parser as sre_parse # Python 3.11+
+except ImportError: import sre_parse
+
+from utils import get_cache_dir
+from search_engine import SEARCH_POOL, MAX_FILE_SIZE, text_trigrams, index_files
+from project_walker import walk_project, IgnoreMatcher, IGNORE_FILES
+
+# ==============================================================================
+#  ÍNDICE DE TRIGRAMAS DEL PROYECTO
+# ==============================================================================
+# Cada archivo del proyecto se reduce a los trigramas de sus palabras. Una
+# búsqueda saca de la consulta los textos que toda coincidencia contiene, cruza
+# las listas de archivos de sus trigramas y sólo revisa esos candidatos. El
+# índice se guarda en la carpeta de caché del proyecto; al reabrirlo sólo se
+# vuelven a leer los archivos que cambiaron.
+
+INDEX_FILE = "trigrams.idx"
+INDEX_VERSION = 1
+COMPACT_MIN_DEAD = 1000 # Archivos muertos a partir de los que se compacta...
+COMPACT_RATIO = 0.25 # ... si además son esta fracción del índice
+DENSE_RATIO = 32 # Trigramas en más de 1/32 de los archivos se guardan como mapa de bits
+FREEZE_EVERY = 10000 # Archivos leídos entre conversiones a mapa de bits al construir
+
+
+class TrigramIndex:
+    """Trigramas de los archivos de un proyecto.
+
+    Cada archivo tiene un número y `postings` guarda, por trigrama, los números
+    de los archivos que lo contienen (array ordenado: sólo se añade al final).
+    Los trigramas comunes ocupan menos como mapa de bits (un int, bit n =
+    archivo n): freeze() pasa a `bitmaps` las listas largas y las altas nuevas
+    se siguen añadiendo a su array. Un archivo que cambia queda muerto con su
+    número viejo y entra con uno nuevo; cuando los muertos pesan demasiado se
+    renumera todo. Escribe un solo hilo (ProjectIndexer) y consulta el de la
+    búsqueda: `lock` separa cada cambio de cada consulta."""
+    def __init__(self, root):
+        self.root = root
+        self.paths = [] # Número -> ruta relativa (None = muerto)
+        self.mtimes = array('q')
+        self.sizes = array('q')
+        self.ids = {} # Ruta relativa -> número vigente
+        self.postings = {} # Trigrama (bytes) -> array('I') de números
+        self.bitmaps = {} # Trigrama -> int con un bit por archivo
+        self.dead = 0
+        self.dirty = False # Cambios sin guardar
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.ids)
+
+    def add(self, path, mtime, size, grams):
+        rel = os.path.relpath(path, self.root)
+        with self.lock:
+            self._remove(rel)
+            n = len(self.paths)
+            self.paths.append(rel); self.mtimes.append(mtime); self.sizes.append(size)
+            self.ids[rel] = n
+            postings = self.postings
+            for g in grams:
+                p = postings.get(g)
+                if p is None: postings[g] = array('I', (n,))
+                else: p.append(n)
+            self.dirty = True
+
+    def remove(self, path):
+        with self.lock: self._remove(os.path.relpath(path, self.root))
+
+    def remove_paths(self, paths):
+        """Quita archivos y, de las que no lo son, todo lo que había bajo esa carpeta"""
+        rels = [os.path.relpath(p, self.root) for p in paths]
+        with self.lock:
+            prefixes = tuple(rel + os.sep for rel in rels if rel not in self.ids)
+            for rel in rels: self._remove(rel)
+            if prefixes: # Una pasada para todas las carpetas del lote
+                for rel in [rel for rel in self.ids if rel.startswith(prefixes)]: self._remove(rel)
+
+    def _remove(self, rel):
+        n = self.ids.pop(rel, None)
+        if n is None: return
+        self.paths[n] = None
+        self.dead += 1
+        self.dirty = True
+
+    def is_current(self, rel, st):
+        n = self.ids.get(rel)
+        return n is not None and self.mtimes[n] == st.st_mtime_ns and self.sizes[n] == st.st_size
+
+    def changed_files(self, skip=()):
+        """Generador de las rutas indexadas cuyo archivo ya no coincide (fecha o
+        tamaño) o ya no existe. El vigilante no ve un archivo reescrito en su
+        sitio si no está abierto; la búsqueda los revisa con esto."""
+        with self.lock:
+            root = self.root
+            entries = [(rel, self.mtimes[n], self.sizes[n]) for rel, n in self.ids.items()]
+        for rel, mtime, size in entries:
+            path = os.path.join(root, rel)
+            if path in skip: continue
+            try: st = os.stat(path)
+            except OSError: yield path; continue
+            if st.st_mtime_ns != mtime or st.st_size != size: yield path
+
+    def candidates(self, literals):
+        """Rutas que contienen todos los trigramas de `literals` (todas si no aportan ninguno)"""
+        grams = set()
+        for text in literals: grams.update(text_trigrams(text))
+        empty = array('I')
+        with self.lock:
+            root, paths = self.root, self.paths
+            if not grams: return [os.path.join(root, rel) for rel in paths if rel is not None]
+            sparse, dense = [], []
+            for g in grams:
+                p, bits = self.postings.get(g, empty), self.bitmaps.get(g)
+                if bits is None:
+                    if not p: return []
+                    sparse.append(p)
+                else: dense.append((bits, p))
+            if sparse:
+                # Se parte de la lista más corta y se comprueba cada número en las demás
+                sparse.sort(key=len)
+                found = sparse[0]
+                for p in sparse[1:]:
+                    found = [n for n in found if contains(p, n)]
+                for bits, p in dense:
+                    found = [n for n in found if bits >> n & 1 or contains(p, n)]
+            else:
+                # Todos comunes: AND de mapas de bits
+                acc = -1
+                for bits, p in dense: acc &= bits | ids_to_bits(p)
+                found = bits_to_ids(acc)
+            return [os.path.join(root, paths[n]) for n in found if paths[n] is not None]
+
+    def freeze(self):
+        """Pasa a mapa de bits las listas que ya ocupan más como array"""
+        limit = len(self.paths) // DENSE_RATIO
+        dense = [g for g, p in self.postings.items() if len(p) > limit]
+        for g in dense:
+            bits = ids_to_bits(self.postings[g]) | self.bitmaps.get(g, 0)
+            with self.lock:
+                self.bitmaps[g] = bits
+                del self.postings[g]
+
+    def needs_compact(self):
+        return self.dead >= COMPACT_MIN_DEAD and self.dead >= COMPACT_RATIO * len(self.paths)
+
+    def compact(self):
+        """Renumera sin los archivos muertos. Se calcula fuera del candado (el
+        único que escribe es quien llama) y se cambia de golpe."""
+        remap = array('i', [-1]) * len(self.paths)
+        live = [n for n, rel in enumerate(self.paths) if rel is not None]
+        for new, old in enumerate(live): remap[old] = new
+        postings = {}
+        for g in self.postings.keys() | self.bitmaps.keys():
+            ids = self.postings.get(g, [])
+            if g in self.bitmaps: ids = sorted(bits_to_ids(self.bitmaps[g]) + list(ids))
+            q = array('I', [remap[n] for n in ids if remap[n] >= 0])
+            if q: postings[g] = q
+        paths = [self.paths[n] for n in live]
+        mtimes = array('q', [self.mtimes[n] for n in live])
+        sizes = array('q', [self.sizes[n] for n in live])
+        with self.lock:
+            self.paths, self.mtimes, self.sizes, self.postings, self.bitmaps = paths, mtimes, sizes, postings, {}
+            self.ids = {rel: n for n, rel in enumerate(paths)}
+            self.dead = 0
+            self.dirty = True
+
+    # --- DISCO ---
+    def save(self):
+        if self.needs_compact(): self.compact()
+        self.freeze()
+        try:
+            path = os.path.join(get_cache_dir(self.root), INDEX_FILE)
+            state = {'version': INDEX_VERSION, 'root': self.root, 'paths': self.paths, 'mtimes': self.mtimes,
+                     'sizes': self.sizes, 'postings': self.postings, 'bitmaps': self.bitmaps, 'dead': self.dead}
+            with open(path + ".tmp", 'wb') as f: pickle.dump(state, f, pickle.HIGHEST_PROTOCOL)
+            os.replace(path + ".tmp", path)
+            self.dirty = False
+        except Exception as e: print(f"⚠️ No se pudo guardar el índice de búsqueda: {e}")
+
+    @classmethod
+    def load(cls, root):
+        """Índice guardado de `root`, o uno vacío si no hay (o es de otra versión)"""
+        index = cls(root)
+        try:
+            with open(os.path.join(get_cache_dir(root), INDEX_FILE), 'rb') as f: state = pickle.load(f)
+            if state.get('version') != INDEX_VERSION or state.get('root') != root: return index
+            index.paths, index.mtimes, index.sizes = state['paths'], state['mtimes'], state['sizes']
+            index.postings, index.bitmaps, index.dead = state['postings'], state['bitmaps'], state['dead']
+            index.ids = {rel: n for n, rel in enumerate(index.paths) if rel is not None}
+        except FileNotFoundError: pass
+        except Exception as e: print(f"⚠️ Índice de búsqueda dañado, se rehace: {e}")
+        return index
+
+
+def contains(ids, n):
+    i = bisect_left(ids, n)
+    return i < len(ids) and ids[i] == n
+
+
+def ids_to_bits(ids):
+    if not ids: return 0
+    bits = bytearray(ids[-1] // 8 + 1)
+    for n in ids: bits[n >> 3] |= 1 << (n & 7)
+    return int.from_bytes(bits, 'little')
+
+
+def bits_to_ids(bits):
+    if bits <= 0: return []
+    digits = bin(bits)[:1:-1] # Del bit 0 hacia arriba
+    return [n for n, d in enumerate(digits) if d == '1']
+
+
+def required_literals(query):
+    """Textos (bytes) que toda coincidencia de `query` contiene: secuencias de
+    literales de la regex fuera de alternativas y de repeticiones opcionales.
+    Con un patrón str (Unicode sin distinguir mayúsculas) no se filtra."""
+    pattern = query.pattern
+    if isinstance(pattern.pattern, str): return []
+    try: tree = sre_parse.parse(pattern.pattern, pattern.flags)
+    except Exception: return []
+    out = []
+    collect_literals(tree, out)
+    return out
+
+
+def collect_literals(items, out):
+    run = bytearray()
+    for op, av in items:
+        if op == sre_parse.LITERAL: run.append(av); continue
+        if len(run) >= 3: out.append(bytes(run))
+        run = bytearray()
+        if op == sre_parse.SUBPATTERN: collect_literals(av[-1], out)
+        elif op in (sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT) and av[0] >= 1: collect_literals(av[2], out)
+    if len(run) >= 3: out.append(bytes(run))
+
+
+class ProjectIndexer(QThread):
+    """Mantiene en segundo plano el índice del proyecto abierto.
+
+    Al abrir un proyecto carga el índice guardado, recorre el disco y sólo
+    lee los archivos nuevos o cambiados (en los procesos de SEARCH_POOL).
+    Después atiende los archivos que le avisan con file_changed() (el
+    vigilante y, con los que encuentra cambiados, la búsqueda). La búsqueda
+    global usa current(): mientras no está listo recorre el disco."""
+    index_ready = Signal(str, int, int, float) # raíz, archivos, leídos, segundos
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._cond = threading.Condition()
+        self._running = True
+        self._root = None # Proyecto pedido
+        self._reload = False
+        self._changed = set()
+        self.index = None
+        self.matcher = None # Reglas de ignorados para los avisos sueltos
+        self.ready = False
+
+    def open_project(self, root):
+        with self._cond:
+            self._root, self._reload = root, True
+            self._changed.clear()
+            self.ready = False
+            self._cond.notify()
+        if not self.isRunning(): self.start()
+
+    def file_changed(self, path):
+        """Vuelve a indexar (o quita) un archivo o carpeta que cambió en disco"""
+        with self._cond:
+            self._changed.add(os.path.abspath(path))
+            self._cond.notify()
+
+    def current(self, root):
+        """Índice listo de `root`, o None"""
+        index = self.index
+        return index if self.ready and index is not None and index.root == root else None
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+        self.wait()
+
+    def interrupted(self):
+        return not self._running or self._reload
+
+    def run(self):
+        while True:
+            with self._cond:
+                while self._running and not self._reload and not self._changed: self._cond.wait()
+                if not self._running: break
+                if self._reload: root, changed, self._reload = self._root, None, False
+                else: changed, self._changed = self._changed, set()
+            try:
+                if changed is None: self.build(root)
+                else: self.update(changed)
+            except Exception as e: print(f"⚠️ Error en el índice de búsqueda: {e}")
+        if self.index is not None and self.index.dirty: self.index.save() # Lo leído sirve para la próxima vez
+
+    def build(self, root):
+        started = time.perf_counter()
+        if self.index is not None and self.index.dirty: self.index.save()
+        index = self.index = TrigramIndex.load(root)
+        self.matcher = IgnoreMatcher(root)
+        # Qué cambió en disco desde la última vez
+        seen, stale = set(), []
+        walk = walk_project(root, text_only=True, max_size=MAX_FILE_SIZE, with_stat=True)
+        try:
+            for path, st in walk:
+                if self.interrupted(): return
+                rel = os.path.relpath(path, root)
+                seen.add(rel)
+                if not index.is_current(rel, st): stale.append(path)
+        finally: walk.close()
+        for rel in [rel for rel in index.ids if rel not in seen]: index.remove(os.path.join(root, rel))
+        pending = FREEZE_EVERY
+        for batch in SEARCH_POOL.imap(index_files, stale, None, self.interrupted):
+            for entry in batch: index.add(*entry)
+            pending -= len(batch)
+            if pending <= 0: index.freeze(); pending = FREEZE_EVERY # Sin esperar al final: las listas comunes ocupan mucho
+        if self.interrupted(): return
+        if index.dirty: index.save()
+        self.ready = True
+        self.index_ready.emit(root, len(index), len(stale), time.perf_counter() - started)
+
+    def update(self, paths):
+        index = self.index
+        if index is None: return
+        if any(os.path.basename(p) in IGNORE_FILES for p in paths):
+            self.build(index.root) # Cambiaron las reglas: el recorrido decide qué entra y qué sale
+            return
+        files, gone = [], []
+        for p in paths:
+            if os.path.isdir(p): # Carpeta nueva: entra lo que el recorrido dejaría entrar
+                if self.matcher.ignored(p, True): continue
+                walk = walk_project(p, text_only=True, max_size=MAX_FILE_SIZE)
+                try: files.extend(f for f in walk if not self.matcher.ignored(f))
+                finally: walk.close()
+            elif os.path.isfile(p):
+                if not self.matcher.ignored(p): files.append(p)
+            else: gone.append(p)
+        if gone: index.remove_paths(gone)
+        for batch in SEARCH_POOL.imap(index_files, files, None, self.interrupted):
+            for entry in batch: index.add(*entry)
@@ -1,4 +1,4 @@
-import sys, os
+import sys, os, hashlib
 
 def resource_path(relative_path):
     """Obtiene la ruta absoluta al recurso (útil para PyInstaller)"""
@@ -8,6 +8,20 @@ def resource_path(relative_path):
         base_path = os.path.abspath(".")
     return os.path.join(base_path, relative_path)
 
+def get_cache_dir(project_root=None):
+    """Carpeta de caché del editor (y subcarpeta por proyecto si se indica). Se crea si no existe"""
+    if sys.platform == "win32":
+        base = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~\\AppData\\Local")
+    else:
+        base = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+    path = os.path.join(base, "capi-editor")
+    if project_root:
+        root = os.path.abspath(project_root)
+        digest = hashlib.sha1(root.encode("utf-8")).hexdigest()[:12]
+        path = os.path.join(path, "projects", f"{os.path.basename(root) or 'raiz'}-{digest}")
+    os.makedirs(path, exist_ok=True)
+    return path
+
 # ==========================================
 # DEFINICIÓN DE TEMAS (EXPANDIDOS)
 # ==========================================
@@ -0,0 +1,140 @@
+import re
+from sys import intern
+from bisect import bisect_left, insort
+
+WORD_RE = re.compile(r'\b[a-zA-Z_]\w{2,}\b')
+BULK_MIN = 64 # A partir de tantas palabras nuevas de golpe se ordena una vez en vez de insertar una a una
+
+
+class WordBucket:
+    """Palabras de un lenguaje, compartidas por todas las pestañas que lo usan.
+
+    Cuenta cuántos documentos contienen cada palabra y mantiene la lista
+    ordenada (minúsculas, palabra) para buscar por prefijo con bisect."""
+    def __init__(self):
+        self.refs = {} # palabra -> documentos que la contienen
+        self.sorted = [] # (palabra.lower(), palabra) ordenado
+
+    def add_many(self, words):
+        """Un documento más contiene cada una de estas palabras"""
+        refs = self.refs
+        new = []
+        for w in words:
+            n = refs.get(w, 0)
+            if n == 0: new.append((w.lower(), w))
+            refs[w] = n + 1
+        if len(new) < BULK_MIN:
+            for pair in new: insort(self.sorted, pair)
+        else: # Dos tramos ordenados: sort() los mezcla en O(n + k log k)
+            self.sorted.extend(new)
+            self.sorted.sort()
+
+    def remove_many(self, words):
+        """Un documento menos contiene cada una de estas palabras"""
+        refs = self.refs
+        gone = []
+        for w in words:
+            n = refs[w] - 1
+            if n: refs[w] = n; continue
+            del refs[w]
+            gone.append(w)
+        if len(gone) < BULK_MIN:
+            for w in gone: del self.sorted[bisect_left(self.sorted, (w.lower(), w))]
+        else:
+            gone = set(gone)
+            self.sorted[:] = [pair for pair in self.sorted if pair[1] not in gone]
+
+    def complete(self, prefix, limit=None):
+        return prefix_matches(self.sorted, prefix, limit)
+
+
+class SharedWordIndex:
+    """Índice de identificadores de la ventana: un WordBucket por lenguaje,
+    para que las palabras de CSS no aparezcan al escribir PHP."""
+    def __init__(self):
+        self.buckets = {}
+
+    def bucket(self, language):
+        if language not in self.buckets: self.buckets[language] = WordBucket()
+        return self.buckets[language]
+
+
+class WordIndex:
+    """Palabras de un documento, mantenidas línea a línea.
+
+    Guarda las palabras de cada bloque y cuántas veces aparece cada una. Las
+    palabras que entran o salen del documento se anuncian a su WordBucket,
+    que es el que responde las búsquedas por prefijo. Una edición sólo vuelve
+    a leer los bloques que tocó. Las palabras se internan: todas las pestañas
+    comparten el mismo objeto str por palabra."""
+    def __init__(self, bucket=None):
+        self.lines = [()] # Palabras de cada bloque, en orden
+        self.counts = {} # palabra -> apariciones en el documento
+        self.bucket = bucket or WordBucket()
+
+    def clear(self):
+        self.bucket.remove_many(self.counts)
+        self.lines = [()]
+        self.counts = {}
+
+    def set_bucket(self, bucket):
+        """Mueve las palabras del documento a otro bucket (cambio de lenguaje)."""
+        if bucket is self.bucket: return
+        self.bucket.remove_many(self.counts)
+        bucket.add_many(self.counts)
+        self.bucket = bucket
+
+    def replace_lines(self, first, old_count, new_lines):
+        """Sustituye `old_count` bloques desde `first` por los textos de `new_lines`."""
+        old = self.lines[first:first + old_count]
+        parsed = [tuple(map(intern, WORD_RE.findall(text))) for text in new_lines]
+        was = {} # palabra que entró o salió -> si estaba en el documento antes del cambio
+        if len(old) == len(parsed):
+            # Mismos bloques (p. ej. un reemplazo en todo el archivo): sólo cuentan los que cambiaron
+            for before, after in zip(old, parsed):
+                if before == after: continue
+                for w in before: self._remove(w, was)
+                for w in after: self._add(w, was)
+        else:
+            for words in old:
+                for w in words: self._remove(w, was)
+            for words in parsed:
+                for w in words: self._add(w, was)
+        self.lines[first:first + old_count] = parsed
+        # Al bucket, de una vez: abrir un archivo grande son cientos de miles de palabras nuevas
+        self.bucket.remove_many([w for w, before in was.items() if before and w not in self.counts])
+        self.bucket.add_many([w for w, before in was.items() if not before and w in self.counts])
+
+    def _add(self, word, was):
+        n = self.counts.get(word, 0)
+        if n == 0: was.setdefault(word, False)
+        self.counts[word] = n + 1
+
+    def _remove(self, word, was):
+        n = self.counts[word] - 1
+        if n: self.counts[word] = n; return
+        del self.counts[word]
+        was.setdefault(word, True)
+
+    def complete(self, prefix, limit=None):
+        """Palabras que empiezan por `prefix` (sin distinguir mayúsculas)."""
+        return self.bucket.complete(prefix, limit)
+
+    def count(self, word):
+        return self.counts.get(word, 0)
+
+
+def sorted_keywords(words):
+    """Lista (minúsculas, palabra) lista para prefix_matches."""
+    return sorted({(w.lower(), w) for w in words})
+
+
+def prefix_matches(sorted_pairs, prefix, limit=None):
+    key = prefix.lower()
+    out = []
+    i = bisect_left(sorted_pairs, (key,))
+    while i < len(sorted_pairs) and sorted_pairs[i][0].startswith(key):
+        out.append(sorted_pairs[i][1])
+        if limit and len(out) >= limit: break
+        i += 1
+    return out